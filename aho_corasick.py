@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+AHO-CORASICK - Hitta många söksträngar i en passage
+===================================================
+Bygger en automat av alla mönster en gång; varje text läses sedan tecken
+för tecken exakt en gång, oavsett hur många mönster som finns. Tiden är
+linjär i textens längd plus antalet träffar.
+
+Används av enrich_locations.py (ortnamn) och tag_capabilities.py
+(AI-förmågor).
+
+Användning:
+    automaton = Automaton({'stockholm': 'Stockholm', 'kista': 'Kista'})
+    for start, end, value in automaton.find_all("kontor i kista"):
+        ...
+"""
+
+from collections import deque
+from typing import Dict, Generic, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+
+
+def fold(text: str) -> str:
+    """Gemener utan att ändra längden (träffpositionerna gäller originaltexten)"""
+    folded = text.lower()
+    return folded if len(folded) == len(text) else ''.join(
+        low if len(low := ch.lower()) == 1 else ch for ch in text
+    )
+
+
+def is_word(text: str, start: int, end: int) -> bool:
+    """Träffen är ett helt ord, men tillåt ett s efter: "Stockholms", "robots" """
+    if start > 0 and text[start - 1].isalnum():
+        return False
+    if end < len(text) and text[end].isalnum():
+        return text[end] == 's' and (end + 1 == len(text) or not text[end + 1].isalnum())
+    return True
+
+
+class Automaton(Generic[T]):
+    """Aho-Corasick-automat över ett fast lexikon (mönster -> värde)"""
+
+    def __init__(self, patterns: Dict[str, T]):
+        """
+        Args:
+            patterns: Mönster och värdet som returneras vid träff. Tomma
+                mönster ignoreras.
+        """
+        # Tillstånd är index; 0 är roten
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._value: List[Optional[Tuple[int, T]]] = [None]
+        # Närmaste tillstånd längs fail-kedjan som är slutet på ett mönster
+        self._output: List[int] = [0]
+        for pattern, value in patterns.items():
+            if pattern:
+                self._add(pattern, value)
+        self._link()
+
+    def __len__(self) -> int:
+        return sum(1 for value in self._value if value is not None)
+
+    def _add(self, pattern: str, value: T) -> None:
+        state = 0
+        for char in pattern:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._value.append(None)
+                self._output.append(0)
+            state = nxt
+        self._value[state] = (len(pattern), value)
+
+    def _link(self) -> None:
+        """Bredden först: fail-länkar och utdatalänkar"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                fail = self._fail[child]
+                self._output[child] = fail if self._value[fail] is not None else self._output[fail]
+
+    def find_all(self, text: str) -> Iterator[Tuple[int, int, T]]:
+        """
+        Alla träffar, även överlappande
+
+        Yields:
+            (start, slut, värde) där text[start:slut] är mönstret
+        """
+        goto, fail, values, output = self._goto, self._fail, self._value, self._output
+        state = 0
+        for end, char in enumerate(text, 1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            match = state if values[state] is not None else output[state]
+            while match:
+                length, value = values[match]
+                yield end - length, end, value
+                match = output[match]
+
+    def find_words(self, text: str) -> List[Tuple[int, int, T]]:
+        """
+        Längsta icke-överlappande helordsträffar i gemener: "Upplands Väsby"
+        före "Väsby". Mönstren ska vara i gemener (se fold).
+        """
+        folded = fold(text)
+        hits = sorted(
+            ((start, end, value) for start, end, value in self.find_all(folded)
+             if is_word(folded, start, end)),
+            key=lambda hit: (hit[0], hit[0] - hit[1]),
+        )
+        kept, covered = [], 0
+        for start, end, value in hits:
+            if start >= covered:
+                kept.append((start, end, value))
+                covered = end
+        return kept
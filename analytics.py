@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+ANALYS - Vilka företag visas och skickas till DMs?
+==================================================
+Kommandon (namn, argument, visade företags-ID:n) och klick på
+DM-knapparna loggas utan att kommandona väntar på disk:
+
+- record_command/record_dm lägger händelsen i en ringbuffert i minnet
+  (deque med maxlängd, ANALYTICS_BUFFER). Är bufferten full skrivs den
+  äldsta händelsen över och räknas som tappad
+- flush() tömmer bufferten och skriver allt i en transaktion till en egen
+  SQLite-fil (ANALYTICS_DATABASE_PATH, default analytics.db). Botten kör
+  den var ANALYTICS_FLUSH_S sekund i en egen tråd (AnalyticsLog.call), så
+  analysskrivningar aldrig delar fil, anslutning eller trådpool med
+  katalogläsningarna
+- Dagliga sammanställningar (per kommando och per företag) uppdateras i
+  samma transaktion; unika användare per dag uppskattas med HyperLogLog
+  (4 KB per dag, ~1.6 % fel) i stället för att spara varje användar-ID
+
+Rapport:
+    python analytics.py [--days 7] [--db analytics.db]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+ANALYTICS_BUFFER = int(os.getenv('ANALYTICS_BUFFER', '10000'))
+# Råa händelser sparas så här länge; sammanställningarna sparas alltid
+ANALYTICS_RETENTION_DAYS = int(os.getenv('ANALYTICS_RETENTION_DAYS', '90'))
+# Dagsgräns för sammanställningarna (samma som daglig posting)
+ANALYTICS_TIMEZONE = ZoneInfo(os.getenv('ANALYTICS_TIMEZONE', 'Europe/Stockholm'))
+
+KIND_COMMAND = 'command'
+KIND_DM = 'dm'
+
+
+# ==================== HYPERLOGLOG ====================
+
+class HyperLogLog:
+    """
+    Uppskattning av antal unika värden i fast minne
+
+    2**precision register à en byte; standardfelet är 1.04 / sqrt(2**precision)
+    (precision 12: 4096 bytes, ~1.6 %). Två skisser slås ihop med max per
+    register, så en dag kan byggas upp över flera flushar och omstarter.
+    """
+
+    def __init__(self, precision: int = 12, registers: Optional[bytes] = None):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.size)
+        if len(self.registers) != self.size:
+            raise ValueError(f"Fel antal register: {len(self.registers)} (väntade {self.size})")
+
+    def add(self, value: Any) -> None:
+        digest = hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest()
+        x = int.from_bytes(digest, 'big')
+        index = x >> (64 - self.precision)
+        rest = x & ((1 << (64 - self.precision)) - 1)
+        # Position för första ettan i de återstående bitarna (1-baserad)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: 'HyperLogLog') -> None:
+        if other.precision != self.precision:
+            raise ValueError("Kan bara slå ihop skisser med samma precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        m = self.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Få värden: linear counting är noggrannare
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.registers)
+
+
+# ==================== HÄNDELSELOGG ====================
+
+class Event(NamedTuple):
+    ts: float
+    day: str
+    kind: str
+    name: str
+    args: Optional[str]
+    result_ids: Tuple[int, ...]
+    user_id: Optional[int]
+    guild_id: Optional[int]
+    ok: bool
+
+
+def _json_args(args: Optional[Dict[str, Any]]) -> Optional[str]:
+    if not args:
+        return None
+    # Discord-objekt (kanaler m.m.) sparas som sitt ID
+    clean = {
+        key: value if isinstance(value, (str, int, float, bool, type(None))) else getattr(value, 'id', str(value))
+        for key, value in args.items()
+    }
+    return json.dumps(clean, ensure_ascii=False, sort_keys=True)
+
+
+class AnalyticsLog:
+    """Ringbuffert i minnet som skrivs till en egen SQLite-fil i batcher"""
+
+    def __init__(self, path: Optional[str] = "analytics.db", capacity: int = ANALYTICS_BUFFER,
+                 retention_days: int = ANALYTICS_RETENTION_DAYS):
+        """
+        Args:
+            path: Analysdatabasen (None = loggning avstängd)
+            capacity: Max antal händelser i minnet mellan två flushar
+            retention_days: Hur länge råa händelser sparas
+        """
+        self.path = path
+        self.retention_days = retention_days
+        self.conn: Optional[sqlite3.Connection] = None
+        self._buffer: Deque[Event] = deque(maxlen=capacity)
+        self._sketches: Dict[str, HyperLogLog] = {}
+        self._lock = threading.Lock()
+        # En tråd för alla skrivningar: ingen konkurrens med katalogfrågornas trådpool
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pruned_day: Optional[str] = None
+        self._current_day = ''
+        self._day_start = self._day_end = 0.0
+        self.counters = {'recorded': 0, 'dropped': 0, 'flushed': 0, 'flushes': 0, 'failed_flushes': 0}
+        self.last_flush_ms: Optional[float] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def connect(self) -> None:
+        """Öppna analysdatabasen och skapa tabeller vid behov"""
+        if not self.enabled or self.conn is not None:
+            return
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript('''
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts REAL NOT NULL,
+            day TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            name TEXT NOT NULL,
+            args TEXT,
+            result_ids TEXT,
+            user_id INTEGER,
+            guild_id INTEGER,
+            ok BOOLEAN NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_events_day ON events(day);
+        CREATE TABLE IF NOT EXISTS daily_rollups (
+            day TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            name TEXT NOT NULL,
+            events INTEGER NOT NULL DEFAULT 0,
+            errors INTEGER NOT NULL DEFAULT 0,
+            results INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, kind, name)
+        );
+        CREATE TABLE IF NOT EXISTS daily_company_stats (
+            day TEXT NOT NULL,
+            company_id INTEGER NOT NULL,
+            shown INTEGER NOT NULL DEFAULT 0,
+            dms INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, company_id)
+        );
+        CREATE TABLE IF NOT EXISTS daily_unique_users (
+            day TEXT PRIMARY KEY,
+            precision INTEGER NOT NULL,
+            registers BLOB NOT NULL
+        );
+        ''')
+        self.conn.commit()
+
+    def close(self) -> None:
+        """Skriv det som ligger kvar i bufferten och stäng"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self.conn is not None:
+            try:
+                self.flush()
+            finally:
+                self.conn.close()
+                self.conn = None
+
+    # ---------- inspelning (event loopen, ingen I/O) ----------
+
+    def _day(self, ts: float) -> str:
+        """Lokalt datum för ts; räknas bara om när dygnet passerats"""
+        if not self._day_start <= ts < self._day_end:
+            local = datetime.fromtimestamp(ts, ANALYTICS_TIMEZONE)
+            midnight = local.replace(hour=0, minute=0, second=0, microsecond=0)
+            self._day_start = midnight.timestamp()
+            # Väggklocka: ett dygn är 23 eller 25 timmar vid sommartidsbyte
+            self._day_end = (midnight + timedelta(days=1)).timestamp()
+            self._current_day = local.date().isoformat()
+        return self._current_day
+
+    def _record(self, kind: str, name: str, args: Optional[Dict[str, Any]], result_ids: Iterable[int],
+                user_id: Optional[int], guild_id: Optional[int], ok: bool) -> None:
+        if not self.enabled:
+            return
+        now = time.time()
+        day = self._day(now)
+        event = Event(now, day, kind, name, _json_args(args), tuple(result_ids), user_id, guild_id, ok)
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.counters['dropped'] += 1
+            self._buffer.append(event)
+            self.counters['recorded'] += 1
+            if user_id is not None:
+                sketch = self._sketches.get(day)
+                if sketch is None:
+                    sketch = self._sketches[day] = HyperLogLog()
+                sketch.add(user_id)
+
+    def record_command(self, name: str, args: Optional[Dict[str, Any]] = None, result_ids: Iterable[int] = (),
+                       user_id: Optional[int] = None, guild_id: Optional[int] = None, ok: bool = True) -> None:
+        """Ett slash-kommando och de företag det visade"""
+        self._record(KIND_COMMAND, name, args, result_ids, user_id, guild_id, ok)
+
+    def record_dm(self, source: str, company_ids: Iterable[int], user_id: Optional[int] = None,
+                  guild_id: Optional[int] = None) -> None:
+        """Ett klick på en DM-knapp ('dagens', 'sok', 'sida' ...) och företagen som skickas"""
+        self._record(KIND_DM, source, None, company_ids, user_id, guild_id, True)
+
+    # ---------- skrivning (analystråden) ----------
+
+    def _drain(self) -> Tuple[List[Event], Dict[str, bytes]]:
+        with self._lock:
+            events = list(self._buffer)
+            self._buffer.clear()
+            sketches = {day: sketch.to_bytes() for day, sketch in self._sketches.items()}
+            # Bara dagens skiss behövs efter flushen (äldre dagar är skrivna)
+            if events:
+                latest = events[-1].day
+                self._sketches = {day: s for day, s in self._sketches.items() if day == latest}
+        return events, sketches
+
+    def flush(self) -> int:
+        """
+        Skriv bufferten till analysdatabasen i en transaktion
+
+        Returns:
+            Antal skrivna händelser
+        """
+        if self.conn is None:
+            return 0
+        started = time.perf_counter()
+        events, sketches = self._drain()
+        if not events:
+            return 0
+        # (dag, typ, namn) -> [händelser, fel, resultat]; (dag, företag) -> [visad, DM]
+        rollups: Dict[Tuple[str, str, str], List[int]] = defaultdict(lambda: [0, 0, 0])
+        companies: Dict[Tuple[str, int], List[int]] = defaultdict(lambda: [0, 0])
+        for event in events:
+            totals = rollups[(event.day, event.kind, event.name)]
+            totals[0] += 1
+            totals[1] += 0 if event.ok else 1
+            totals[2] += len(event.result_ids)
+            column = 1 if event.kind == KIND_DM else 0
+            for company_id in set(event.result_ids):
+                companies[(event.day, company_id)][column] += 1
+
+        try:
+            with self.conn:
+                self.conn.executemany(
+                    'INSERT INTO events (ts, day, kind, name, args, result_ids, user_id, guild_id, ok) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    [(e.ts, e.day, e.kind, e.name, e.args, ','.join(map(str, e.result_ids)) or None,
+                      e.user_id, e.guild_id, e.ok) for e in events],
+                )
+                self.conn.executemany(
+                    'INSERT INTO daily_rollups (day, kind, name, events, errors, results) VALUES (?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT (day, kind, name) DO UPDATE SET events = events + excluded.events, '
+                    'errors = errors + excluded.errors, results = results + excluded.results',
+                    [key + tuple(totals) for key, totals in rollups.items()],
+                )
+                self.conn.executemany(
+                    'INSERT INTO daily_company_stats (day, company_id, shown, dms) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT (day, company_id) DO UPDATE SET shown = shown + excluded.shown, '
+                    'dms = dms + excluded.dms',
+                    [key + tuple(counts) for key, counts in companies.items()],
+                )
+                for day, registers in sketches.items():
+                    self._merge_sketch(day, HyperLogLog(registers=registers))
+                self._prune(events)
+        except sqlite3.Error as e:
+            # Händelserna är förlorade, men kommandona påverkas aldrig
+            self.counters['failed_flushes'] += 1
+            self.counters['dropped'] += len(events)
+            print(f"⚠️ Kunde inte skriva analyslogg ({self.path}): {e}")
+            return 0
+        self.counters['flushed'] += len(events)
+        self.counters['flushes'] += 1
+        self.last_flush_ms = (time.perf_counter() - started) * 1000
+        return len(events)
+
+    def _merge_sketch(self, day: str, sketch: HyperLogLog) -> HyperLogLog:
+        row = self.conn.execute(
+            'SELECT precision, registers FROM daily_unique_users WHERE day = ?', (day,)
+        ).fetchone()
+        if row:
+            sketch.merge(HyperLogLog(row[0], row[1]))
+        self.conn.execute(
+            'INSERT OR REPLACE INTO daily_unique_users (day, precision, registers) VALUES (?, ?, ?)',
+            (day, sketch.precision, sketch.to_bytes()),
+        )
+        return sketch
+
+    def _prune(self, events: List[Event]) -> None:
+        """Ta bort råa händelser äldre än retention_days (en gång per dag)"""
+        if not events or not self.retention_days or events[-1].day == self._pruned_day:
+            return
+        self._pruned_day = events[-1].day
+        cutoff = (datetime.fromisoformat(self._pruned_day) - timedelta(days=self.retention_days)).date()
+        self.conn.execute('DELETE FROM events WHERE day < ?', (cutoff.isoformat(),))
+
+    async def call(self, method: str, *args):
+        """
+        Kör flush/unique_users/daily_report i analystråden
+
+        Alla skrivningar och läsningar av analysdatabasen går genom samma
+        tråd, skild från trådpoolen som kör katalogfrågorna.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analytics")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, getattr(self, method), *args)
+
+    # ---------- läsning ----------
+
+    def unique_users(self, day: str) -> int:
+        """Uppskattat antal unika användare en dag (skrivna + i minnet)"""
+        sketch = HyperLogLog()
+        if self.conn is not None:
+            row = self.conn.execute(
+                'SELECT precision, registers FROM daily_unique_users WHERE day = ?', (day,)
+            ).fetchone()
+            if row:
+                sketch = HyperLogLog(row[0], row[1])
+        with self._lock:
+            if day in self._sketches:
+                sketch.merge(self._sketches[day])
+        return sketch.count()
+
+    def daily_report(self, days: int = 7, top: int = 5) -> List[Dict[str, Any]]:
+        """Sammanställning per dag, senaste dagen först (bara skrivna händelser)"""
+        if self.conn is None:
+            return []
+        report = []
+        day_rows = self.conn.execute(
+            'SELECT DISTINCT day FROM daily_rollups ORDER BY day DESC LIMIT ?', (days,)
+        ).fetchall()
+        for (day,) in day_rows:
+            rollups = self.conn.execute(
+                'SELECT kind, name, events, errors, results FROM daily_rollups WHERE day = ? '
+                'ORDER BY events DESC', (day,)
+            ).fetchall()
+            top_rows = self.conn.execute(
+                'SELECT company_id, shown, dms FROM daily_company_stats WHERE day = ? '
+                'ORDER BY dms DESC, shown DESC, company_id LIMIT ?', (day, top)
+            ).fetchall()
+            report.append({
+                'day': day,
+                'commands': {name: events for kind, name, events, _, _ in rollups if kind == KIND_COMMAND},
+                'errors': sum(errors for _, _, _, errors, _ in rollups),
+                'dms': {name: events for kind, name, events, _, _ in rollups if kind == KIND_DM},
+                'unique_users': self.unique_users(day),
+                'top_companies': [{'id': cid, 'shown': shown, 'dms': dms} for cid, shown, dms in top_rows],
+            })
+        return report
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.counters, 'buffered': len(self._buffer), 'last_flush_ms': self.last_flush_ms}
+
+
+# ==================== RAPPORT ====================
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--db', default=os.getenv('ANALYTICS_DATABASE_PATH', 'analytics.db'))
+    parser.add_argument('--catalog', default=os.getenv('DATABASE_PATH', 'ai_companies.db'),
+                        help='Katalogen, för företagsnamn')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ Ingen analyslogg ännu: {args.db}")
+        return
+    log = AnalyticsLog(args.db)
+    log.connect()
+    try:
+        report = log.daily_report(args.days)
+    finally:
+        log.close()
+
+    names: Dict[int, str] = {}
+    ids = sorted({c['id'] for day in report for c in day['top_companies']})
+    if ids and os.path.exists(args.catalog):
+        from repository import CompanyRepository
+        repo = CompanyRepository(args.catalog)
+        if repo.connect():
+            names = {c['id']: c['name'] for c in repo.get_companies(ids)}
+            repo.close()
+
+    for day in report:
+        commands = ', '.join(f"/{name} {count}" for name, count in day['commands'].items()) or '–'
+        dms = sum(day['dms'].values())
+        print(f"\n📅 {day['day']}: ~{day['unique_users']} unika användare, {dms} DM-klick, {day['errors']} fel")
+        print(f"   Kommandon: {commands}")
+        for company in day['top_companies']:
+            name = names.get(company['id'], f"#{company['id']}")
+            print(f"   🏢 {name}: visad {company['shown']}, DM {company['dms']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -51,6 +51,12 @@ print(f"\n   Per källa:")
 for row in cursor.fetchall():
     print(f"      {row[0]}: {row[1]}")
 
+# Orter som enrich_locations.py hittat i beskrivning/namn/domän
+if 'location_confidence' in {row[1] for row in cursor.execute('PRAGMA table_info(companies)')}:
+    cursor.execute('SELECT COUNT(*), AVG(location_confidence) FROM companies WHERE location_confidence IS NOT NULL')
+    enriched, confidence = cursor.fetchone()
+    print(f"   - Varav berikade: {enriched} (snittsäkerhet {confidence or 0:.2f})")
+
 # Exempel på my.ai.se-företag utan location
 cursor.execute("SELECT name, type FROM companies WHERE source='my.ai.se' AND type='startup' LIMIT 5")
 print(f"\n🔍 Exempel på my.ai.se-startups (saknar location):")
@@ -60,8 +66,9 @@ for row in cursor.fetchall():
 print("\n" + "=" * 60)
 print("SLUTSATS:")
 print("=" * 60)
-print("my.ai.se-data (897 företag) saknar location_city/location_greater_stockholm")
-print("Bara EU-data (~200-260 företag) har location-information")
-print("\nDärför får du bara 20 träffar när du filtrerar på Stockholm!")
+print("my.ai.se-data (897 företag) saknar location_city/location_greater_stockholm i källan")
+print("Bara EU-data (~200-260 företag) har location-information från början")
+print("\nbuild_database.py fyller i orter ur beskrivningarna (enrich_locations.py),")
+print("annars får du bara 20 träffar när du filtrerar på Stockholm!")
 
 conn.close()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+HTTP-API - Katalogen för andra verktyg (read-only)
+==================================================
+Samma läslager som botten (CompanyRepository med snapshot), så andra
+verktyg slipper öppna ai_companies.db själva.
+
+Endpoints (JSON):
+    GET /api/health
+    GET /api/search?q=vision&limit=10
+    GET /api/companies?type=startup&sector=Education&limit=20&cursor=85.2325
+    GET /api/companies/{id}
+    GET /api/facets/{type|city}
+
+Filter för /api/companies: type, sector, domain, capability, city,
+greater_stockholm, min_quality, praktik (samma som filter_companies).
+Svaret har "next" - cursorn till nästa sida (keyset på kvalitet och id),
+null på sista sidan.
+
+- ETag = katalogversion (snapshotens innehållshash) + URL. If-None-Match
+  med samma ETag ger 304 utan att någon fråga körs
+- Svar cachas per katalogversion (LRU, API_CACHE_SIZE) och gzip:as en gång
+- Frågor körs utanför event loopen (CompanyRepository.call)
+- Katalogen öppnas om inom CATALOG_RELOAD_S sekunder när den publicerats
+
+Användning:
+    python api_server.py [--host 127.0.0.1] [--port 8080]
+
+Lasttest: python bench_api.py
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+from aiohttp import web
+
+from repository import CompanyRepository
+
+API_CACHE_SIZE = int(os.getenv('API_CACHE_SIZE', '2048'))
+CATALOG_RELOAD_S = float(os.getenv('CATALOG_RELOAD_S', '60'))
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+# Mindre svar skickas okomprimerade
+GZIP_MIN_BYTES = 1024
+
+# Query-parametrar -> filter_companies
+FILTER_PARAMS = {
+    'type': 'company_type',
+    'sector': 'sector',
+    'domain': 'domain',
+    'capability': 'ai_capability',
+    'city': 'location_city',
+}
+TRUE_VALUES = ('1', 'true', 'yes', 'ja')
+FALSE_VALUES = ('0', 'false', 'no', 'nej')
+
+REPOSITORY = web.AppKey('repository', CompanyRepository)
+
+
+class CachedResponse(NamedTuple):
+    etag: Optional[str]
+    body: bytes
+    gzipped: Optional[bytes]
+
+
+class ResponseCache:
+    """Färdiga svar per URL, tömmas när katalogversionen ändras"""
+
+    def __init__(self, size: int = API_CACHE_SIZE):
+        self.size = size
+        self.version: Optional[str] = None
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, version: str, key: str) -> Optional[CachedResponse]:
+        if version != self.version:
+            self._entries.clear()
+            self.version = version
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, version: str, key: str, entry: CachedResponse) -> None:
+        if version != self.version or not self.size:
+            return
+        self._entries[key] = entry
+        if len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+
+CACHE = web.AppKey('cache', ResponseCache)
+
+
+# ==================== PARAMETRAR ====================
+
+def _limit(request: web.Request) -> int:
+    raw = request.query.get('limit')
+    if raw is None:
+        return DEFAULT_LIMIT
+    limit = int(raw)
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f"limit måste vara 1-{MAX_LIMIT}")
+    return limit
+
+
+def _flag(request: web.Request, name: str) -> Optional[bool]:
+    raw = request.query.get(name)
+    if raw is None:
+        return None
+    if raw.lower() in TRUE_VALUES:
+        return True
+    if raw.lower() in FALSE_VALUES:
+        return False
+    raise ValueError(f"{name} ska vara true eller false")
+
+
+def parse_cursor(raw: Optional[str]) -> Optional[Tuple[int, int]]:
+    """"85.2325" -> (85, 2325)"""
+    if not raw:
+        return None
+    quality, _, company_id = raw.partition('.')
+    return int(quality), int(company_id)
+
+
+def format_cursor(row: Dict) -> str:
+    return f"{row['data_quality_score']}.{row['id']}"
+
+
+def parse_filters(request: web.Request) -> Dict:
+    """Query-parametrar -> kwargs till filter_companies/filter_page"""
+    filters = {name: request.query[param] for param, name in FILTER_PARAMS.items() if request.query.get(param)}
+    if 'company_type' in filters:
+        filters['company_type'] = filters['company_type'].lower()
+    if 'min_quality' in request.query:
+        filters['min_quality'] = int(request.query['min_quality'])
+    greater_stockholm = _flag(request, 'greater_stockholm')
+    if greater_stockholm is not None:
+        filters['location_greater_stockholm'] = greater_stockholm
+    if _flag(request, 'praktik'):
+        filters['only_praktik_relevant'] = True
+    return filters
+
+
+# ==================== SVAR ====================
+
+def _etag(version: str, path_qs: str) -> str:
+    # Svaga ETags: samma innehåll oavsett gzip
+    digest = hashlib.blake2b(f"{version}\0{path_qs}".encode('utf-8'), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _matches(request: web.Request, etag: str) -> bool:
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    return header.strip() == '*' or etag in (tag.strip() for tag in header.split(','))
+
+
+def _error(status: int, message: str) -> web.Response:
+    return web.json_response({'error': message}, status=status)
+
+
+async def cached_json(request: web.Request,
+                      compute: Callable[[CompanyRepository], Awaitable[Optional[object]]]) -> web.Response:
+    """
+    Svara med JSON från compute, via ETag och svarscachen
+
+    compute returnerar None för 404 och kastar ValueError för 400; inget
+    av dem cachas.
+    """
+    repo = request.app[REPOSITORY]
+    cache = request.app[CACHE]
+    version = repo.catalog_version
+    etag = _etag(version, request.path_qs) if version else None
+    if etag and _matches(request, etag):
+        return web.Response(status=304, headers={'ETag': etag})
+
+    entry = cache.get(version, request.path_qs) if version else None
+    if entry is None:
+        try:
+            payload = await compute(repo)
+        except ValueError as e:
+            return _error(400, str(e))
+        if payload is None:
+            return _error(404, "hittades inte")
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        gzipped = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_BYTES else None
+        entry = CachedResponse(etag, body, gzipped)
+        if version:
+            cache.put(version, request.path_qs, entry)
+
+    headers = {'Content-Type': 'application/json; charset=utf-8', 'Vary': 'Accept-Encoding'}
+    if etag:
+        headers['ETag'] = etag
+    body = entry.body
+    if entry.gzipped is not None and 'gzip' in request.headers.get('Accept-Encoding', ''):
+        headers['Content-Encoding'] = 'gzip'
+        body = entry.gzipped
+    return web.Response(body=body, headers=headers)
+
+
+# ==================== ENDPOINTS ====================
+
+async def health(request: web.Request) -> web.Response:
+    repo = request.app[REPOSITORY]
+    cache = request.app[CACHE]
+    return web.json_response({
+        'status': 'ok' if repo.backend.connected else 'no database',
+        'version': repo.catalog_version,
+        'cache': {'entries': len(cache), 'hits': cache.hits, 'misses': cache.misses},
+    })
+
+
+async def search(request: web.Request) -> web.Response:
+    async def compute(repo: CompanyRepository):
+        term = request.query.get('q', '').strip()
+        if not term:
+            raise ValueError("q saknas")
+        return {'results': await repo.call('search_by_name', term, _limit(request))}
+    return await cached_json(request, compute)
+
+
+async def companies(request: web.Request) -> web.Response:
+    async def compute(repo: CompanyRepository):
+        filters, limit = parse_filters(request), _limit(request)
+        rows, has_more = await repo.call(
+            'filter_page', filters, parse_cursor(request.query.get('cursor')), limit,
+        )
+        return {'results': rows, 'next': format_cursor(rows[-1]) if has_more else None}
+    return await cached_json(request, compute)
+
+
+async def company(request: web.Request) -> web.Response:
+    async def compute(repo: CompanyRepository):
+        return await repo.call('get_company_details', int(request.match_info['company_id']))
+    return await cached_json(request, compute)
+
+
+async def facets(request: web.Request) -> web.Response:
+    async def compute(repo: CompanyRepository):
+        kind = request.match_info['kind']
+        if kind not in ('type', 'city'):
+            return None
+        counts = await repo.call('facet_counts', kind)
+        return {'counts': dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))}
+    return await cached_json(request, compute)
+
+
+# ==================== APP ====================
+
+async def _reload_loop(repo: CompanyRepository) -> None:
+    """Byt till ny katalog när den publicerats (se publish.py)"""
+    while True:
+        await asyncio.sleep(CATALOG_RELOAD_S)
+        try:
+            if await asyncio.to_thread(repo.reload_if_changed):
+                print(f"🔄 Ny katalog inläst (version {repo.catalog_version})")
+        except Exception as e:
+            print(f"⚠️ Kunde inte läsa in ny katalog: {e}")
+
+
+def create_app(repo: CompanyRepository, cache_size: int = API_CACHE_SIZE) -> web.Application:
+    """
+    Args:
+        repo: Ansluts när appen startar och stängs när den stängs
+        cache_size: Antal svar i svarscachen (0 = av)
+    """
+    app = web.Application()
+    app[REPOSITORY] = repo
+    app[CACHE] = ResponseCache(cache_size)
+    app.router.add_get('/api/health', health)
+    app.router.add_get('/api/search', search)
+    app.router.add_get('/api/companies', companies)
+    app.router.add_get(r'/api/companies/{company_id:\d+}', company)
+    app.router.add_get('/api/facets/{kind}', facets)
+
+    async def lifecycle(app: web.Application):
+        if not repo.connect():
+            print(f"⚠️ Kunde inte ansluta till {repo.db_path} - API:t svarar med tomma listor")
+        reloader = asyncio.create_task(_reload_loop(repo)) if CATALOG_RELOAD_S > 0 else None
+        yield
+        if reloader:
+            reloader.cancel()
+        repo.close()
+
+    app.cleanup_ctx.append(lifecycle)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default=os.getenv('API_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('API_PORT', '8080')))
+    parser.add_argument('--db', default=os.getenv('DATABASE_PATH', 'ai_companies.db'))
+    parser.add_argument('--snapshot', default=os.getenv('SNAPSHOT_PATH', 'ai_companies.snapshot'))
+    args = parser.parse_args()
+
+    repo = CompanyRepository(args.db, snapshot_path=args.snapshot)
+    print(f"🌐 API på http://{args.host}:{args.port}/api/health ({args.db})")
+    web.run_app(create_app(repo), host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+HTTP-API - Lasttest
+===================
+Startar api_server.py i en egen process (en kärna, en event loop) och
+skickar förfrågningar från en lokal lastgenerator med N samtidiga
+anslutningar. Mäter förfrågningar per sekund för tre fall:
+
+- kall: unika URL:er, varje förfrågan kör en fråga
+- cachad: samma URL:er igen, svaren kommer ur svarscachen
+- 304: If-None-Match med ETag från förra svaret
+
+Användning:
+    python bench_api.py [--seconds 5] [--concurrency 64]
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import aiohttp
+
+ROOT = Path(__file__).resolve().parent
+PATHS = (
+    "/api/search?q=ai&limit=10",
+    "/api/search?q=vision&limit=10",
+    "/api/companies?type=startup&limit=20",
+    "/api/companies?praktik=true&limit=20",
+    "/api/facets/type",
+    "/api/facets/city",
+)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+async def wait_until_up(session: aiohttp.ClientSession, base: str) -> None:
+    for _ in range(100):
+        try:
+            async with session.get(f"{base}/api/health") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("api_server.py startade inte")
+
+
+async def load(session: aiohttp.ClientSession, urls, seconds: float, concurrency: int,
+               conditional: bool = False) -> float:
+    """Förfrågningar per sekund med `concurrency` samtidiga klienter"""
+    etags = {}
+    if conditional:
+        for url in urls:
+            async with session.get(url) as response:
+                etags[url] = response.headers.get('ETag', '')
+    deadline = time.perf_counter() + seconds
+    done = 0
+
+    async def client(offset: int):
+        nonlocal done
+        i = offset
+        while time.perf_counter() < deadline:
+            url = urls[i % len(urls)]
+            headers = {'Accept-Encoding': 'gzip'}
+            if conditional:
+                headers['If-None-Match'] = etags[url]
+            async with session.get(url, headers=headers) as response:
+                await response.read()
+            done += 1
+            i += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    return done / (time.perf_counter() - started)
+
+
+async def run(seconds: float, concurrency: int) -> None:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "api_server.py", "--port", str(port)], cwd=ROOT,
+        env={**os.environ, 'CATALOG_RELOAD_S': '0'}, stdout=subprocess.DEVNULL,
+    )
+    try:
+        connector = aiohttp.TCPConnector(limit=concurrency)
+        async with aiohttp.ClientSession(connector=connector, auto_decompress=False) as session:
+            await wait_until_up(session, base)
+            # Unika URL:er (olika limit) så att cachen inte träffar
+            cold = [f"{base}{path}&n={i}" if '?' in path else f"{base}{path}?n={i}"
+                    for i in range(100000) for path in PATHS]
+            warm = [f"{base}{path}" for path in PATHS]
+            print(f"kall:    {await load(session, cold, seconds, concurrency):8.0f} req/s")
+            print(f"cachad:  {await load(session, warm, seconds, concurrency):8.0f} req/s")
+            print(f"304:     {await load(session, warm, seconds, concurrency, conditional=True):8.0f} req/s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--concurrency', type=int, default=64)
+    args = parser.parse_args()
+    asyncio.run(run(args.seconds, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
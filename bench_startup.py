@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+STARTTID - Benchmark för kallstart och omstart
+==============================================
+Mäter i en ny process per körning:
+
+- `import discord_bot` (kall import; export, warmup och analysrapporten
+  importeras först när de används)
+- botens riktiga `setup_hook` med databas, prenumerationer, analyslogg,
+  schemalagda loopar och kommandosynk, på en tillfällig state-databas
+
+Gateway-anslutningen ingår inte. Benchmarken pratar inte med Discord, så
+tree.sync ersätts med en fördröjning (--sync-ms): första körningen synkar,
+omstarterna efter ska hoppa över synken eftersom hashen är oförändrad.
+Som jämförelse körs även den gamla on_ready-sekvensen (rotation och kö
+direkt, tree.sync varje start) med samma simulerade synk.
+
+Användning:
+    python bench_startup.py [--runs 5] [--sync-ms 400]
+
+Botten loggar även verklig tid till redo ("⏱️ Redo X s efter start").
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+
+async def _setup_hook(bot_module, sync_delay: float) -> dict:
+    """Kör botens setup_hook utan inloggning; tree.sync simuleras"""
+    bot = bot_module.bot
+    calls = []
+
+    async def fake_sync(guild=None):
+        calls.append(guild)
+        await asyncio.sleep(sync_delay)
+        return bot.tree.get_commands(guild=guild)
+
+    bot.tree.sync = fake_sync
+    # async with initierar klienten mot event-loopen, som login() gör före setup_hook
+    async with bot:
+        started = time.perf_counter()
+        await bot_module.setup_hook()
+        elapsed = time.perf_counter() - started
+        for loop in (bot_module.daily_company, bot_module.reload_catalog, bot_module.flush_analytics):
+            loop.cancel()
+    for resource in (bot_module.command_sync_state, bot_module.button_labels,
+                     bot_module.subscriptions, bot_module.analytics, bot_module.db):
+        resource.close()
+    return {'setup_hook': elapsed, 'synced': bool(calls)}
+
+
+def child(state_dir: str, sync_ms: float) -> None:
+    """En start: import + setup_hook i den här processen, resultat som JSON sist"""
+    os.environ['STATE_DATABASE_PATH'] = os.path.join(state_dir, 'bot_state.db')
+    os.environ['ANALYTICS_DATABASE_PATH'] = os.path.join(state_dir, 'analytics.db')
+    # Warmup körs i bakgrunden efter setup_hook och mäts av bench_warmup.py
+    os.environ['WARMUP'] = '0'
+    os.environ.pop('DAILY_CHANNEL_ID', None)
+    os.environ.pop('FORCE_COMMAND_SYNC', None)
+
+    started = time.perf_counter()
+    import discord_bot
+    imported = time.perf_counter() - started
+    discord_bot.configure_from_env()
+    result = asyncio.run(_setup_hook(discord_bot, sync_ms / 1000))
+    print(json.dumps({'import': imported, **result}))
+
+
+def measure_start(state_dir: str, sync_ms: float) -> dict:
+    out = subprocess.run(
+        [sys.executable, __file__, '--child', state_dir, '--sync-ms', str(sync_ms)],
+        capture_output=True, text=True, check=True, cwd=HERE,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+async def ready_before(bot_module, state_path: str, sync_delay: float) -> None:
+    """on_ready som det såg ut innan: allt startas och tree.sync varje gång"""
+    db = bot_module.CompanyDatabase(os.getenv('DATABASE_PATH', 'ai_companies.db'))
+    db.connect()
+    rotation = bot_module.DailyRotation(state_path)
+    rotation.connect()
+    rotation.sync(db.get_daily_eligible_ids())
+    queue = bot_module.OutboundQueue()
+    queue.start()
+    subscriptions = bot_module.SubscriptionStore(state_path)
+    subscriptions.connect()
+    await asyncio.sleep(sync_delay)
+    await queue.stop()
+    for resource in (subscriptions, rotation, db):
+        resource.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--sync-ms', type=float, default=400.0,
+                        help='Simulerad tid för ett tree.sync-anrop (ms)')
+    parser.add_argument('--child', metavar='STATE_DIR', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.sync_ms)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Samma state-katalog mellan körningar = omstarter efter första start
+        starts = [measure_start(tmp, args.sync_ms) for _ in range(args.runs)]
+
+        import discord_bot
+        before = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            asyncio.run(ready_before(discord_bot, os.path.join(tmp, 'before.db'), args.sync_ms / 1000))
+            before.append(time.perf_counter() - start)
+
+    print("⏱️  STARTTID (exkl. gateway-anslutning)")
+    print("=" * 60)
+    print(f"import discord_bot (median):       {statistics.median(s['import'] for s in starts) * 1000:7.1f} ms")
+    print(f"setup_hook, första start:          {starts[0]['setup_hook'] * 1000:7.1f} ms")
+    if args.runs > 1:
+        print(f"setup_hook, omstart (median):      "
+              f"{statistics.median(s['setup_hook'] for s in starts[1:]) * 1000:7.1f} ms")
+    print(f"gamla on_ready (median):           {statistics.median(before) * 1000:7.1f} ms")
+    print(f"tree.sync-anrop före/efter:        {args.runs} / {sum(s['synced'] for s in starts)}")
+    print(f"(tree.sync simulerad som {args.sync_ms:.0f} ms - Discord nås inte)")
+
+
+if __name__ == "__main__":
+    main()
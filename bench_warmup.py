@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+WARMUP - Benchmark för första kommandot efter start
+===================================================
+Startar en ny process per mätning, tömmer först katalogfilernas sidor ur
+OS:ets page cache (posix_fadvise DONTNEED) och mäter sedan de första
+anropen som /stad-autocomplete, /sok och /stad gör - med och utan warmup.
+
+Användning:
+    python bench_warmup.py [--runs 5]
+
+På en dator med SSD och mycket RAM blir skillnaden liten; på ett SD-kort
+är det kalla läsningar som dominerar.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+FIRST_CALLS = (
+    ("autocomplete /stad", lambda db: db.suggest_cities("St")),
+    ("/sok AI", lambda db: db.search_by_name("AI")),
+    ("/stad Stockholm", lambda db: db.filter_by_city("Stockholm")),
+)
+
+
+def child(warm: bool) -> None:
+    """Körs i en ny process: (warmup) och mät första anropen"""
+    import discord_bot
+    from daily_schedule import DailyRotation
+    from warmup import evict_file
+
+    db_path = os.getenv('DATABASE_PATH', 'ai_companies.db')
+    snapshot_path = os.getenv('SNAPSHOT_PATH', 'ai_companies.snapshot')
+    for path in (db_path, snapshot_path):
+        evict_file(path)
+
+    discord_bot.db = discord_bot.CompanyDatabase(db_path, snapshot_path=snapshot_path)
+    discord_bot.db.connect()
+    with tempfile.TemporaryDirectory() as tmp:
+        discord_bot.rotation = DailyRotation(os.path.join(tmp, 'state.db'))
+        result = {}
+        if warm:
+            report = asyncio.run(discord_bot.warm_caches())
+            result['warmup_ms'] = report.total_ms
+        for name, call in FIRST_CALLS:
+            start = time.perf_counter()
+            call(discord_bot.db)
+            result[name] = (time.perf_counter() - start) * 1000
+        discord_bot.rotation.close()
+    discord_bot.db.close()
+    print(json.dumps(result))
+
+
+def measure(warm: bool, runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, __file__, '--child', 'warm' if warm else 'cold'],
+            capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent,
+        )
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {key: statistics.median(s[key] for s in samples) for key in samples[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--child', choices=('cold', 'warm'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child == 'warm')
+        return
+
+    cold = measure(False, args.runs)
+    warm = measure(True, args.runs)
+
+    print("🔥 FÖRSTA KOMMANDOT EFTER START (median, ms)")
+    print("=" * 60)
+    print(f"{'Anrop':<24}{'utan warmup':>14}{'med warmup':>14}")
+    for name, _ in FIRST_CALLS:
+        print(f"{name:<24}{cold[name]:>14.2f}{warm[name]:>14.2f}")
+    print(f"{'(warmup i bakgrunden)':<24}{'':>14}{warm['warmup_ms']:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
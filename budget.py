@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+LATENSBUDGET - Svara inom Discords 3-sekundersfönster
+=====================================================
+Ett slash-kommando måste svara (eller defer:a) inom 3 sekunder, annars
+misslyckas interaktionen. Varje kommando-handler körs därför med en
+latensbudget:
+
+- Förväntad tid per kommando följs som glidande medelvärde (EWMA). Är
+  den över tröskeln defer:as interaktionen direkt, innan jobbet börjar
+- Databasfrågor får en deadline via SQLites progress handler. Går en
+  fråga över avbryts den och kommandot svarar med färre träffar
+- Överskridanden, deferrals och trimmade svar räknas per kommando
+
+Användning:
+    @bot.tree.command(...)
+    @budgeted(budgets)
+    async def sok(interaction, ...):
+        ...
+        await respond(interaction, embed=embed, ephemeral=True)
+"""
+
+import functools
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# Deadline (time.monotonic) och trim-flagga för kommandot som körs just nu
+_deadline: ContextVar[Optional[float]] = ContextVar('budget_deadline', default=None)
+_trimmed: ContextVar[Optional[List[bool]]] = ContextVar('budget_trimmed', default=None)
+
+
+class BudgetExceeded(Exception):
+    """En databasfråga avbröts för att kommandots budget tog slut"""
+
+
+def current_deadline() -> Optional[float]:
+    """Deadline för kommandot som körs, None utanför ett budgeterat kommando"""
+    return _deadline.get()
+
+
+def mark_trimmed() -> None:
+    """Markera att svaret kortats för att hålla budgeten"""
+    flag = _trimmed.get()
+    if flag is not None:
+        flag[0] = True
+
+
+@contextmanager
+def trim_scope():
+    """
+    Egen trim-flagga för en del av kommandot (t.ex. en delad fråga)
+
+    Yields:
+        [bool] som blir True om något i blocket kortades; kommandots
+        flagga sätts också
+    """
+    outer = _trimmed.get()
+    inner = [False]
+    token = _trimmed.set(inner)
+    try:
+        yield inner
+    finally:
+        _trimmed.reset(token)
+        if inner[0] and outer is not None:
+            outer[0] = True
+
+
+@contextmanager
+def sqlite_deadline(conn: sqlite3.Connection, deadline: Optional[float], check_every: int = 1000):
+    """
+    Avbryt SQLite-frågor som pågår efter deadline
+
+    Raises:
+        BudgetExceeded: Om en fråga avbröts
+    """
+    if deadline is None:
+        yield
+        return
+    # Handlern gäller hela anslutningen; avbryt bara frågor i den här tråden
+    owner = threading.get_ident()
+    conn.set_progress_handler(
+        lambda: threading.get_ident() == owner and time.monotonic() > deadline, check_every
+    )
+    try:
+        yield
+    except sqlite3.OperationalError as e:
+        if 'interrupted' in str(e):
+            raise BudgetExceeded() from e
+        raise
+    finally:
+        conn.set_progress_handler(None, 0)
+
+
+@dataclass
+class _CommandStats:
+    calls: int = 0
+    deferred: int = 0
+    trimmed: int = 0
+    violations: int = 0
+    expected_ms: float = 0.0
+    max_ms: float = 0.0
+
+
+class LatencyBudgets:
+    """Budget, förväntad tid och överskridanden per kommando"""
+
+    def __init__(
+        self,
+        budget_ms: float = 2000,
+        defer_threshold_ms: float = 1000,
+        deferred_budget_ms: float = 10000,
+        response_reserve_ms: float = 500,
+        alpha: float = 0.2,
+    ):
+        """
+        Args:
+            budget_ms: Max tid till svar utan defer (Discord: 3000 ms inkl. nätverk)
+            defer_threshold_ms: Defer:a direkt om förväntad tid är över detta
+            deferred_budget_ms: Max tid till svar efter defer
+            response_reserve_ms: Tid som reserveras för att skicka svaret;
+                databasarbetet får deadline = budget - reserv
+            alpha: Vikt för senaste mätningen i EWMA
+        """
+        self.budget_ms = budget_ms
+        self.defer_threshold_ms = defer_threshold_ms
+        self.deferred_budget_ms = deferred_budget_ms
+        self.response_reserve_ms = response_reserve_ms
+        self.alpha = alpha
+        self.commands: Dict[str, _CommandStats] = {}
+
+    def _stats(self, name: str) -> _CommandStats:
+        return self.commands.setdefault(name, _CommandStats())
+
+    def should_defer(self, name: str) -> bool:
+        return self._stats(name).expected_ms > self.defer_threshold_ms
+
+    def record(self, name: str, elapsed_ms: float, deferred: bool, trimmed: bool) -> bool:
+        """Registrera en körning; returnerar True om budgeten överskreds"""
+        stats = self._stats(name)
+        stats.expected_ms = (
+            elapsed_ms if stats.calls == 0
+            else self.alpha * elapsed_ms + (1 - self.alpha) * stats.expected_ms
+        )
+        stats.calls += 1
+        stats.max_ms = max(stats.max_ms, elapsed_ms)
+        stats.deferred += deferred
+        stats.trimmed += trimmed
+        limit = self.deferred_budget_ms if deferred else self.budget_ms
+        violated = elapsed_ms > limit
+        stats.violations += violated
+        return violated
+
+    def metrics(self) -> List[Dict]:
+        """Kommandon sorterade efter flest överskridanden"""
+        rows = [{'command': name, **vars(stats)} for name, stats in self.commands.items()]
+        return sorted(rows, key=lambda r: (-r['violations'], -r['expected_ms']))
+
+
+async def respond(interaction, content: Optional[str] = None, **kwargs) -> None:
+    """Svara på en interaktion oavsett om den redan defer:ats"""
+    if interaction.response.is_done():
+        await interaction.followup.send(content, **kwargs)
+    else:
+        await interaction.response.send_message(content, **kwargs)
+
+
+def budgeted(budgets: LatencyBudgets, name: Optional[str] = None, ephemeral: bool = True):
+    """
+    Kör en kommando-handler med latensbudget
+
+    Args:
+        budgets: Delad LatencyBudgets
+        name: Kommandonamn i mätvärdena (default: funktionens namn)
+        ephemeral: Om ett defer:at svar ska vara privat
+    """
+    def decorator(func):
+        command_name = name or func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(interaction, *args, **kwargs):
+            started = time.monotonic()
+            deferred = False
+            if budgets.should_defer(command_name) and not interaction.response.is_done():
+                await interaction.response.defer(ephemeral=ephemeral, thinking=True)
+                deferred = True
+            limit_ms = budgets.deferred_budget_ms if deferred else budgets.budget_ms
+            work_ms = max(limit_ms - budgets.response_reserve_ms, 0)
+            deadline_token = _deadline.set(started + work_ms / 1000)
+            trimmed = [False]
+            trimmed_token = _trimmed.set(trimmed)
+            try:
+                return await func(interaction, *args, **kwargs)
+            finally:
+                _deadline.reset(deadline_token)
+                _trimmed.reset(trimmed_token)
+                elapsed_ms = (time.monotonic() - started) * 1000
+                if budgets.record(command_name, elapsed_ms, deferred, trimmed[0]):
+                    print(f"⏱️  /{command_name} överskred budgeten: {elapsed_ms:.0f} ms")
+
+        return wrapper
+    return decorator
@@ -12,12 +12,21 @@ Databas: ai_companies.db
 
 import sqlite3
 import json
+import sys
 from pathlib import Path
 from typing import List, Dict, Any
 import re
 
-class CompanyDatabase:
-    """Hanterar AI-företagsdatabasen"""
+from enrich_locations import enrich_step
+from publish import staged_database
+from tag_capabilities import tagging_step
+from tags import TagDictionary, ensure_tag_keys, normalize_step, split_tags
+from repository.filters import (
+    DAILY_FLAG, PRAKTIK_FLAG, daily_sql, flag_sql, has_text_sql, praktik_sql,
+)
+
+class CatalogBuilder:
+    """Skapar och populerar AI-företagsdatabasen (läsning sker via repository/)"""
     
     def __init__(self, db_path: str = "ai_companies.db"):
         """
@@ -29,6 +38,7 @@ class CompanyDatabase:
         self.db_path = db_path
         self.conn = None
         self.cursor = None
+        self.tags = None
         
     def connect(self):
         """Öppna databas-anslutning"""
@@ -42,6 +52,7 @@ class CompanyDatabase:
         if self.conn:
             self.conn.commit()
             self.conn.close()
+            self.conn = None
             print("✅ Databas-anslutning stängd")
     
     def create_schema(self):
@@ -67,6 +78,9 @@ class CompanyDatabase:
             location_city TEXT,
             location_country TEXT DEFAULT 'Sweden',
             location_greater_stockholm BOOLEAN,
+            location_confidence REAL,  -- NULL = från källan, annars enrich_locations.py
+            location_lat REAL,
+            location_lon REAL,
             
             -- METADATA
             metadata_source_url TEXT,
@@ -82,7 +96,8 @@ class CompanyDatabase:
         self.cursor.execute('''
         CREATE TABLE IF NOT EXISTS sectors (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE NOT NULL
+            name TEXT UNIQUE NOT NULL,
+            name_key TEXT  -- jämförelsenyckel, se tags.py
         )
         ''')
         
@@ -101,7 +116,8 @@ class CompanyDatabase:
         self.cursor.execute('''
         CREATE TABLE IF NOT EXISTS domains (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE NOT NULL
+            name TEXT UNIQUE NOT NULL,
+            name_key TEXT  -- jämförelsenyckel, se tags.py
         )
         ''')
         
@@ -120,7 +136,8 @@ class CompanyDatabase:
         self.cursor.execute('''
         CREATE TABLE IF NOT EXISTS ai_capabilities (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE NOT NULL
+            name TEXT UNIQUE NOT NULL,
+            name_key TEXT  -- jämförelsenyckel, se tags.py
         )
         ''')
         
@@ -129,6 +146,7 @@ class CompanyDatabase:
         CREATE TABLE IF NOT EXISTS company_ai_capabilities (
             company_id INTEGER,
             capability_id INTEGER,
+            inferred INTEGER NOT NULL DEFAULT 0,  -- 1 = härledd ur beskrivningen (tag_capabilities.py)
             FOREIGN KEY (company_id) REFERENCES companies(id),
             FOREIGN KEY (capability_id) REFERENCES ai_capabilities(id),
             PRIMARY KEY (company_id, capability_id)
@@ -139,7 +157,8 @@ class CompanyDatabase:
         self.cursor.execute('''
         CREATE TABLE IF NOT EXISTS dimensions (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE NOT NULL
+            name TEXT UNIQUE NOT NULL,
+            name_key TEXT  -- jämförelsenyckel, se tags.py
         )
         ''')
         
@@ -158,37 +177,29 @@ class CompanyDatabase:
         self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_company_name ON companies(name)')
         self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_company_type ON companies(type)')
         self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_company_swedish ON companies(is_swedish)')
+
+        # Index för keyset-paginering (ORDER BY data_quality_score DESC, id DESC)
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_company_quality ON companies(data_quality_score, id)')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_company_type_quality ON companies(type, data_quality_score, id)')
         
         # NYA INDEX FÖR LOCATION!
         self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_location_city ON companies(location_city)')
         self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_location_stockholm ON companies(location_greater_stockholm)')
         
         self.conn.commit()
+        ensure_flag_columns(self.conn)
+        ensure_tag_keys(self.conn)
         print("✅ Schema skapat (med location-kolumner)!")
     
     def get_or_create_id(self, table: str, value: str) -> int:
-        """Hämta eller skapa ID för värde i lookup-tabell"""
-        if not value:
-            return None
-            
-        # Kolla om finns
-        self.cursor.execute(f'SELECT id FROM {table} WHERE name = ?', (value,))
-        result = self.cursor.fetchone()
-        
-        if result:
-            return result[0]
-        
-        # Skapa ny
-        self.cursor.execute(f'INSERT INTO {table} (name) VALUES (?)', (value,))
-        return self.cursor.lastrowid
+        """Hämta eller skapa ID för en tagg i lookup-tabell (kanonisk form, se tags.py)"""
+        if self.tags is None:
+            self.tags = TagDictionary(self.conn)
+        return self.tags.id_for(table, value)
     
     def parse_list_field(self, value: Any) -> List[str]:
-        """Parsa list-fält från JSON"""
-        if not value:
-            return []
-        if isinstance(value, list):
-            return [str(v).strip() for v in value if v]
-        return [str(value).strip()]
+        """Parsa list-fält från JSON ("Technology, Data" -> två taggar)"""
+        return split_tags(value)
     
     def calculate_quality_score(self, company: Dict) -> int:
         """Beräkna data-kvalitetspoäng (0-100)"""
@@ -211,7 +222,7 @@ class CompanyDatabase:
         if company.get('mognadsgrad'): score += 5
         if company.get('sektor'): score += 5
         if company.get('domän'): score += 5
-        if company.get('ai_förmågor'): score += 5
+        if company.get('ai_förmåga') or company.get('ai_förmågor'): score += 5
         
         return min(score, 100)
     
@@ -284,13 +295,15 @@ class CompanyDatabase:
                             (company_id, domain_id)
                         )
                 
-                # Lägg till AI-förmågor
-                capabilities = self.parse_list_field(company.get('ai_förmågor'))
+                # Lägg till AI-förmågor (nyckeln heter ai_förmåga i JSON-exporten)
+                capabilities = self.parse_list_field(
+                    company.get('ai_förmåga') or company.get('ai_förmågor')
+                )
                 for capability in capabilities:
                     cap_id = self.get_or_create_id('ai_capabilities', capability)
                     if cap_id:
                         self.cursor.execute(
-                            'INSERT OR IGNORE INTO company_ai_capabilities VALUES (?, ?)',
+                            'INSERT OR IGNORE INTO company_ai_capabilities (company_id, capability_id) VALUES (?, ?)',
                             (company_id, cap_id)
                         )
                 
@@ -363,9 +376,56 @@ class CompanyDatabase:
             print(f"\n{name}: {count}")
 
 
+# Partiella index för botens fasta filter (se repository/filters.py)
+FLAG_INDEXES = (
+    ('idx_praktik_city', f'companies(location_city) WHERE {flag_sql(PRAKTIK_FLAG)}'),
+    ('idx_praktik_stockholm',
+     f'companies(location_greater_stockholm, data_quality_score, id) WHERE {flag_sql(PRAKTIK_FLAG)}'),
+    ('idx_praktik_quality', f'companies(data_quality_score, id) WHERE {flag_sql(PRAKTIK_FLAG)}'),
+    ('idx_daily', f'companies(id) WHERE {flag_sql(DAILY_FLAG)}'),
+    ('idx_type_website', f"companies(type) WHERE {has_text_sql('website')}"),
+)
+
+
+def ensure_flag_columns(conn: sqlite3.Connection):
+    """
+    Lägg till genererade flaggkolumner och partiella index om de saknas
+
+    is_praktik_eligible/is_daily_eligible är VIRTUAL-kolumner med samma
+    uttryck som repository/filters.py, så de kan aldrig bli inaktuella
+    oavsett vilket script som skriver. Indexen innehåller bara de rader
+    som uppfyller villkoret, så botens frågor slipper utvärdera TRIM() per rad.
+
+    Körs igen efter varje import. Planeraren väljer de partiella indexen
+    framför de äldre breda indexen först när ANALYZE körts (publish.py).
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_xinfo(companies)")}
+    for flag, condition in ((PRAKTIK_FLAG, praktik_sql()), (DAILY_FLAG, daily_sql())):
+        if flag not in columns:
+            conn.execute(
+                f"ALTER TABLE companies ADD COLUMN {flag} INTEGER "
+                f"GENERATED ALWAYS AS (CASE WHEN {condition} THEN 1 ELSE 0 END) VIRTUAL"
+            )
+    for name, definition in FLAG_INDEXES:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {definition}")
+    conn.commit()
+
+
+def export_snapshot_step(db_path: str = "ai_companies.db", snapshot_path: str = "ai_companies.snapshot"):
+    """Exportera binär katalog-snapshot som botten memory-mappar (se catalog_snapshot.py)"""
+    from catalog_snapshot import export_snapshot
+    stats = export_snapshot(db_path, snapshot_path)
+    print(f"\n📦 Snapshot: {snapshot_path} ({stats['companies']} företag, {stats['bytes'] / 1024:.0f} KB)")
+
+
 def main():
     """Huvudfunktion"""
     json_file = "organizations_data_v3_2.json"
+
+    # Bara snapshot: python build_database.py --snapshot-only
+    if "--snapshot-only" in sys.argv:
+        export_snapshot_step()
+        return
     
     # Kolla att JSON finns
     if not Path(json_file).exists():
@@ -373,26 +433,39 @@ def main():
         print("   Kontrollera att filen finns i samma mapp")
         return
     
-    # Skapa databas
-    db = CompanyDatabase()
+    # Bygg i en kopia och publicera atomiskt (se publish.py)
+    db_path = "ai_companies.db"
+    db = None
     
     try:
-        db.connect()
-        db.create_schema()
-        db.import_myai_data(json_file)
-        db.print_stats()
+        with staged_database(db_path) as staging:
+            db = CatalogBuilder(staging)
+            db.connect()
+            db.create_schema()
+            # Kopian kan ha kombinerade taggar från äldre byggen
+            normalize_step(db.conn)
+            db.import_myai_data(json_file)
+            enrich_step(db.conn)
+            tagging_step(db.conn)
+            ensure_flag_columns(db.conn)
+            db.print_stats()
+            db.close()
         
         print("\n✅ DATABAS KLAR ATT ANVÄNDA!")
-        print(f"   📁 Fil: {db.db_path}")
+        print(f"   📁 Fil: {db_path}")
         print(f"   🔍 Testa den med: python query_database.py")
+
+        export_snapshot_step(db_path)
         
     except Exception as e:
         print(f"\n❌ FEL: {e}")
+        print(f"   {db_path} lämnades orörd")
         import traceback
         traceback.print_exc()
         
     finally:
-        db.close()
+        if db:
+            db.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+KNAPPETIKETTER - Fri text i custom_id utan att kapa den
+=======================================================
+Knapparnas custom_id är max 100 tecken och söktermen (/sok, /nara) ligger
+sist. Får den inte plats sparas hela termen i state-databasen under en kort
+hash och custom_id bär "#<hash>" i stället. Knapparna fungerar då även efter
+omstart, och en lång sökning körs aldrig om med en avkortad term.
+"""
+
+import hashlib
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+CUSTOM_ID_MAX = 100
+HASH_MARK = '#'
+# Knappar äldre än så här får be användaren köra kommandot igen
+KEEP_DAYS = 90
+
+
+def label_key(label: str) -> str:
+    """Kort, stabil nyckel för en etikett (samma etikett ger samma nyckel)"""
+    return hashlib.blake2b(label.encode('utf-8'), digest_size=8).hexdigest()
+
+
+class ButtonLabelStore:
+    """Etiketter som inte får plats i custom_id, sparade i bot_state.db"""
+
+    def __init__(self, state_path: str = "bot_state.db"):
+        self.state_path = state_path
+        self.conn = None
+        # Etiketter skapade i den här processen, och fallback om state-databasen saknas
+        self.labels: Dict[str, str] = {}
+
+    def connect(self):
+        self.conn = sqlite3.connect(self.state_path)
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS button_labels (
+            key TEXT PRIMARY KEY,
+            label TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        )
+        ''')
+        cutoff = datetime.now(timezone.utc) - timedelta(days=KEEP_DAYS)
+        self.conn.execute('DELETE FROM button_labels WHERE created_at < ?',
+                          (cutoff.isoformat(timespec='seconds'),))
+        self.conn.commit()
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def with_label(self, prefix: str, label: Optional[str]) -> str:
+        """
+        custom_id = prefix + etikett, eller prefix + "#<hash>" om den inte får plats
+
+        Etiketter som börjar med "#" hashas alltid så att de inte kan tas
+        för en nyckel.
+        """
+        label = label or ''
+        if len(prefix) + len(label) <= CUSTOM_ID_MAX and not label.startswith(HASH_MARK):
+            return prefix + label
+        key = label_key(label)
+        custom_id = prefix + HASH_MARK + key
+        if len(custom_id) > CUSTOM_ID_MAX:
+            raise ValueError(f"custom_id för långt även med hash: {custom_id!r}")
+        if key not in self.labels:
+            self.labels[key] = label
+            if self.conn:
+                self.conn.execute(
+                    'INSERT OR IGNORE INTO button_labels (key, label, created_at) VALUES (?, ?, ?)',
+                    (key, label, datetime.now(timezone.utc).isoformat(timespec='seconds')),
+                )
+                self.conn.commit()
+        return custom_id
+
+    def resolve(self, text: str) -> Optional[str]:
+        """Etiketten ur custom_id; None om hashen inte längre finns sparad"""
+        if not text.startswith(HASH_MARK):
+            return text
+        key = text[len(HASH_MARK):]
+        if key not in self.labels and self.conn:
+            row = self.conn.execute('SELECT label FROM button_labels WHERE key = ?', (key,)).fetchone()
+            if row:
+                self.labels[key] = row[0]
+        return self.labels.get(key)
@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+KATALOG-SNAPSHOT - Kompakt binärt format med mmap-laddning
+==========================================================
+Exporterar företagskatalogen från SQLite till en versionerad binärfil
+som botten memory-mappar read-only. Att öppna filen kostar bara att läsa
+headern; sidorna delas mellan alla processer på samma maskin via OS:ets
+page cache.
+
+Användning:
+    python catalog_snapshot.py [ai_companies.db] [ai_companies.snapshot]
+
+Filformat (little-endian):
+
+    Header (64 byte)
+        magic         8s   b"AIM25CAT"
+        version       u32
+        section_count u32
+        record_count  u32
+        reserved      u32
+        built_at      u64  (unix-tid)
+        content_hash  16s  (blake2b av alla sektioner)
+        reserved      16s
+    Sektionskatalog (section_count × 32 byte)
+        name 16s, offset u64, length u64
+    Sektioner (8-byte-alignade)
+        ids           u32[record_count]          sorterade företags-ID
+        records       RECORD[record_count]       fasta fält, se RECORD_FORMAT
+        strings       utf-8 bytes                internerade strängar
+        <fam>.names   (u32 off, u32 len)[n]      taggnamn i strängtabellen
+        <fam>.fwd_off u32[record_count + 1]      CSR: företag → taggar
+        <fam>.fwd     u32[...]                   taggindex
+        <fam>.inv_off u32[n + 1]                 CSR: tagg → företag
+        <fam>.inv     u32[...]                   recordindex
+        coords        f32[record_count × 2]      lat, lon (NaN = okänd); saknas
+                                                 i snapshots från äldre databaser
+        loc_conf      f32[record_count]          location_confidence (NaN = från
+                                                 källan); saknas som coords
+
+Taggfamiljer: cap (AI-förmågor), sector, domain, dimension.
+"""
+
+import hashlib
+import math
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from repository.filters import is_daily_eligible, is_praktik
+
+
+MAGIC = b"AIM25CAT"
+VERSION = 1
+
+HEADER_FORMAT = "<8sIIIIQ16s16s"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+SECTION_FORMAT = "<16sQQ"
+SECTION_SIZE = struct.calcsize(SECTION_FORMAT)
+
+# id, kvalitet, flaggor, 2 byte padding, sedan (offset, längd) för textfälten
+STRING_FIELDS = ('name', 'website', 'type', 'logo_url', 'description', 'location_city')
+RECORD_FORMAT = "<IBBxx" + "II" * len(STRING_FIELDS)
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+
+FLAG_GREATER_STOCKHOLM = 1
+FLAG_PRAKTIK = 2          # praktik-relevant typ och har hemsida
+FLAG_DAILY = 4            # uppfyller kraven för daglig post
+
+TAG_FAMILIES = {
+    # familj: (lookup-tabell, junction-tabell, kolumn i junction)
+    'cap': ('ai_capabilities', 'company_ai_capabilities', 'capability_id'),
+    'sector': ('sectors', 'company_sectors', 'sector_id'),
+    'domain': ('domains', 'company_domains', 'domain_id'),
+    'dimension': ('dimensions', 'company_dimensions', 'dimension_id'),
+}
+
+
+class SnapshotError(Exception):
+    """Snapshot-filen saknas, är trasig eller har fel version"""
+
+
+# ==================== EXPORT ====================
+
+def _flags(row: sqlite3.Row) -> int:
+    """Samma definitioner som SQL-filtren i repository/filters.py"""
+    company = dict(row)
+    flags = 0
+    if company['location_greater_stockholm']:
+        flags |= FLAG_GREATER_STOCKHOLM
+    if is_praktik(company):
+        flags |= FLAG_PRAKTIK
+    if is_daily_eligible(company):
+        flags |= FLAG_DAILY
+    return flags
+
+
+class _StringTable:
+    """Internerar strängar så att t.ex. typer och städer bara lagras en gång"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.index: Dict[str, Tuple[int, int]] = {}
+
+    def add(self, value: Optional[str]) -> Tuple[int, int]:
+        if value is None:
+            return (0xFFFFFFFF, 0)
+        ref = self.index.get(value)
+        if ref is None:
+            encoded = value.encode('utf-8')
+            ref = (len(self.buffer), len(encoded))
+            self.buffer.extend(encoded)
+            self.index[value] = ref
+        return ref
+
+
+def write_snapshot(conn: sqlite3.Connection, snapshot_path: str) -> Dict:
+    """
+    Exportera katalogen till en snapshot-fil
+
+    Skrivs till en temporär fil som sedan byter namn atomiskt, så att
+    processer som redan mappat den gamla filen inte påverkas.
+
+    Returns:
+        Statistik (antal företag, filstorlek)
+    """
+    conn.row_factory = sqlite3.Row
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(companies)")}
+    has_coords = {'location_lat', 'location_lon'} <= columns
+    has_confidence = 'location_confidence' in columns
+    coord_columns = "location_lat, location_lon" if has_coords else "NULL AS location_lat, NULL AS location_lon"
+    confidence_column = "location_confidence" if has_confidence else "NULL AS location_confidence"
+    rows = conn.execute(f'''
+        SELECT id, name, website, type, logo_url, description, location_city,
+               location_greater_stockholm, data_quality_score, {coord_columns}, {confidence_column}
+        FROM companies ORDER BY id
+    ''').fetchall()
+
+    strings = _StringTable()
+    ids = array('I')
+    coords = array('f')
+    confidence = array('f')
+    records = bytearray()
+    position: Dict[int, int] = {}
+    for i, row in enumerate(rows):
+        position[row['id']] = i
+        ids.append(row['id'])
+        refs = []
+        for field_name in STRING_FIELDS:
+            refs.extend(strings.add(row[field_name]))
+        quality = max(0, min(int(row['data_quality_score'] or 0), 255))
+        records += struct.pack(RECORD_FORMAT, row['id'], quality, _flags(row), *refs)
+        for value in (row['location_lat'], row['location_lon']):
+            coords.append(math.nan if value is None else value)
+        confidence.append(math.nan if row['location_confidence'] is None else row['location_confidence'])
+
+    sections: List[Tuple[str, bytes]] = [
+        ('ids', ids.tobytes()),
+        ('records', bytes(records)),
+    ]
+
+    for family, (lookup, junction, column) in TAG_FAMILIES.items():
+        tag_rows = conn.execute(f'SELECT id, name FROM {lookup} ORDER BY name').fetchall()
+        tag_index = {tag_id: i for i, (tag_id, _) in enumerate(tag_rows)}
+        names = array('I')
+        for _, name in tag_rows:
+            names.extend(strings.add(name))
+
+        fwd: List[List[int]] = [[] for _ in rows]
+        inv: List[List[int]] = [[] for _ in tag_rows]
+        for company_id, tag_id in conn.execute(
+            f'SELECT company_id, {column} FROM {junction} ORDER BY company_id, {column}'
+        ):
+            if company_id in position and tag_id in tag_index:
+                fwd[position[company_id]].append(tag_index[tag_id])
+                inv[tag_index[tag_id]].append(position[company_id])
+
+        for suffix, lists in (('fwd', fwd), ('inv', inv)):
+            offsets = array('I', [0])
+            targets = array('I')
+            for items in lists:
+                targets.extend(sorted(items))
+                offsets.append(len(targets))
+            sections.append((f'{family}.{suffix}_off', offsets.tobytes()))
+            sections.append((f'{family}.{suffix}', targets.tobytes()))
+        sections.append((f'{family}.names', names.tobytes()))
+
+    sections.insert(2, ('strings', bytes(strings.buffer)))
+    if has_coords:
+        sections.append(('coords', coords.tobytes()))
+    if has_confidence:
+        sections.append(('loc_conf', confidence.tobytes()))
+
+    # Layout: header, katalog, sedan 8-byte-alignade sektioner
+    directory = bytearray()
+    body = bytearray()
+    offset = HEADER_SIZE + SECTION_SIZE * len(sections)
+    offset += (-offset) % 8
+    digest = hashlib.blake2b(digest_size=16)
+    for name, data in sections:
+        directory += struct.pack(SECTION_FORMAT, name.encode('ascii'), offset + len(body), len(data))
+        body += data
+        body += b'\0' * ((-len(body)) % 8)
+        digest.update(name.encode('ascii'))
+        digest.update(data)
+
+    header = struct.pack(
+        HEADER_FORMAT, MAGIC, VERSION, len(sections), len(rows), 0,
+        int(time.time()), digest.digest(), b'\0' * 16,
+    )
+    padding = b'\0' * (offset - HEADER_SIZE - len(directory))
+
+    tmp_path = f"{snapshot_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(directory)
+        f.write(padding)
+        f.write(body)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, snapshot_path)
+
+    return {'companies': len(rows), 'bytes': os.path.getsize(snapshot_path)}
+
+
+def export_snapshot(db_path: str = "ai_companies.db", snapshot_path: str = "ai_companies.snapshot") -> Dict:
+    """Öppna databasen read-only och exportera en snapshot"""
+    conn = sqlite3.connect(Path(db_path).resolve().as_uri() + "?mode=ro", uri=True)
+    try:
+        return write_snapshot(conn, snapshot_path)
+    finally:
+        conn.close()
+
+
+# ==================== LÄSNING (MMAP) ====================
+
+class CatalogSnapshot:
+    """Read-only, memory-mappad vy av en katalog-snapshot"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise SnapshotError(f"Tom snapshot-fil: {path}")
+        self._view = memoryview(self._map)
+
+        if len(self._map) < HEADER_SIZE:
+            self.close()
+            raise SnapshotError(f"För kort snapshot-fil: {path}")
+        (magic, version, section_count, record_count, _,
+         built_at, content_hash, _) = struct.unpack_from(HEADER_FORMAT, self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise SnapshotError(f"Inte en katalog-snapshot: {path}")
+        if version != VERSION:
+            self.close()
+            raise SnapshotError(f"Snapshot-version {version} stöds inte (förväntade {VERSION})")
+
+        self.version = version
+        self.record_count = record_count
+        self.built_at = built_at
+        self.content_hash = content_hash.hex()
+
+        self._sections: Dict[str, memoryview] = {}
+        for i in range(section_count):
+            raw_name, offset, length = struct.unpack_from(
+                SECTION_FORMAT, self._map, HEADER_SIZE + i * SECTION_SIZE
+            )
+            name = raw_name.rstrip(b'\0').decode('ascii')
+            self._sections[name] = self._view[offset:offset + length]
+
+        self._ids = self._u32('ids')
+        self._records = self._sections['records']
+        self._strings = self._sections['strings']
+
+    @classmethod
+    def open(cls, path: str) -> "CatalogSnapshot":
+        if not Path(path).exists():
+            raise SnapshotError(f"Snapshot saknas: {path}")
+        return cls(path)
+
+    def close(self) -> None:
+        """Släpp mappningen (alla memoryviews måste släppas först)"""
+        for view in getattr(self, '_sections', {}).values():
+            view.release()
+        self._sections = {}
+        for attr in ('_ids',):
+            view = getattr(self, attr, None)
+            if isinstance(view, memoryview):
+                view.release()
+        if getattr(self, '_view', None) is not None:
+            self._view.release()
+            self._view = None
+        if getattr(self, '_map', None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __len__(self) -> int:
+        return self.record_count
+
+    # ---------- intern ----------
+
+    def _u32(self, section: str) -> memoryview:
+        return self._sections[section].cast('I')
+
+    def _string(self, offset: int, length: int) -> Optional[str]:
+        if offset == 0xFFFFFFFF:
+            return None
+        return bytes(self._strings[offset:offset + length]).decode('utf-8')
+
+    def _record(self, index: int) -> Tuple:
+        return struct.unpack_from(RECORD_FORMAT, self._records, index * RECORD_SIZE)
+
+    def _tag_name(self, family: str, tag_index: int) -> str:
+        names = self._u32(f'{family}.names')
+        return self._string(names[tag_index * 2], names[tag_index * 2 + 1])
+
+    # ---------- publikt API ----------
+
+    def index_of(self, company_id: int) -> Optional[int]:
+        """Recordindex för ett företags-ID (binärsökning), None om saknas"""
+        i = bisect_left(self._ids, company_id)
+        if i < self.record_count and self._ids[i] == company_id:
+            return i
+        return None
+
+    def flags(self, index: int) -> int:
+        return self._record(index)[2]
+
+    def tags(self, index: int, family: str = 'cap') -> List[str]:
+        """Taggnamn för ett företag (CSR-uppslagning)"""
+        offsets = self._u32(f'{family}.fwd_off')
+        targets = self._u32(f'{family}.fwd')
+        return [self._tag_name(family, t) for t in targets[offsets[index]:offsets[index + 1]]]
+
+    def company_at(self, index: int, tag_limit: int = 5) -> Dict:
+        """Företag som dict (samma nycklar som CompanyRepository.get_company)"""
+        record = self._record(index)
+        company = {'id': record[0], 'data_quality_score': record[1]}
+        for i, field_name in enumerate(STRING_FIELDS):
+            company[field_name] = self._string(record[3 + i * 2], record[4 + i * 2])
+        company['location_greater_stockholm'] = 1 if record[2] & FLAG_GREATER_STOCKHOLM else 0
+        company['location_confidence'] = self._location_confidence(index)
+        company['ai_capabilities'] = self.tags(index, 'cap')[:tag_limit]
+        return company
+
+    def _location_confidence(self, index: int) -> Optional[float]:
+        """enrich_locations.py:s säkerhet, None om platsen kommer från källan"""
+        if 'loc_conf' not in self._sections:
+            return None
+        (value,) = struct.unpack_from('<f', self._sections['loc_conf'], index * 4)
+        return None if math.isnan(value) else round(value, 2)
+
+    def get(self, company_id: int) -> Optional[Dict]:
+        index = self.index_of(company_id)
+        return self.company_at(index) if index is not None else None
+
+    def ids_with_flag(self, flag: int) -> List[int]:
+        """Alla företags-ID med en viss flagga, t.ex. FLAG_DAILY"""
+        return [
+            self._ids[i] for i in range(self.record_count)
+            if self._records[i * RECORD_SIZE + 5] & flag
+        ]
+
+    def tag_names(self, family: str = 'cap') -> List[str]:
+        count = len(self._sections[f'{family}.names']) // 8
+        return [self._tag_name(family, i) for i in range(count)]
+
+    def coordinates(self) -> Iterator[Tuple[int, float, float]]:
+        """(företags-ID, lat, lon) för alla företag med känd position"""
+        if 'coords' not in self._sections:
+            return
+        with self._sections['coords'].cast('f') as coords:
+            for i in range(self.record_count):
+                lat, lon = coords[i * 2], coords[i * 2 + 1]
+                if not math.isnan(lat):
+                    yield self._ids[i], lat, lon
+
+    def companies_with_tag(self, name: str, family: str = 'cap') -> Iterator[int]:
+        """Företags-ID:n som har en viss tagg (omvänd CSR)"""
+        for tag_index, tag_name in enumerate(self.tag_names(family)):
+            if tag_name == name:
+                offsets = self._u32(f'{family}.inv_off')
+                targets = self._u32(f'{family}.inv')
+                for record_index in targets[offsets[tag_index]:offsets[tag_index + 1]]:
+                    yield self._ids[record_index]
+                return
+
+
+def main():
+    """Exportera snapshot från kommandoraden"""
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "ai_companies.db"
+    snapshot_path = sys.argv[2] if len(sys.argv) > 2 else "ai_companies.snapshot"
+    if not Path(db_path).exists():
+        print(f"❌ Databas saknas: {db_path}")
+        sys.exit(1)
+    stats = export_snapshot(db_path, snapshot_path)
+    print(f"✅ Snapshot skriven: {snapshot_path}")
+    print(f"   Företag: {stats['companies']} • Storlek: {stats['bytes'] / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
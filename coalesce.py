@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+COALESCING - Single-flight för heta frågor och rate limit per användare
+=======================================================================
+När dagens post dyker upp kör många samma /sok eller /stad Stockholm inom
+några sekunder. I stället för en databasfråga per anrop delar samtidiga
+anrop med samma normaliserade argument på en och samma beräkning:
+
+    rows = await single_flight.do(("stad", "stockholm"), lambda: asyncio.to_thread(...))
+
+Ett resultat ligger kvar en kort stund (linger) efter att det blivit klart,
+så att anrop som kommer strax efter också delar det. Slumpade urval och
+resultat som kortats av latensbudgeten sparas inte (se `keep`) - de delas
+bara av anrop som väntar medan frågan pågår.
+
+KeyedRateLimiter skyddar databasen mot spam-loopar med en token bucket per
+användare eller server (samma TokenBucket som den utgående kön använder).
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from send_queue import TokenBucket
+
+
+def normalize_args(*args: Any) -> Tuple:
+    """Normalisera argument till en nyckel: strängar trimmas och casefoldas"""
+    return tuple(
+        " ".join(arg.split()).casefold() if isinstance(arg, str) else arg
+        for arg in args
+    )
+
+
+class SingleFlight:
+    """Samtidiga anrop med samma nyckel delar en pågående beräkning"""
+
+    def __init__(self, linger_s: float = 1.0, max_entries: int = 1000):
+        """
+        Args:
+            linger_s: Hur länge ett klart resultat återanvänds
+            max_entries: Max antal sparade resultat innan gamla rensas
+        """
+        self.linger_s = linger_s
+        self.max_entries = max_entries
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._recent: Dict[Hashable, Tuple[float, Any]] = {}
+        self.counters = {'calls': 0, 'executed': 0, 'coalesced': 0}
+
+    async def do(self, key: Hashable, work: Callable[[], Awaitable[Any]],
+                 keep: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Kör `work` om ingen identisk beräkning pågår, annars vänta på den
+
+        Fel sprids till alla som väntar men sparas inte.
+
+        Args:
+            keep: Får resultatet återanvändas under linger? (default: ja)
+        """
+        self.counters['calls'] += 1
+        recent = self._recent.get(key)
+        if recent is not None and time.monotonic() - recent[0] < self.linger_s:
+            self.counters['coalesced'] += 1
+            return recent[1]
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.counters['coalesced'] += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.counters['executed'] += 1
+        try:
+            result = await work()
+        except BaseException as e:
+            if not future.done():
+                future.set_exception(e)
+                # Undvik "exception was never retrieved" om ingen väntade
+                future.exception()
+            raise
+        else:
+            future.set_result(result)
+            if keep is None or keep(result):
+                self._remember(key, result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    def _remember(self, key: Hashable, result: Any) -> None:
+        if self.linger_s <= 0:
+            return
+        now = time.monotonic()
+        if len(self._recent) >= self.max_entries:
+            self._recent = {
+                k: v for k, v in self._recent.items() if now - v[0] < self.linger_s
+            }
+        self._recent[key] = (now, result)
+
+    def metrics(self) -> Dict[str, Any]:
+        calls = self.counters['calls']
+        return {
+            **self.counters,
+            'inflight': len(self._inflight),
+            'coalesce_rate': self.counters['coalesced'] / calls if calls else 0.0,
+        }
+
+
+class KeyedRateLimiter:
+    """Token bucket per nyckel (användare/server): `rate` anrop/sekund, max `burst` i följd"""
+
+    def __init__(self, rate: float = 0.5, burst: float = 5, max_keys: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.buckets: Dict[Hashable, TokenBucket] = {}
+        self.counters = {'allowed': 0, 'rejected': 0}
+
+    def check(self, key: Hashable) -> Optional[float]:
+        """
+        Ta en token för nyckeln
+
+        Returns:
+            None om anropet är tillåtet, annars sekunder att vänta
+        """
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            if len(self.buckets) >= self.max_keys:
+                self.buckets = {k: b for k, b in self.buckets.items() if not b.is_idle()}
+            bucket = TokenBucket(self.rate, self.burst)
+            self.buckets[key] = bucket
+        wait = bucket.try_acquire()
+        if wait:
+            self.counters['rejected'] += 1
+            return wait
+        self.counters['allowed'] += 1
+        return None
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.counters, 'keys': len(self.buckets)}
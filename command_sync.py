@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+KOMMANDO-SYNK - Synka slash-kommandon bara när de ändrats
+=========================================================
+`tree.sync()` är ett HTTP-anrop med hård rate limit och tar tid vid varje
+start. I stället hashas kommandoträdets definition (samma JSON som skickas
+till Discord) och hashen sparas i state-databasen. Synk sker bara om
+hashen skiljer sig från den som senast synkades.
+
+Tvinga synk med FORCE_COMMAND_SYNC=1.
+"""
+
+import hashlib
+import json
+import sqlite3
+from datetime import datetime, timezone
+from typing import Optional
+
+
+def command_tree_hash(tree, guild=None) -> str:
+    """Stabil hash av alla kommandon (namn, beskrivningar, parametrar, rättigheter)"""
+    payload = sorted(
+        (command.to_dict(tree) for command in tree.get_commands(guild=guild)),
+        key=lambda c: (c.get('type', 1), c['name']),
+    )
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class CommandSyncState:
+    """Senast synkade hash per scope, sparad i bot_state.db"""
+
+    def __init__(self, state_path: str = "bot_state.db"):
+        self.state_path = state_path
+        self.conn = None
+
+    def connect(self):
+        self.conn = sqlite3.connect(self.state_path)
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS command_sync (
+            scope TEXT PRIMARY KEY,
+            hash TEXT NOT NULL,
+            synced_at TEXT NOT NULL
+        )
+        ''')
+        self.conn.commit()
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def get(self, scope: str) -> Optional[str]:
+        row = self.conn.execute('SELECT hash FROM command_sync WHERE scope = ?', (scope,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, scope: str, value: str) -> None:
+        self.conn.execute(
+            'INSERT OR REPLACE INTO command_sync (scope, hash, synced_at) VALUES (?, ?, ?)',
+            (scope, value, datetime.now(timezone.utc).isoformat(timespec='seconds')),
+        )
+        self.conn.commit()
+
+
+async def sync_commands(tree, state: CommandSyncState, application_id: int,
+                        guild=None, force: bool = False) -> Optional[int]:
+    """
+    Synka kommandoträdet om definitionen ändrats sedan senaste synk
+
+    Args:
+        tree: Botens CommandTree
+        state: Var senaste hash sparas
+        application_id: Botens ID (olika botar kan dela state-fil)
+        guild: discord.Object för guild-synk, None för global
+        force: Synka oavsett hash
+
+    Returns:
+        Antal synkade kommandon, eller None om synk hoppades över
+    """
+    scope = f"{application_id}:{'global' if guild is None else f'guild:{guild.id}'}"
+    current = command_tree_hash(tree, guild=guild)
+    if not force and state.get(scope) == current:
+        return None
+    synced = await tree.sync(guild=guild)
+    # Spara först efter lyckad synk så att ett fel ger nytt försök nästa start
+    state.set(scope, current)
+    return len(synced)
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+DAGLIG ROTATION - Schema för "Dagens AI-företag"
+================================================
+Förberäknar en slumpad rotation av alla företag som uppfyller kraven för
+daglig post och sparar den i en egen state-databas tillsammans med en
+cursor. Varje daglig post blir då en enda uppslagning på primärnyckel.
+
+- Inget företag upprepas förrän hela rotationen är visad
+- Rotationen överlever omstarter (sparas i SQLite)
+- Katalogen ändras → borttagna företag tas bort och nya slumpas in bland
+  de som inte visats i rundan; redan visade visas inte igen förrän nästa runda
+
+State-databasen hålls separat från ai_companies.db eftersom katalogen
+byggs om från JSON/CSV och då skulle skriva över schemat.
+"""
+
+import sqlite3
+import hashlib
+import random
+from datetime import date
+from typing import Optional, List, Iterable
+
+
+class DailyRotation:
+    """Persistent, omkastad rotation av dagliga företag"""
+
+    def __init__(self, state_path: str = "bot_state.db"):
+        self.state_path = state_path
+        self.conn = None
+
+    def connect(self):
+        """Öppna state-databasen och skapa tabeller vid behov"""
+        self.conn = sqlite3.connect(self.state_path)
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS daily_rotation (
+            position INTEGER PRIMARY KEY,
+            company_id INTEGER NOT NULL
+        )
+        ''')
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS daily_rotation_state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+        ''')
+        self.conn.commit()
+
+    def close(self):
+        """Stäng state-databasen"""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    # ---------- intern state ----------
+
+    def _get_state(self, key: str) -> Optional[str]:
+        row = self.conn.execute(
+            'SELECT value FROM daily_rotation_state WHERE key = ?', (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key: str, value) -> None:
+        self.conn.execute(
+            'INSERT OR REPLACE INTO daily_rotation_state (key, value) VALUES (?, ?)',
+            (key, None if value is None else str(value)),
+        )
+
+    @staticmethod
+    def fingerprint(company_ids: Iterable[int]) -> str:
+        """Stabilt fingeravtryck för mängden kvalificerade företag"""
+        digest = hashlib.sha1()
+        for company_id in sorted(company_ids):
+            digest.update(f"{company_id},".encode())
+        return digest.hexdigest()
+
+    def _reshuffle(self, company_ids: List[int], avoid_first: Optional[int] = None) -> None:
+        """Skriv en ny omkastad rotation och nollställ cursorn"""
+        order = list(company_ids)
+        random.shuffle(order)
+        # Undvik att samma företag visas två dagar i rad över en rotationsgräns
+        if avoid_first is not None and len(order) > 1 and order[0] == avoid_first:
+            swap = random.randrange(1, len(order))
+            order[0], order[swap] = order[swap], order[0]
+
+        self.conn.execute('DELETE FROM daily_rotation')
+        self.conn.executemany(
+            'INSERT INTO daily_rotation (position, company_id) VALUES (?, ?)',
+            enumerate(order),
+        )
+        self._set_state('cursor', 0)
+        self._set_state('length', len(order))
+        self._set_state('fingerprint', self.fingerprint(company_ids))
+
+    def _merge(self, company_ids: List[int]) -> None:
+        """
+        Anpassa pågående runda till en ändrad katalog
+
+        Redan visade företag som finns kvar behåller sina platser före
+        cursorn; ej visade och nya företag slumpas om efter den.
+        """
+        eligible = set(company_ids)
+        cursor = int(self._get_state('cursor') or 0)
+        shown = [row[0] for row in self.conn.execute(
+            'SELECT company_id FROM daily_rotation WHERE position < ? ORDER BY position', (cursor,)
+        ) if row[0] in eligible]
+        shown_set = set(shown)
+        rest = [company_id for company_id in company_ids if company_id not in shown_set]
+        random.shuffle(rest)
+
+        self.conn.execute('DELETE FROM daily_rotation')
+        self.conn.executemany(
+            'INSERT INTO daily_rotation (position, company_id) VALUES (?, ?)',
+            enumerate(shown + rest),
+        )
+        self._set_state('cursor', len(shown))
+        self._set_state('length', len(shown) + len(rest))
+        self._set_state('fingerprint', self.fingerprint(company_ids))
+
+    # ---------- publikt API ----------
+
+    def sync(self, eligible_ids: Iterable[int]) -> bool:
+        """
+        Synka rotationen mot katalogen
+
+        Args:
+            eligible_ids: ID:n för alla företag som kvalificerar för daglig post
+
+        Returns:
+            True om rotationen ändrades
+        """
+        ids = list(dict.fromkeys(eligible_ids))
+        fingerprint = self.fingerprint(ids)
+        if self._get_state('fingerprint') == fingerprint:
+            return False
+        # Samma skrivlås som next_company_id: bara en shard synkar åt gången
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            if self._get_state('fingerprint') == fingerprint:
+                self.conn.commit()
+                return False
+            if int(self._get_state('length') or 0) == 0:
+                last_id = self._get_state('last_company_id')
+                self._reshuffle(ids, avoid_first=int(last_id) if last_id else None)
+            else:
+                self._merge(ids)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return True
+
+    def next_company_id(self, day: Optional[date] = None) -> Optional[int]:
+        """
+        Hämta dagens företag och flytta fram cursorn
+
+        Anrop flera gånger samma dag (t.ex. efter omstart) ger samma företag.
+
+        Args:
+            day: Datum för posten (default: idag)
+        """
+        day_key = (day or date.today()).isoformat()
+        # Skrivlås direkt så att flera bot-processer (shards) som delar
+        # state-databasen inte flyttar fram cursorn samtidigt
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            return self._advance(day_key)
+        except Exception:
+            self.conn.rollback()
+            raise
+
+    def _advance(self, day_key: str) -> Optional[int]:
+        if self._get_state('last_day') == day_key:
+            last_id = self._get_state('last_company_id')
+            self.conn.commit()
+            return int(last_id) if last_id else None
+
+        length = int(self._get_state('length') or 0)
+        if length == 0:
+            self.conn.commit()
+            return None
+
+        cursor = int(self._get_state('cursor') or 0)
+        if cursor >= length:
+            # Rotationen är slut - påbörja en ny runda med samma företag
+            ids = [row[0] for row in self.conn.execute(
+                'SELECT company_id FROM daily_rotation ORDER BY position'
+            )]
+            last_id = self._get_state('last_company_id')
+            self._reshuffle(ids, avoid_first=int(last_id) if last_id else None)
+            cursor = 0
+
+        row = self.conn.execute(
+            'SELECT company_id FROM daily_rotation WHERE position = ?', (cursor,)
+        ).fetchone()
+        company_id = row[0]
+
+        self._set_state('cursor', cursor + 1)
+        self._set_state('last_day', day_key)
+        self._set_state('last_company_id', company_id)
+        self.conn.commit()
+        return company_id
+
+    def skip_current(self) -> None:
+        """Glöm dagens val så att nästa anrop hämtar nästa företag i rotationen"""
+        self._set_state('last_day', None)
+        self.conn.commit()
+
+    def upcoming(self, count: int, day: Optional[date] = None) -> List[int]:
+        """
+        De företag som troligen postas härnäst, utan att flytta cursorn
+
+        Om dagens företag redan valts kommer det först. Används för att
+        förrendera embeds i warmup.
+        """
+        ids = []
+        if self._get_state('last_day') == (day or date.today()).isoformat():
+            ids.append(int(self._get_state('last_company_id')))
+        cursor = int(self._get_state('cursor') or 0)
+        ids.extend(row[0] for row in self.conn.execute(
+            'SELECT company_id FROM daily_rotation WHERE position >= ? ORDER BY position LIMIT ?',
+            (cursor, max(count - len(ids), 0)),
+        ))
+        return ids[:count]
+
+    def remaining(self) -> int:
+        """Antal företag kvar innan rotationen börjar om"""
+        length = int(self._get_state('length') or 0)
+        cursor = int(self._get_state('cursor') or 0)
+        return max(length - cursor, 0)
@@ -10,20 +10,50 @@ Kommandon:
 - /typ <typ> - Filtrera på företagstyp
 - /stad <stad> - Filtrera på stad
 - /stockholm - Företag i Greater Stockholm
+- /nara <plats> [km] - Företag inom en radie
+- /export - Filtrerade företag som CSV/JSONL/Parquet-fil
+- /prenumerera - Daglig posting i en kanal (per server)
+- /avprenumerera - Stäng av daglig posting
+- /botstatus - Interna mätvärden (admin)
 - /help - Visa hjälp
 """
 
+import time
+
+# Starttid för "redo efter X s" i on_ready (sätts innan discord importeras)
+STARTUP_STARTED = time.perf_counter()
+
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
 import sqlite3
-from datetime import datetime, time
+import asyncio
+import functools
+from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
 import sys
 import os
 from pathlib import Path
-import traceback
-from typing import Optional, List, Dict
+from typing import TYPE_CHECKING, Optional, List, Dict, Tuple
+
+from analytics import AnalyticsLog
+from budget import LatencyBudgets, budgeted, mark_trimmed, respond, trim_scope
+from coalesce import SingleFlight, KeyedRateLimiter, normalize_args
+from button_labels import ButtonLabelStore
+from command_sync import CommandSyncState, sync_commands
+from daily_schedule import DailyRotation
+from repository import CompanyRepository, nearby_label, parse_nearby_label
+from send_queue import OutboundQueue, QueueFullError
+from shard_metrics import ShardMetrics, shard_config_from_env
+from subscriptions import (
+    SubscriptionStore, Subscription, fan_out,
+    DEFAULT_POST_TIME, DEFAULT_TIMEZONE,
+)
+
+# Export och warmup importeras där de används; de behövs inte för att starta
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+    from warmup import WarmupReport
 
 # Ladda environment variables (om .env finns)
 try:
@@ -34,300 +64,8 @@ except ImportError:
 
 # ==================== DATABAS-HANTERING ====================
 
-class CompanyDatabase:
-    """Databas-interface för AI-företag"""
-    
-    def __init__(self, db_path: str = "ai_companies.db"):
-        self.db_path = db_path
-        self.conn = None
-        
-    def connect(self):
-        """Anslut till databasen"""
-        try:
-            self.conn = sqlite3.connect(self.db_path)
-            self.conn.row_factory = sqlite3.Row
-            return True
-        except Exception as e:
-            print(f"❌ Kunde inte ansluta till databas: {e}")
-            return False
-    
-    def suggest_types(self, prefix: str = "", limit: int = 25) -> List[str]:
-        """Hämta distinkta företagstyper för autocomplete"""
-        if not self.conn:
-            return []
-        cursor = self.conn.cursor()
-        if prefix:
-            cursor.execute(
-                """
-                SELECT DISTINCT type FROM companies
-                WHERE type IS NOT NULL AND LOWER(type) LIKE LOWER(?)
-                ORDER BY type LIMIT ?
-                """,
-                (f"{prefix}%", limit),
-            )
-        else:
-            cursor.execute(
-                """
-                SELECT DISTINCT type FROM companies
-                WHERE type IS NOT NULL
-                ORDER BY type LIMIT ?
-                """,
-                (limit,),
-            )
-        return [row[0] for row in cursor.fetchall() if row[0]]
-
-    def suggest_cities(self, prefix: str = "", limit: int = 25) -> List[str]:
-        """Hämta distinkta städer för autocomplete"""
-        if not self.conn:
-            return []
-        cursor = self.conn.cursor()
-        if prefix:
-            cursor.execute(
-                """
-                SELECT DISTINCT location_city FROM companies
-                WHERE location_city IS NOT NULL AND LOWER(location_city) LIKE LOWER(?)
-                ORDER BY location_city LIMIT ?
-                """,
-                (f"{prefix}%", limit),
-            )
-        else:
-            cursor.execute(
-                """
-                SELECT DISTINCT location_city FROM companies
-                WHERE location_city IS NOT NULL
-                ORDER BY location_city LIMIT ?
-                """,
-                (limit,),
-            )
-        return [row[0] for row in cursor.fetchall() if row[0]]
-
-    def close(self):
-        """Stäng databas-anslutning"""
-        if self.conn:
-            self.conn.close()
-    
-    def get_random_company(self, only_praktik_relevant: bool = True) -> Optional[Dict]:
-        """
-        Hämta ett slumpmässigt företag
-        
-        Args:
-            only_praktik_relevant: Om True, visa bara praktik-relevanta företag
-        """
-        if not self.conn:
-            return None
-            
-        cursor = self.conn.cursor()
-        
-        where_clause = ""
-        if only_praktik_relevant:
-            where_clause = "WHERE type IN ('corporation', 'startup', 'supplier')"
-        
-        query = f"""
-        SELECT id, name, website, type, logo_url, description, 
-               location_city, location_greater_stockholm
-        FROM companies
-        {where_clause}
-        ORDER BY RANDOM()
-        LIMIT 1
-        """
-        
-        cursor.execute(query)
-        result = cursor.fetchone()
-        
-        if result:
-            company_id = result['id']
-            
-            # Hämta AI-förmågor
-            cursor.execute("""
-                SELECT ac.name 
-                FROM ai_capabilities ac
-                JOIN company_ai_capabilities cac ON ac.id = cac.capability_id
-                WHERE cac.company_id = ?
-                LIMIT 5
-            """, (company_id,))
-            ai_capabilities = [row['name'] for row in cursor.fetchall()]
-            
-            return {
-                'id': result['id'],
-                'name': result['name'],
-                'website': result['website'],
-                'type': result['type'],
-                'logo_url': result['logo_url'],
-                'description': result['description'],
-                'location_city': result['location_city'],
-                'location_greater_stockholm': result['location_greater_stockholm'],
-                'ai_capabilities': ai_capabilities
-            }
-        
-        return None
-
-    def get_random_company_strict(self) -> Optional[Dict]:
-        """Slumpa ett företag som uppfyller minimikraven för daglig post"""
-        if not self.conn:
-            return None
-        cursor = self.conn.cursor()
-        query = """
-        SELECT id, name, website, type, logo_url, description, 
-               location_city, location_greater_stockholm
-        FROM companies
-        WHERE type IN ('corporation','startup','supplier')
-          AND website IS NOT NULL AND TRIM(website) <> ''
-          AND logo_url IS NOT NULL AND TRIM(logo_url) <> ''
-          AND description IS NOT NULL AND TRIM(description) <> ''
-        ORDER BY RANDOM()
-        LIMIT 1
-        """
-        cursor.execute(query)
-        result = cursor.fetchone()
-        if result:
-            company_id = result['id']
-            cursor.execute(
-                """
-                SELECT ac.name 
-                FROM ai_capabilities ac
-                JOIN company_ai_capabilities cac ON ac.id = cac.capability_id
-                WHERE cac.company_id = ?
-                LIMIT 5
-                """,
-                (company_id,),
-            )
-            ai_capabilities = [row['name'] for row in cursor.fetchall()]
-            return {
-                'id': result['id'],
-                'name': result['name'],
-                'website': result['website'],
-                'type': result['type'],
-                'logo_url': result['logo_url'],
-                'description': result['description'],
-                'location_city': result['location_city'],
-                'location_greater_stockholm': result['location_greater_stockholm'],
-                'ai_capabilities': ai_capabilities
-            }
-        return None
-    
-    def search_by_name(self, search_term: str, limit: int = 5) -> List[Dict]:
-        """Sök företag efter namn"""
-        if not self.conn:
-            return []
-            
-        cursor = self.conn.cursor()
-        
-        query = """
-        SELECT id, name, website, type, location_city
-        FROM companies
-        WHERE name LIKE ?
-        ORDER BY name
-        LIMIT ?
-        """
-        
-        cursor.execute(query, (f"%{search_term}%", limit))
-        
-        results = []
-        for row in cursor.fetchall():
-            results.append({
-                'id': row['id'],
-                'name': row['name'],
-                'website': row['website'],
-                'type': row['type'],
-                'location_city': row['location_city']
-            })
-        
-        return results
-    
-    def filter_by_type(self, company_type: str, limit: int = 5) -> List[Dict]:
-        """Filtrera företag på typ"""
-        if not self.conn:
-            return []
-            
-        cursor = self.conn.cursor()
-        
-        query = """
-        SELECT id, name, website, type, description, location_city
-        FROM companies
-        WHERE LOWER(type) = LOWER(?)
-            AND website IS NOT NULL AND TRIM(website) <> ''
-        ORDER BY RANDOM()
-        LIMIT ?
-        """
-        
-        cursor.execute(query, (company_type, limit))
-        
-        results = []
-        for row in cursor.fetchall():
-            results.append({
-                'id': row['id'],
-                'name': row['name'],
-                'website': row['website'],
-                'type': row['type'],
-                'description': row['description'],
-                'location_city': row['location_city']
-            })
-        
-        return results
-    
-    def filter_by_city(self, city: str, limit: int = 10) -> List[Dict]:
-        """Filtrera företag på stad (bara praktik-relevanta)"""
-        if not self.conn:
-            return []
-            
-        cursor = self.conn.cursor()
-        
-        query = """
-        SELECT id, name, website, type, description, location_city
-        FROM companies
-        WHERE location_city LIKE ?
-            AND type IN ('corporation', 'startup', 'supplier')
-            AND website IS NOT NULL AND TRIM(website) <> ''
-        ORDER BY RANDOM()
-        LIMIT ?
-        """
-        
-        cursor.execute(query, (f"%{city}%", limit))
-        
-        results = []
-        for row in cursor.fetchall():
-            results.append({
-                'id': row['id'],
-                'name': row['name'],
-                'website': row['website'],
-                'type': row['type'],
-                'description': row['description'],
-                'location_city': row['location_city']
-            })
-        
-        return results
-    
-    def filter_greater_stockholm(self, limit: int = 10) -> List[Dict]:
-        """Filtrera företag i Greater Stockholm (bara praktik-relevanta)"""
-        if not self.conn:
-            return []
-            
-        cursor = self.conn.cursor()
-        
-        query = """
-        SELECT id, name, website, type, description, location_city
-        FROM companies
-        WHERE location_greater_stockholm = 1
-            AND type IN ('corporation', 'startup', 'supplier')
-            AND website IS NOT NULL AND TRIM(website) <> ''
-        ORDER BY RANDOM()
-        LIMIT ?
-        """
-        
-        cursor.execute(query, (limit,))
-        
-        results = []
-        for row in cursor.fetchall():
-            results.append({
-                'id': row['id'],
-                'name': row['name'],
-                'website': row['website'],
-                'type': row['type'],
-                'description': row['description'],
-                'location_city': row['location_city']
-            })
-        
-        return results
+# Samma läslager som query_database.py (se repository/)
+CompanyDatabase = CompanyRepository
 
 # ==================== DISCORD BOT ====================
 
@@ -336,46 +74,208 @@ intents = discord.Intents.default()
 intents.message_content = True
 intents.guilds = True
 
-bot = commands.Bot(command_prefix=commands.when_mentioned_or('!'), intents=intents, help_command=None)
+# Sharding styrs via SHARD_COUNT / SHARD_IDS / AUTO_SHARD (se shard_metrics.py)
+shard_config = shard_config_from_env()
+if shard_config.sharded:
+    bot = commands.AutoShardedBot(
+        command_prefix=commands.when_mentioned_or('!'), intents=intents, help_command=None,
+        shard_count=shard_config.shard_count, shard_ids=shard_config.shard_ids,
+    )
+else:
+    bot = commands.Bot(command_prefix=commands.when_mentioned_or('!'), intents=intents, help_command=None)
+
+# Mätvärden för de shards som körs i den här processen
+shard_metrics = ShardMetrics()
 
 # Global databas-instans
 db = CompanyDatabase()
 
-@bot.event
-async def on_ready():
-    """Körs när botten är klar"""
-    print(f'\n✅ {bot.user} är nu online!')
-    print(f'📊 Ansluten till {len(bot.guilds)} server(s)')
-    
+# Förberäknad rotation och prenumerationer för daglig posting (egen state-databas)
+rotation = DailyRotation()
+subscriptions = SubscriptionStore()
+command_sync_state = CommandSyncState()
+button_labels = ButtonLabelStore()
+# Warmup i bakgrunden (se warm_caches) och förrenderade dagliga embeds
+warmup_task: Optional[asyncio.Task] = None
+warmup_report: Optional['WarmupReport'] = None
+daily_embed_cache: Dict[Tuple[int, str], discord.Embed] = {}
+
+# Latensbudget för slash-kommandon (se budget.py)
+budgets = LatencyBudgets(
+    budget_ms=float(os.getenv('COMMAND_BUDGET_MS', '2000')),
+    defer_threshold_ms=float(os.getenv('COMMAND_DEFER_MS', '1000')),
+)
+# Samtidiga identiska sökningar delar en fråga; rate limit per användare och server
+single_flight = SingleFlight(linger_s=float(os.getenv('COALESCE_LINGER_S', '2')))
+user_limiter = KeyedRateLimiter(
+    rate=float(os.getenv('USER_RATE_PER_S', '0.5')),
+    burst=float(os.getenv('USER_RATE_BURST', '5')),
+)
+guild_limiter = KeyedRateLimiter(
+    rate=float(os.getenv('GUILD_RATE_PER_S', '5')),
+    burst=float(os.getenv('GUILD_RATE_BURST', '30')),
+)
+# Central kö för utgående DMs och kanalposter (rate limits + backpressure)
+send_queue = OutboundQueue(max_depth=int(os.getenv('SEND_QUEUE_MAX_DEPTH', '1000')))
+# Kommandon och DM-klick, skrivs i bakgrunden till en egen fil (se analytics.py)
+analytics = AnalyticsLog(None)
+ANALYTICS_FLUSH_S = float(os.getenv('ANALYTICS_FLUSH_S', '10'))
+
+async def setup_hook():
+    """
+    Engångsinitiering per process
+
+    Körs av discord.py en gång efter login och före gateway-anslutningen.
+    Allt som bara ska göras en gång (databas, prenumerationer, schema,
+    kommandosynk) ligger här i stället för i on_ready, som körs igen vid
+    varje återanslutning.
+    """
+    shard_metrics.setup_runs += 1
+
     # Anslut till databas
-    if db.connect():
-        print(f'✅ Ansluten till databas: {db.db_path}')
+    if await asyncio.to_thread(db.connect):
+        print(f'✅ Ansluten till databas: {db.db_path or "PostgreSQL"}')
     else:
         print(f'❌ Kunde inte ansluta till databas!')
         print(f'⚠️  Se till att ai_companies.db finns i samma mapp')
-    
-    # Starta daglig posting (om aktiverad)
-    if not daily_company.is_running():
-        daily_company.start()
-        print('✅ Daglig "Dagens AI-företag" är aktiv')
-    
-    # Synca slash-kommandon (snabbt till en specifik guild om GUILD_ID finns)
+
+    # Prenumerationer för daglig posting
+    try:
+        subscriptions.connect()
+        await register_legacy_channel()
+        print(f'✅ {len(subscriptions.list_subscriptions())} kanal(er) prenumererar på daglig posting')
+    except sqlite3.Error as e:
+        print(f'❌ Kunde inte öppna prenumerationer ({subscriptions.state_path}): {e}')
+
+    # Långa söktermer i knapparnas custom_id (button_labels.py)
+    try:
+        button_labels.connect()
+    except sqlite3.Error as e:
+        print(f'⚠️ Kunde inte öppna knappetiketter ({button_labels.state_path}): {e}')
+
+    # Analyslogg i egen fil; skrivs i batcher av flush_analytics
+    if analytics.enabled:
+        try:
+            analytics.connect()
+            flush_analytics.start()
+        except sqlite3.Error as e:
+            print(f'⚠️ Kunde inte öppna analysloggen ({analytics.path}): {e}')
+
+    # Starta daglig posting (väntar själv på wait_until_ready)
+    daily_company.start()
+    print('✅ Daglig "Dagens AI-företag" är aktiv')
+
+    # Byt till ny katalog när den publicerats (publish.py)
+    if CATALOG_RELOAD_S > 0:
+        reload_catalog.start()
+
+    # Synka slash-kommandon bara om definitionen ändrats sedan senaste synk
     try:
         guild_id = os.getenv('GUILD_ID')
-        if guild_id:
-            guild = discord.Object(id=int(guild_id))
+        guild = discord.Object(id=int(guild_id)) if guild_id else None
+        if guild:
             bot.tree.copy_global_to(guild=guild)
-            synced = await bot.tree.sync(guild=guild)
-            print(f'✅ Slash-kommandon synkade till guild {guild_id}: {len(synced)} st')
+        command_sync_state.connect()
+        force = os.getenv('FORCE_COMMAND_SYNC', '').lower() in ('1', 'true', 'yes', 'ja')
+        synced = await sync_commands(bot.tree, command_sync_state, bot.application_id, guild=guild, force=force)
+        if synced is None:
+            print('✅ Slash-kommandon oförändrade - ingen synk behövs')
+        elif guild:
+            print(f'✅ Slash-kommandon synkade till guild {guild_id}: {synced} st')
         else:
-            synced = await bot.tree.sync()
-            print(f'✅ Globala slash-kommandon synkade: {len(synced)} st (kan ta upp till 1h att dyka upp)')
+            print(f'✅ Globala slash-kommandon synkade: {synced} st (kan ta upp till 1h att dyka upp)')
     except Exception as e:
         print(f'❌ Kunde inte synka slash-kommandon: {e}')
-    
+
+    # Förvärm cacher i bakgrunden medan gateway-anslutningen sätts upp
+    start_warmup()
+
+bot.setup_hook = setup_hook
+
+
+@bot.event
+async def on_ready():
+    """Körs när gateway-sessionen är klar - vid start och efter varje ny session"""
+    shard_metrics.ready_events += 1
+    if not shard_config.sharded:
+        shard_metrics.on_ready(None)
+
+    if shard_metrics.ready_events > 1:
+        # Återanslutning: cache och kommandon finns redan, inget att göra om
+        print(f'🔁 Ny gateway-session ({len(bot.guilds)} server(s))')
+        return
+
+    print(f'\n✅ {bot.user} är nu online!')
+    print(f'📊 Ansluten till {len(bot.guilds)} server(s) ({shard_config.describe()})')
+    print(f'⏱️  Redo {time.perf_counter() - STARTUP_STARTED:.1f} s efter start')
     print(f'\n🤖 Bot är redo att användas!')
     print(f'💡 Använd /help för att se kommandon\n')
 
+# ---------- Shard-händelser (mätvärden per shard) ----------
+
+@bot.event
+async def on_shard_connect(shard_id: int):
+    shard_metrics.on_connect(shard_id)
+
+@bot.event
+async def on_shard_ready(shard_id: int):
+    shard_metrics.on_ready(shard_id)
+    print(f'✅ Shard {shard_id} redo')
+
+@bot.event
+async def on_shard_disconnect(shard_id: int):
+    shard_metrics.on_disconnect(shard_id)
+
+@bot.event
+async def on_shard_resumed(shard_id: int):
+    shard_metrics.on_resumed(shard_id)
+
+@bot.event
+async def on_connect():
+    if not shard_config.sharded:
+        shard_metrics.on_connect(None)
+
+@bot.event
+async def on_disconnect():
+    if not shard_config.sharded:
+        shard_metrics.on_disconnect(None)
+
+@bot.event
+async def on_resumed():
+    if not shard_config.sharded:
+        shard_metrics.on_resumed(None)
+
+def interaction_shard_id(interaction: discord.Interaction) -> int:
+    return interaction.guild.shard_id if interaction.guild else 0
+
+def record_interaction(interaction: discord.Interaction, command_name: str, ok: bool = True) -> None:
+    """Kommandot, dess argument och visade företag (interaction.extras['result_ids']) till analysloggen"""
+    analytics.record_command(
+        command_name, dict(interaction.namespace), interaction.extras.get('result_ids', ()),
+        user_id=interaction.user.id, guild_id=interaction.guild_id, ok=ok,
+    )
+
+@bot.event
+async def on_app_command_completion(interaction: discord.Interaction, command):
+    shard_metrics.on_command(interaction_shard_id(interaction), command.name)
+    record_interaction(interaction, command.name)
+    if shard_metrics.first_command_ms is None:
+        elapsed = datetime.now(timezone.utc) - interaction.created_at
+        shard_metrics.first_command_ms = elapsed.total_seconds() * 1000
+        print(f'⏱️  Första kommandot (/{command.name}) tog {shard_metrics.first_command_ms:.0f} ms')
+
+def shard_status() -> List[Dict]:
+    """Mätvärden per shard för den här processen"""
+    if shard_config.sharded:
+        latencies = dict(bot.latencies)
+    else:
+        latencies = {0: bot.latency}
+    guild_counts: Dict[int, int] = {}
+    for guild in bot.guilds:
+        guild_counts[guild.shard_id] = guild_counts.get(guild.shard_id, 0) + 1
+    return shard_metrics.snapshot(latencies, guild_counts)
+
+
 @bot.event
 async def on_command_error(ctx, error):
     """Hantera fel i kommandon"""
@@ -386,122 +286,481 @@ async def on_command_error(ctx, error):
     else:
         await ctx.send(f"❌ Ett fel uppstod: {str(error)}")
         print(f"Fel: {error}")
+        import traceback
         traceback.print_exception(type(error), error, error.__traceback__)
 
 
-# ==================== UI HELPERS (PAGINERING) ====================
-class PagedResultsView(discord.ui.View):
-    def __init__(self, pages: List[List[Dict]], title: str, make_field_line, user_id: int, color: discord.Color = discord.Color.blurple()):
-        super().__init__(timeout=604800)
-        self.pages = pages
-        self.index = 0
-        self.title = title
-        self.make_field_line = make_field_line
-        self.user_id = user_id
-        self.color = color
-
-    def _embed_for_page(self):
-        embed = discord.Embed(title=self.title, description=f"Sida {self.index+1}/{len(self.pages)}", color=self.color)
-        for company in self.pages[self.index]:
-            name = company['name'] + (f" - {company['location_city']}" if company.get('location_city') else "")
-            url = company['website'] or "(saknar hemsida)"
-            value = self.make_field_line(company, url)
-            embed.add_field(name=name, value=value, inline=False)
-        return embed
+# ==================== UTGÅENDE KÖ (DMs) ====================
 
-    async def update_message(self, interaction: discord.Interaction):
-        await interaction.response.edit_message(embed=self._embed_for_page(), view=self)
+DM_FORBIDDEN_MESSAGE = "❌ Jag kan inte skicka DM till dig. Aktivera DMs från servermedlemmar i dina inställningar."
 
-    @discord.ui.button(label="◀ Föregående", style=discord.ButtonStyle.secondary)
-    async def prev_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if interaction.user.id != self.user_id:
-            await interaction.response.send_message("Endast den som startade kommandot kan bläddra.", ephemeral=True)
+
+async def queue_dm(interaction: discord.Interaction, embed: discord.Embed, confirmation: str, coalesce_key=None,
+                   source: str = 'dm', company_ids: List[int] = ()):
+    """
+    Kvittera klicket direkt och lägg själva DM:et i den utgående kön
+
+    Misslyckas DM:et (t.ex. stängda DMs) får användaren ett ephemeral
+    uppföljningsmeddelande i efterhand. Klicket loggas i analysloggen med
+    source (kommandot knappen hör till) och företagen som skickas.
+    """
+    user = interaction.user
+    try:
+        future = send_queue.submit(
+            f"dm:{user.id}",
+            lambda: user.send(embed=embed),
+            coalesce_key=coalesce_key,
+        )
+    except QueueFullError:
+        await interaction.response.send_message("⏳ Många skickar just nu – försök igen om en stund.", ephemeral=True)
+        return
+
+    await interaction.response.send_message(confirmation, ephemeral=True)
+    analytics.record_dm(source, company_ids, user_id=user.id, guild_id=interaction.guild_id)
+
+    def on_done(fut: asyncio.Future):
+        if fut.cancelled():
             return
-        if self.index > 0:
-            self.index -= 1
-            await self.update_message(interaction)
-        else:
-            await interaction.response.defer()
+        error = fut.exception()
+        if error is None:
+            return
+        message = DM_FORBIDDEN_MESSAGE if isinstance(error, discord.Forbidden) else f"❌ Kunde inte skicka DM: {error}"
+        asyncio.create_task(interaction.followup.send(message, ephemeral=True))
 
-    @discord.ui.button(label="Nästa ▶", style=discord.ButtonStyle.primary)
-    async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if interaction.user.id != self.user_id:
-            await interaction.response.send_message("Endast den som startade kommandot kan bläddra.", ephemeral=True)
+    future.add_done_callback(on_done)
+
+
+# ==================== EMBED-RENDERING ====================
+
+RESULT_KINDS = ('sok', 'typ', 'stad', 'sthlm', 'nara')
+PAGE_SIZE = 5
+
+
+def truncate_description(company: Dict, max_len: int = 500) -> str:
+    description = company.get('description') or ''
+    return description[:max_len] + "..." if len(description) > max_len else description
+
+
+def build_company_embed(company: Dict, daily: bool = False, day: Optional[str] = None) -> discord.Embed:
+    """
+    Rendera embed för ett enskilt företag
+
+    Args:
+        company: Företag från get_company()
+        daily: True för den schemalagda posten, False för /dagens
+        day: Datum (YYYY-MM-DD) i sidfoten, default idag
+    """
+    day = day or datetime.now().strftime('%Y-%m-%d')
+    embed = discord.Embed(
+        title=f"🌅 Dagens AI-företag: {company['name']}" if daily else f"🏢 {company['name']}",
+        url=company['website'] if company['website'] else None,
+        description=truncate_description(company),
+        color=discord.Color.gold() if daily else discord.Color.green()
+    )
+    if company.get('website'):
+        embed.add_field(name="🌐 Hemsida", value=company['website'], inline=False)
+    if company.get('location_city'):
+        location = company['location_city']
+        if company.get('location_greater_stockholm'):
+            location += " (Greater Stockholm)"
+        if company.get('location_confidence') is not None:
+            # Hittad i beskrivningen (enrich_locations.py), inte angiven av källan
+            location += " · uppskattad"
+        embed.add_field(name="📍 Plats", value=location, inline=True)
+    embed.add_field(name="📊 Typ", value=company['type'].capitalize(), inline=True)
+    if company.get('ai_capabilities'):
+        ai_caps = ', '.join(company['ai_capabilities'][:3])
+        embed.add_field(name="🤖 AI-förmågor", value=ai_caps, inline=False)
+    if company.get('logo_url'):
+        embed.set_thumbnail(url=company['logo_url'])
+    if daily:
+        embed.set_footer(text=f"Dagens AI-företag • {day} • Använd /help för fler kommandon\nDetta är ett AI-genererat meddelande, dubbelkolla alltid viktig fakta")
+    else:
+        embed.set_footer(text=f"Dagens AI-företag • {day}\nDetta är ett AI-genererat meddelande, dubbelkolla alltid viktig fakta")
+    return embed
+
+
+def _short_description(company: Dict) -> str:
+    desc = (company.get('description') or '')
+    return (desc[:250] + '...') if desc else ''
+
+
+def build_results_embed(kind: str, label: str, results: List[Dict]) -> discord.Embed:
+    """Rendera resultatlistan för /sok, /typ, /stad och /stockholm"""
+    if kind == 'sok':
+        embed = discord.Embed(
+            title=f"🔍 Sökresultat för '{label}'",
+            description=f"Hittade {len(results)} företag",
+            color=discord.Color.blue()
+        )
+        for i, company in enumerate(results, 1):
+            location = f" - {company['location_city']}" if company.get('location_city') else ""
+            website = company['website'] if company['website'] else "(saknar hemsida)"
+            value = f"{website}{location}\nTyp: {company['type']}"
+            embed.add_field(name=f"{i}. {company['name']}", value=value, inline=False)
+        return embed
+
+    if kind == 'typ':
+        embed = discord.Embed(
+            title=f"🏢 {label.capitalize()} (5 slumpade)",
+            description="Visar ett slumpvist urval av 5 företag som har hemsida.",
+            color=discord.Color.purple()
+        )
+        for i, c in enumerate(results, 1):
+            city = f" – {c['location_city']}" if c.get('location_city') else ""
+            embed.add_field(
+                name=f"{i}. {c['name']}{city}",
+                value=f"{c['website']}\n{_short_description(c)}\nTyp: {c['type']}\n\n\n",
+                inline=False
+            )
+    elif kind == 'stad':
+        embed = discord.Embed(
+            title=f"📍 AI-företag i {label} (5 slumpade)",
+            description="Visar ett slumpvist urval av 5 företag som har hemsida.",
+            color=discord.Color.orange()
+        )
+        for i, c in enumerate(results, 1):
+            embed.add_field(
+                name=f"{i}. {c['name']}",
+                value=f"{c['website']}\n{_short_description(c)}\nTyp: {c['type']}\n\n",
+                inline=False
+            )
+    else:
+        embed = discord.Embed(
+            title="🏙️ AI-företag i Greater Stockholm (5 slumpade)",
+            description="Visar ett slumpvist urval av 5 företag som har hemsida.",
+            color=discord.Color.teal()
+        )
+        for i, c in enumerate(results, 1):
+            city = c.get('location_city') or 'Stockholm'
+            embed.add_field(
+                name=f"{i}. {c['name']} ({c['type']})",
+                value=f"📍 {city}\n{c['website']}\n{_short_description(c)}\n\n",
+                inline=False
+            )
+
+    embed.set_footer(text="Tips: Kör kommandot igen för ett nytt slumpurval.")
+    return embed
+
+
+def _page_title(kind: str, label: str) -> str:
+    if kind == 'nara':
+        place, radius_km = parse_nearby_label(label)
+        return f"📡 AI-företag inom {radius_km:g} km från {place}"
+    return {
+        'sok': f"🔍 Sökresultat för '{label}'",
+        'typ': f"🏢 {label.capitalize()}",
+        'stad': f"📍 AI-företag i {label}",
+        'sthlm': "🏙️ AI-företag i Greater Stockholm",
+    }[kind]
+
+
+def build_page_embed(kind: str, label: str, rows: List[Dict], page: int) -> discord.Embed:
+    """Rendera en sida i bläddringsläget"""
+    embed = discord.Embed(
+        title=_page_title(kind, label),
+        description=f"Sida {page+1}" if rows else f"Sida {page+1} – inga fler träffar",
+        color=discord.Color.blurple()
+    )
+    for company in rows:
+        name = company['name'] + (f" - {company['location_city']}" if company.get('location_city') else "")
+        if 'distance_km' in company:
+            name += f" ({company['distance_km']:.0f} km)"
+        url = company['website'] or "(saknar hemsida)"
+        desc = _short_description(company)
+        embed.add_field(name=name, value=f"{url}\n{desc}\nTyp: {company['type']}", inline=False)
+    return embed
+
+
+async def render_page(kind: str, label: str, page: int, cursor: Optional[Tuple[int, int]] = None,
+                      direction: str = 'next'):
+    """
+    Hämta och rendera en sida med keyset-paginering
+
+    Returns:
+        (embed, rader, finns_nästa_sida)
+    """
+    rows, has_more = await db.run('browse_page', kind, label, cursor, direction, PAGE_SIZE)
+    # Bakåt kom vi från en senare sida, så det finns alltid en nästa
+    has_next = True if direction == 'prev' else has_more
+    return build_page_embed(kind, label, rows, page), rows, has_next
+
+
+# ==================== UI HELPERS (PERSISTENTA KNAPPAR) ====================
+#
+# Knapparna lagrar inget innehåll i minnet. Allt som behövs för att återskapa
+# meddelandet (företags-ID, sökterm, sida) kodas i knappens custom_id och
+# innehållet hämtas på nytt ur databasen vid klick. Vyerna har ingen timeout
+# och fortsätter fungera efter omstart (se bot.add_dynamic_items nedan).
+# Söktermer som inte får plats i custom_id sparas i state-databasen
+# (button_labels.py) och knappen bär bara en hash.
+
+KIND_PATTERN = '|'.join(RESULT_KINDS)
+EXPIRED_LABEL_MESSAGE = "⌛ Sökningen är för gammal för att visas igen. Kör kommandot på nytt."
+
+
+def _with_label(prefix: str, label: Optional[str]) -> str:
+    """Lägg till fri text sist i ett custom_id (hash om den inte får plats)"""
+    return button_labels.with_label(prefix, label)
+
+
+class CompanyDMButton(discord.ui.DynamicItem[discord.ui.Button],
+                      template=r'aim25:dm:c:(?P<style>[dp]):(?P<day>[0-9]{8}):(?P<company_id>[0-9]+)'):
+    """DM-knapp för ett enskilt företag (/dagens och den schemalagda posten)"""
+
+    def __init__(self, company_id: int, daily: bool, day: str):
+        self.company_id = company_id
+        self.daily = daily
+        self.day = day
+        style = 'p' if daily else 'd'
+        super().__init__(discord.ui.Button(
+            label="💌 Skicka till mina DMs",
+            style=discord.ButtonStyle.success,
+            custom_id=f"aim25:dm:c:{style}:{day.replace('-', '')}:{company_id}",
+        ))
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        day = match['day']
+        return cls(int(match['company_id']), match['style'] == 'p', f"{day[:4]}-{day[4:6]}-{day[6:]}")
+
+    async def callback(self, interaction: discord.Interaction):
+        company = await db.run('get_company', self.company_id)
+        if not company:
+            await interaction.response.send_message("❌ Företaget finns inte längre i databasen.", ephemeral=True)
             return
-        if self.index < len(self.pages) - 1:
-            self.index += 1
-            await self.update_message(interaction)
-        else:
-            await interaction.response.defer()
+        message_id = interaction.message.id if interaction.message else None
+        await queue_dm(
+            interaction, build_company_embed(company, daily=self.daily, day=self.day),
+            "📬 Jag skickar detta till dina DMs.",
+            coalesce_key=(interaction.user.id, message_id),
+            source='post' if self.daily else 'dagens', company_ids=[self.company_id],
+        )
+
+
+class ResultsDMButton(discord.ui.DynamicItem[discord.ui.Button],
+                      template=rf'aim25:dm:r:(?P<kind>{KIND_PATTERN}):(?P<user_id>[0-9]+):(?P<ids>[0-9,]*):(?P<label>.*)'):
+    """DM-knapp för en resultatlista (/sok, /typ, /stad, /stockholm)"""
 
-    @discord.ui.button(label="💌 Skicka till mina DMs", style=discord.ButtonStyle.success)
-    async def send_to_dm(self, interaction: discord.Interaction, button: discord.ui.Button):
+    def __init__(self, kind: str, label: str, user_id: int, company_ids: List[int]):
+        self.kind = kind
+        self.label = label
+        self.user_id = user_id
+        self.company_ids = company_ids
+        ids = ','.join(str(i) for i in company_ids)
+        super().__init__(discord.ui.Button(
+            label="💌 Skicka till mina DMs",
+            style=discord.ButtonStyle.success,
+            custom_id=_with_label(f"aim25:dm:r:{kind}:{user_id}:{ids}:", label),
+        ))
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        ids = [int(i) for i in match['ids'].split(',') if i]
+        return cls(match['kind'], button_labels.resolve(match['label']), int(match['user_id']), ids)
+
+    async def callback(self, interaction: discord.Interaction):
         if interaction.user.id != self.user_id:
             await interaction.response.send_message("Endast den som startade kommandot kan skicka detta till DMs.", ephemeral=True)
             return
-        try:
-            await interaction.user.send(embed=self._embed_for_page())
-            await interaction.response.send_message("✅ Skickade denna sida till dina DMs.", ephemeral=True)
-        except discord.Forbidden:
-            await interaction.response.send_message("❌ Jag kan inte skicka DM till dig. Aktivera DMs från servermedlemmar i dina inställningar.", ephemeral=True)
+        if self.label is None:
+            await interaction.response.send_message(EXPIRED_LABEL_MESSAGE, ephemeral=True)
+            return
+        results = await db.run('get_companies', self.company_ids)
+        message_id = interaction.message.id if interaction.message else None
+        await queue_dm(
+            interaction, build_results_embed(self.kind, self.label, results),
+            "📬 Skickar till dina DMs.",
+            coalesce_key=(interaction.user.id, message_id),
+            source=self.kind, company_ids=[c['id'] for c in results],
+        )
 
 
+class PageButton(discord.ui.DynamicItem[discord.ui.Button],
+                 template=rf'aim25:pg:(?P<action>prev|next|dm):(?P<kind>{KIND_PATTERN}):(?P<user_id>[0-9]+):(?P<page>[0-9]+):(?P<score>-?[0-9]+):(?P<cid>[0-9]+):(?P<label>.*)'):
+    """
+    Bläddra/DM-knapp i bläddringsläget
 
-class SaveToDMView(discord.ui.View):
-    def __init__(self, embed: discord.Embed, user_id: int):
-        super().__init__(timeout=604800)
-        self.embed = embed
+    custom_id bär sidnumret knappen leder till och keyset-cursorn
+    (data_quality_score, id) för kantraden på nuvarande sida.
+    """
+
+    ACTIONS = {
+        # action: (knapptext, stil, riktning för browse_page)
+        'prev': ("◀ Föregående", discord.ButtonStyle.secondary, 'prev'),
+        'next': ("Nästa ▶", discord.ButtonStyle.primary, 'next'),
+        'dm': ("💌 Skicka till mina DMs", discord.ButtonStyle.success, 'from'),
+    }
+
+    def __init__(self, action: str, kind: str, label: str, user_id: int, page: int,
+                 cursor: Tuple[int, int], disabled: bool = False):
+        self.action = action
+        self.kind = kind
+        self.label = label
         self.user_id = user_id
+        self.page = page
+        self.cursor = cursor
+        text, style, _ = self.ACTIONS[action]
+        super().__init__(discord.ui.Button(
+            label=text,
+            style=style,
+            disabled=disabled,
+            custom_id=_with_label(
+                f"aim25:pg:{action}:{kind}:{user_id}:{page}:{cursor[0]}:{cursor[1]}:", label
+            ),
+        ))
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(
+            match['action'], match['kind'], button_labels.resolve(match['label']), int(match['user_id']),
+            int(match['page']), (int(match['score']), int(match['cid'])),
+        )
 
-    @discord.ui.button(label="💌 Skicka till mina DMs", style=discord.ButtonStyle.success)
-    async def send_dm(self, interaction: discord.Interaction, button: discord.ui.Button):
+    async def callback(self, interaction: discord.Interaction):
         if interaction.user.id != self.user_id:
-            await interaction.response.send_message("Endast den som startade kommandot kan skicka detta till DMs.", ephemeral=True)
+            verb = "skicka detta till DMs" if self.action == 'dm' else "bläddra"
+            await interaction.response.send_message(f"Endast den som startade kommandot kan {verb}.", ephemeral=True)
             return
-        try:
-            await interaction.user.send(embed=self.embed)
-            await interaction.response.send_message("✅ Skickade till dina DMs.", ephemeral=True)
-        except discord.Forbidden:
-            await interaction.response.send_message("❌ Jag kan inte skicka DM till dig. Aktivera DMs från servermedlemmar i dina inställningar.", ephemeral=True)
+        if self.label is None:
+            await interaction.response.send_message(EXPIRED_LABEL_MESSAGE, ephemeral=True)
+            return
+        direction = self.ACTIONS[self.action][2]
+        embed, rows, has_next = await render_page(self.kind, self.label, self.page, self.cursor, direction)
+        if self.action == 'dm':
+            message_id = interaction.message.id if interaction.message else None
+            await queue_dm(
+                interaction, embed, "📬 Skickar denna sida till dina DMs.",
+                coalesce_key=(interaction.user.id, message_id, self.page),
+                source=self.kind, company_ids=[row['id'] for row in rows],
+            )
+            return
+        view = PagedResultsView(self.kind, self.label, self.user_id, self.page, rows, has_next)
+        await interaction.response.edit_message(embed=embed, view=view)
+
+
+def _row_cursor(row: Dict) -> Tuple[int, int]:
+    """Keyset-nyckeln för en rad: (kvalitet, id), för /nara (avstånd i meter, id)"""
+    if 'distance_km' in row:
+        return round(row['distance_km'] * 1000), row['id']
+    return row['data_quality_score'] or 0, row['id']
+
+
+class PagedResultsView(discord.ui.View):
+    """Persistent bläddringsvy - håller bara cursorn, varje sida hämtas lazy"""
+
+    def __init__(self, kind: str, label: str, user_id: int, page: int, rows: List[Dict], has_next: bool):
+        super().__init__(timeout=None)
+        first = _row_cursor(rows[0]) if rows else (0, 0)
+        last = _row_cursor(rows[-1]) if rows else (0, 0)
+        self.add_item(PageButton('prev', kind, label, user_id, max(page - 1, 0), first,
+                                 disabled=page <= 0 or not rows))
+        self.add_item(PageButton('next', kind, label, user_id, page + 1, last,
+                                 disabled=not has_next or not rows))
+        self.add_item(PageButton('dm', kind, label, user_id, page, first, disabled=not rows))
+
+
+class SaveToDMView(discord.ui.View):
+    """Persistent DM-knapp för en resultatlista (endast den som körde kommandot)"""
+
+    def __init__(self, kind: str, label: str, results: List[Dict], user_id: int):
+        super().__init__(timeout=None)
+        self.add_item(ResultsDMButton(kind, label, user_id, [c['id'] for c in results]))
 
 
 # --- Public DM button for embeds (for /dagens and daily post) ---
 class DMEmbedForAnyoneView(discord.ui.View):
-    """Knapp som skickar ett givet embed till den klickande användarens DMs.
+    """Knapp som skickar ett företag till den klickande användarens DMs.
     Används för publika meddelanden som /dagens och den schemalagda posten.
     """
-    def __init__(self, embed: discord.Embed):
-        super().__init__(timeout=604800)
-        self.embed = embed
+    def __init__(self, company_id: int, daily: bool = False, day: Optional[str] = None):
+        super().__init__(timeout=None)
+        self.add_item(CompanyDMButton(company_id, daily, day or datetime.now().strftime('%Y-%m-%d')))
 
-    @discord.ui.button(label="💌 Skicka till mina DMs", style=discord.ButtonStyle.success)
-    async def send_dm(self, interaction: discord.Interaction, button: discord.ui.Button):
-        try:
-            await interaction.user.send(embed=self.embed)
-            await interaction.response.send_message("✅ Jag skickade detta till dina DMs.", ephemeral=True)
-        except discord.Forbidden:
-            await interaction.response.send_message(
-                "❌ Jag kan inte skicka DM till dig. Aktivera DMs från servermedlemmar i dina inställningar.",
-                ephemeral=True
-            )
+
+# Registrera knapparna så att klick på gamla meddelanden hanteras efter omstart
+bot.add_dynamic_items(CompanyDMButton, ResultsDMButton, PageButton)
+
+
+async def send_browse(interaction: discord.Interaction, kind: str, label: str, empty_message: str):
+    """Starta bläddringsläget på första sidan"""
+    embed, rows, has_next = await render_page(kind, label, 0)
+    if not rows:
+        await respond(interaction, empty_message, ephemeral=True)
+        return
+    interaction.extras['result_ids'] = [row['id'] for row in rows]
+    view = PagedResultsView(kind, label, interaction.user.id, 0, rows, has_next)
+    await respond(interaction, embed=embed, view=view, ephemeral=True)
+
+
+# ==================== COALESCING / RATE LIMIT ====================
+
+# Slumpade urval ("kör igen för nytt urval") delas bara medan frågan pågår
+RANDOM_SAMPLE_METHODS = frozenset({'filter_by_type', 'filter_by_city', 'filter_greater_stockholm'})
+
+
+async def query(method: str, *args):
+    """
+    Kör en sökmetod på databasen via single-flight
+
+    Samtidiga anrop med samma metod och normaliserade argument delar på en
+    fråga, som körs utan att blockera event-loopen (se CompanyRepository.call).
+    Svar som kortats av latensbudgeten återanvänds aldrig efteråt.
+    """
+    async def work():
+        with trim_scope() as trimmed:
+            rows = await db.call(method, *args)
+        return rows, trimmed[0]
+
+    key = (method,) + normalize_args(*args)
+    rows, trimmed = await single_flight.do(
+        key, work, keep=lambda result: method not in RANDOM_SAMPLE_METHODS and not result[1],
+    )
+    if trimmed:
+        # Även de som delade ett kortat svar räknas som trimmade
+        mark_trimmed()
+    return rows
+
+
+class RateLimited(app_commands.CheckFailure):
+    """Användaren eller servern skickar kommandon för snabbt"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"rate limited ({retry_after:.1f} s)")
+        self.retry_after = retry_after
 
 
-def chunk_list(items: List[Dict], size: int) -> List[List[Dict]]:
-    return [items[i:i+size] for i in range(0, len(items), size)]
+def rate_limit_check(interaction: discord.Interaction) -> bool:
+    """Check för sökkommandon: token bucket per användare och per server"""
+    retry_after = user_limiter.check(interaction.user.id)
+    if retry_after is None and interaction.guild_id:
+        retry_after = guild_limiter.check(interaction.guild_id)
+    if retry_after is not None:
+        raise RateLimited(retry_after)
+    return True
 
 
 # ==================== AUTOCOMPLETE-CALLBACKS ====================
+def _with_count(value: str, count: Optional[int]) -> str:
+    return f"{value} ({count})" if count is not None else value
+
 async def ac_company_type(interaction: discord.Interaction, current: str):
     try:
-        suggestions = db.suggest_types(current) if hasattr(db, 'suggest_types') else []
-        return [app_commands.Choice(name=t, value=t) for t in suggestions[:25]]
+        suggestions = await db.run('suggest_types', current)
+        return [app_commands.Choice(name=_with_count(t, db.facet_count('type', t)), value=t) for t in suggestions[:25]]
+    except Exception:
+        return []
+
+async def ac_place(interaction: discord.Interaction, current: str):
+    try:
+        return [app_commands.Choice(name=p, value=p) for p in db.suggest_places(current)[:25]]
     except Exception:
         return []
 
 async def ac_city(interaction: discord.Interaction, current: str):
     try:
-        suggestions = db.suggest_cities(current) if hasattr(db, 'suggest_cities') else []
-        return [app_commands.Choice(name=c, value=c) for c in suggestions[:25]]
+        suggestions = await db.run('suggest_cities', current)
+        return [app_commands.Choice(name=_with_count(c, db.facet_count('city', c)), value=c) for c in suggestions[:25]]
     except Exception:
         return []
 
@@ -523,13 +782,18 @@ async def help_command(interaction: discord.Interaction):
             "/typ <typ> – Visar 5 slumpade företag av en typ\n"
             "/stad <stad> – Visar 5 slumpade företag i en stad\n"
             "/stockholm – Visar 5 slumpade företag i Greater Stockholm\n"
+            "/nara <plats> [km] – Företag inom en radie, närmast först\n"
+            "/export [format] [filter] – Filtrerade företag som CSV-, JSONL- eller Parquet-fil\n"
+            "Lägg till `bladdra:True` för att bläddra igenom alla träffar\n"
+            "/prenumerera <kanal> [tid] [tidszon] – Daglig posting i en kanal (admin)\n"
+            "/avprenumerera [kanal] – Stäng av daglig posting (admin)\n"
             "/help – Visa denna hjälp"
         ),
         inline=False
     )
     embed.add_field(
         name="⏰ Automatisk posting",
-        value="Botten postar automatiskt 'Dagens AI-företag' kl 08:00 varje dag",
+        value="Botten postar automatiskt 'Dagens AI-företag' varje dag i prenumererade kanaler (default kl 08:00)",
         inline=False
     )
     embed.add_field(
@@ -542,223 +806,579 @@ async def help_command(interaction: discord.Interaction):
 
 
 @bot.tree.command(name="dagens", description="Visa ett slumpmässigt praktik-relevant företag")
+@app_commands.check(rate_limit_check)
+@budgeted(budgets, ephemeral=False)
 async def dagens(interaction: discord.Interaction):
-    company = db.get_random_company_strict()
+    company = await db.run('get_random_company_strict')
     if not company:
-        await interaction.response.send_message("❌ Kunde inte hitta något företag. Kolla att databasen finns!", ephemeral=True)
+        await respond(interaction, "❌ Kunde inte hitta något företag. Kolla att databasen finns!", ephemeral=True)
         return
 
-    embed = discord.Embed(
-        title=f"🏢 {company['name']}",
-        url=company['website'] if company['website'] else None,
-        description=company['description'][:500] + "..." if company.get('description') and len(company.get('description', '')) > 500 else company.get('description', ''),
-        color=discord.Color.green()
-    )
-    if company.get('website'):
-        embed.add_field(name="🌐 Hemsida", value=company['website'], inline=False)
-    if company.get('location_city'):
-        location = company['location_city']
-        if company.get('location_greater_stockholm'):
-            location += " (Greater Stockholm)"
-        embed.add_field(name="📍 Plats", value=location, inline=True)
-    embed.add_field(name="📊 Typ", value=company['type'].capitalize(), inline=True)
-    if company.get('ai_capabilities'):
-        ai_caps = ', '.join(company['ai_capabilities'][:3])
-        embed.add_field(name="🤖 AI-förmågor", value=ai_caps, inline=False)
-    if company.get('logo_url'):
-        embed.set_thumbnail(url=company['logo_url'])
-    embed.set_footer(text=f"Dagens AI-företag • {datetime.now().strftime('%Y-%m-%d')}\nDetta är ett AI-genererat meddelande, dubbelkolla alltid viktig fakta")
-
-    await interaction.response.send_message(embed=embed, view=DMEmbedForAnyoneView(embed))
+    interaction.extras['result_ids'] = [company['id']]
+    embed = build_company_embed(company)
+    await respond(interaction, embed=embed, view=DMEmbedForAnyoneView(company['id']))
 
 
 @bot.tree.command(name="sok", description="Sök efter företag på namn")
-@app_commands.describe(search_term="Del av företagsnamn, t.ex. 'Vision'")
-async def sok(interaction: discord.Interaction, search_term: str):
-    results = db.search_by_name(search_term)
+@app_commands.describe(search_term="Del av företagsnamn, t.ex. 'Vision'", bladdra="Bläddra igenom alla träffar sida för sida")
+@app_commands.check(rate_limit_check)
+@budgeted(budgets)
+async def sok(interaction: discord.Interaction, search_term: str, bladdra: bool = False):
+    if bladdra:
+        await send_browse(interaction, 'sok', search_term, f"❌ Hittade inga företag som matchar '{search_term}'")
+        return
+    results = await query('search_by_name', search_term)
     if not results:
-        await interaction.response.send_message(f"❌ Hittade inga företag som matchar '{search_term}'", ephemeral=True)
+        await respond(interaction, f"❌ Hittade inga företag som matchar '{search_term}'", ephemeral=True)
         return
 
-    embed = discord.Embed(
-        title=f"🔍 Sökresultat för '{search_term}'",
-        description=f"Hittade {len(results)} företag",
-        color=discord.Color.blue()
-    )
-    for i, company in enumerate(results, 1):
-        location = f" - {company['location_city']}" if company.get('location_city') else ""
-        website = company['website'] if company['website'] else "(saknar hemsida)"
-        value = f"{website}{location}\nTyp: {company['type']}"
-        embed.add_field(name=f"{i}. {company['name']}", value=value, inline=False)
-
-    await interaction.response.send_message(embed=embed, view=SaveToDMView(embed, interaction.user.id), ephemeral=True)
+    interaction.extras['result_ids'] = [c['id'] for c in results]
+    embed = build_results_embed('sok', search_term, results)
+    view = SaveToDMView('sok', search_term, results, interaction.user.id)
+    await respond(interaction, embed=embed, view=view, ephemeral=True)
 
 
 @bot.tree.command(name="typ", description="Filtrera företag på typ (startup, corporation, supplier)")
-@app_commands.describe(company_type="t.ex. 'startup', 'corporation', 'supplier'")
+@app_commands.describe(company_type="t.ex. 'startup', 'corporation', 'supplier'", bladdra="Bläddra igenom alla träffar i stället för 5 slumpade")
 @app_commands.autocomplete(company_type=ac_company_type)
-async def typ(interaction: discord.Interaction, company_type: str):
-    results = db.filter_by_type(company_type, limit=5)
+@app_commands.check(rate_limit_check)
+@budgeted(budgets)
+async def typ(interaction: discord.Interaction, company_type: str, bladdra: bool = False):
+    if bladdra:
+        await send_browse(interaction, 'typ', company_type, f"❌ Hittade inga företag av typ '{company_type}' med hemsida")
+        return
+    results = await query('filter_by_type', company_type, 5)
     if not results:
-        await interaction.response.send_message(
+        await respond(
+            interaction,
             f"❌ Hittade inga företag av typ '{company_type}' med hemsida",
             ephemeral=True
         )
         return
 
-    embed = discord.Embed(
-        title=f"🏢 {company_type.capitalize()} (5 slumpade)",
-        description="Visar ett slumpvist urval av 5 företag som har hemsida.",
-        color=discord.Color.purple()
-    )
-
-    for i, c in enumerate(results, 1):
-        city = f" – {c['location_city']}" if c.get('location_city') else ""
-        url = c['website']
-        desc = (c.get('description') or '')
-        desc = (desc[:250] + '...') if desc else ''
-        embed.add_field(
-            name=f"{i}. {c['name']}{city}",
-            value=f"{url}\n{desc}\nTyp: {c['type']}\n\n\n",
-            inline=False
-        )
-
-    embed.set_footer(text="Tips: Kör kommandot igen för ett nytt slumpurval.")
-    await interaction.response.send_message(embed=embed, view=SaveToDMView(embed, interaction.user.id), ephemeral=True)
+    interaction.extras['result_ids'] = [c['id'] for c in results]
+    embed = build_results_embed('typ', company_type, results)
+    view = SaveToDMView('typ', company_type, results, interaction.user.id)
+    await respond(interaction, embed=embed, view=view, ephemeral=True)
 
 
 @bot.tree.command(name="stad", description="Hitta praktik-relevanta företag i en stad")
-@app_commands.describe(city="t.ex. 'Stockholm'")
+@app_commands.describe(city="t.ex. 'Stockholm'", bladdra="Bläddra igenom alla träffar i stället för 5 slumpade")
 @app_commands.autocomplete(city=ac_city)
-async def stad(interaction: discord.Interaction, city: str):
-    results = db.filter_by_city(city, limit=5)
+@app_commands.check(rate_limit_check)
+@budgeted(budgets)
+async def stad(interaction: discord.Interaction, city: str, bladdra: bool = False):
+    if bladdra:
+        await send_browse(interaction, 'stad', city, f"❌ Hittade inga praktik-relevanta företag med hemsida i {city}")
+        return
+    results = await query('filter_by_city', city, 5)
     if not results:
-        await interaction.response.send_message(
+        await respond(
+            interaction,
             f"❌ Hittade inga praktik-relevanta företag med hemsida i {city}",
             ephemeral=True
         )
         return
 
-    embed = discord.Embed(
-        title=f"📍 AI-företag i {city} (5 slumpade)",
-        description="Visar ett slumpvist urval av 5 företag som har hemsida.",
-        color=discord.Color.orange()
-    )
-
-    for i, c in enumerate(results, 1):
-        url = c['website']
-        desc = (c.get('description') or '')
-        desc = (desc[:250] + '...') if desc else ''
-        embed.add_field(
-            name=f"{i}. {c['name']}",
-            value=f"{url}\n{desc}\nTyp: {c['type']}\n\n",
-            inline=False
-        )
-
-    embed.set_footer(text="Tips: Kör kommandot igen för ett nytt slumpurval.")
-    await interaction.response.send_message(embed=embed, view=SaveToDMView(embed, interaction.user.id), ephemeral=True)
+    interaction.extras['result_ids'] = [c['id'] for c in results]
+    embed = build_results_embed('stad', city, results)
+    view = SaveToDMView('stad', city, results, interaction.user.id)
+    await respond(interaction, embed=embed, view=view, ephemeral=True)
 
 
 @bot.tree.command(name="stockholm", description="Visa företag i Greater Stockholm")
-async def stockholm(interaction: discord.Interaction):
-    results = db.filter_greater_stockholm(limit=5)
+@app_commands.describe(bladdra="Bläddra igenom alla träffar i stället för 5 slumpade")
+@app_commands.check(rate_limit_check)
+@budgeted(budgets)
+async def stockholm(interaction: discord.Interaction, bladdra: bool = False):
+    if bladdra:
+        await send_browse(interaction, 'sthlm', '', "❌ Hittade inga företag i Greater Stockholm med hemsida")
+        return
+    results = await query('filter_greater_stockholm', 5)
     if not results:
-        await interaction.response.send_message("❌ Hittade inga företag i Greater Stockholm med hemsida", ephemeral=True)
+        await respond(interaction, "❌ Hittade inga företag i Greater Stockholm med hemsida", ephemeral=True)
         return
 
-    embed = discord.Embed(
-        title="🏙️ AI-företag i Greater Stockholm (5 slumpade)",
-        description="Visar ett slumpvist urval av 5 företag som har hemsida.",
-        color=discord.Color.teal()
-    )
+    interaction.extras['result_ids'] = [c['id'] for c in results]
+    embed = build_results_embed('sthlm', '', results)
+    view = SaveToDMView('sthlm', '', results, interaction.user.id)
+    await respond(interaction, embed=embed, view=view, ephemeral=True)
 
-    for i, c in enumerate(results, 1):
-        city = c.get('location_city', 'Stockholm')
-        url = c['website']
-        desc = (c.get('description') or '')
-        desc = (desc[:250] + '...') if desc else ''
-        embed.add_field(
-            name=f"{i}. {c['name']} ({c['type']})",
-            value=f"📍 {city}\n{url}\n{desc}\n\n",
-            inline=False
-        )
 
-    embed.set_footer(text="Tips: Kör kommandot igen för ett nytt slumpurval.")
-    await interaction.response.send_message(embed=embed, view=SaveToDMView(embed, interaction.user.id), ephemeral=True)
+@bot.tree.command(name="nara", description="Hitta företag inom en radie från en ort")
+@app_commands.describe(plats="Ort, kommun eller stadsdel, t.ex. 'Uppsala' eller 'Kista'", km="Radie i km (1-500)")
+@app_commands.autocomplete(plats=ac_place)
+@app_commands.check(rate_limit_check)
+@budgeted(budgets)
+async def nara(interaction: discord.Interaction, plats: str, km: app_commands.Range[int, 1, 500] = 25):
+    if db.gazetteer.resolve(plats) is None:
+        await respond(interaction, f"❌ Känner inte igen platsen '{plats}'", ephemeral=True)
+        return
+    await send_browse(interaction, 'nara', nearby_label(plats, km), f"❌ Hittade inga företag inom {km} km från {plats}")
+
+# ==================== EXPORT ====================
+
+# Exporter körs i egna processer (spawn: inga trådar eller event loop ärvs)
+EXPORT_WORKERS = int(os.getenv('EXPORT_WORKERS', '1'))
+export_pool: Optional['ProcessPoolExecutor'] = None
+
+
+def get_export_pool() -> 'ProcessPoolExecutor':
+    global export_pool
+    if export_pool is None:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        export_pool = ProcessPoolExecutor(
+            max_workers=EXPORT_WORKERS, mp_context=multiprocessing.get_context('spawn'),
+        )
+    return export_pool
+
+
+@bot.tree.command(name="export", description="Exportera filtrerade företag som fil (CSV, JSONL eller Parquet)")
+@app_commands.describe(
+    format="Filformat (default CSV)",
+    typ="t.ex. 'startup'",
+    stad="t.ex. 'Stockholm'",
+    sektor="t.ex. 'Education'",
+    formaga="AI-förmåga, t.ex. 'machine learning'",
+    min_kvalitet="Lägsta datakvalitet (0-100)",
+    praktik="Bara praktik-relevanta typer",
+)
+@app_commands.choices(format=[
+    app_commands.Choice(name="CSV", value="csv"),
+    app_commands.Choice(name="JSONL", value="jsonl"),
+    app_commands.Choice(name="Parquet", value="parquet"),
+])
+@app_commands.autocomplete(typ=ac_company_type, stad=ac_city)
+@app_commands.check(rate_limit_check)
+async def export(interaction: discord.Interaction, format: str = "csv", typ: Optional[str] = None,
+                 stad: Optional[str] = None, sektor: Optional[str] = None, formaga: Optional[str] = None,
+                 min_kvalitet: app_commands.Range[int, 0, 100] = 0, praktik: bool = False):
+    # Exporten tar längre tid än latensbudgeten - defer direkt och vänta på processen
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    import tempfile
+    from export_catalog import ExportError, export_companies
+
+    database_url = os.getenv('DATABASE_URL', '')
+    if not database_url.startswith(('postgres://', 'postgresql://')):
+        database_url = None
+    job = functools.partial(
+        export_companies, fmt=format, db_path=db.db_path, database_url=database_url,
+        company_type=typ.lower() if typ else None, location_city=stad, sector=sektor,
+        ai_capability=formaga, min_quality=min_kvalitet, only_praktik_relevant=praktik,
+    )
+    with tempfile.TemporaryDirectory(prefix="export-") as folder:
+        path = os.path.join(folder, f"ai_foretag.{format}")
+        try:
+            stats = await asyncio.get_running_loop().run_in_executor(get_export_pool(), job, path)
+        except ExportError as e:
+            await interaction.followup.send(f"❌ {e}", ephemeral=True)
+            return
+        if not stats['rows']:
+            await interaction.followup.send("❌ Inga företag matchade filtren", ephemeral=True)
+            return
+        limit = interaction.guild.filesize_limit if interaction.guild else discord.utils.DEFAULT_FILE_SIZE_LIMIT_BYTES
+        if stats['bytes'] > limit:
+            await interaction.followup.send(
+                f"❌ Exporten blev {stats['bytes'] / 1024 / 1024:.1f} MB (max {limit / 1024 / 1024:.0f} MB) "
+                f"- snäva in filtren eller använd `python export_catalog.py`",
+                ephemeral=True,
+            )
+            return
+        await interaction.followup.send(
+            f"📦 {stats['rows']} företag", file=discord.File(path), ephemeral=True,
+        )
 
 # ==================== AUTOMATISK DAGLIG POSTING ====================
 
-@tasks.loop(time=time(hour=8, minute=0, tzinfo=ZoneInfo("Europe/Stockholm")))  # Kör kl 08:00 varje dag (Stockholm-tid)
-async def daily_company():
+# Max antal samtidiga sändningar vid fan-out till prenumererade kanaler
+DAILY_FANOUT_CONCURRENCY = int(os.getenv('DAILY_FANOUT_CONCURRENCY', '5'))
+
+
+async def ensure_rotation() -> None:
     """
-    Posta 'Dagens AI-företag' automatiskt varje dag kl 08:00
-    
-    Konfigurera CHANNEL_ID via environment variable eller i .env-fil
+    Öppna och synka rotationen vid första användning
+
+    Synken läser alla kvalificerade ID:n ur katalogen, så den görs inte
+    vid start utan först när dagens företag ska väljas.
     """
-    # Läs channel-ID från environment variable
-    CHANNEL_ID = os.getenv('DAILY_CHANNEL_ID')
-    
-    if not CHANNEL_ID:
-        print("⚠️  DAILY_CHANNEL_ID är inte konfigurerat")
-        print("💡 Sätt DAILY_CHANNEL_ID i .env eller environment variable")
+    if rotation.conn is not None:
+        return
+    eligible = await db.run('get_daily_eligible_ids')
+    if rotation.conn is not None:
+        return
+    rotation.connect()
+    if rotation.sync(eligible):
+        print(f'🔀 Daglig rotation uppdaterad ({rotation.remaining()} företag kvar i rundan)')
+    else:
+        print(f'✅ Daglig rotation: {rotation.remaining()} företag kvar i rundan')
+
+
+def daily_embed(company: Dict, day: str) -> discord.Embed:
+    """Dagens embed, förrenderad av warmup om möjligt"""
+    embed = daily_embed_cache.get((company['id'], day))
+    if embed is None:
+        embed = build_company_embed(company, daily=True, day=day)
+        daily_embed_cache[(company['id'], day)] = embed
+    return embed
+
+
+async def prerender_daily_embeds(count: int) -> int:
+    """Rendera embeds för de företag som troligen postas härnäst"""
+    await ensure_rotation()
+    today = datetime.now(ZoneInfo(DEFAULT_TIMEZONE))
+    day = today.strftime('%Y-%m-%d')
+    # Gamla dagar behövs inte längre
+    for key in [key for key in daily_embed_cache if key[1] != day]:
+        del daily_embed_cache[key]
+    rendered = 0
+    for company_id in rotation.upcoming(count, today.date()):
+        company = await db.run('get_company', company_id)
+        if company:
+            daily_embed(company, day)
+            rendered += 1
+    return rendered
+
+
+# ==================== WARMUP ====================
+
+WARMUP_BUDGET_MS = int(os.getenv('WARMUP_BUDGET_MS', '3000'))
+WARMUP_DAILY_COUNT = int(os.getenv('WARMUP_DAILY_COUNT', '3'))
+
+
+def start_warmup() -> Optional[asyncio.Task]:
+    """
+    Starta warm_caches i bakgrunden (vid start och när en ny katalog lästs in)
+
+    En warmup som fortfarande värmer den gamla katalogen avbryts först.
+    """
+    global warmup_task
+    if os.getenv('WARMUP', '1').lower() in ('0', 'false', 'no', 'nej'):
+        return None
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    warmup_task = asyncio.create_task(warm_caches(), name="warmup")
+    return warmup_task
+
+
+async def warm_caches() -> 'WarmupReport':
+    """
+    Förvärm cacher inom WARMUP_BUDGET_MS (körs i bakgrunden via start_warmup)
+
+    Ordning efter nytta: filernas sidor i OS-cachen, heta tabeller i SQLite,
+    autocomplete/facetter i minnet, sist förrenderade dagliga embeds.
+    """
+    global warmup_report
+    from warmup import prime_file, run_warmup
+
+    def prime_files(deadline: float) -> None:
+        for path in (db.db_path, db.snapshot_path):
+            prime_file(path, deadline)
+
+    steps = [
+        ("sidcache", prime_files, True),
+        ("tabeller", db.warm_tables, True),
+        ("autocomplete", db.load_facets, True),
+        ("dagens", lambda deadline: prerender_daily_embeds(WARMUP_DAILY_COUNT), False),
+    ]
+    warmup_report = await run_warmup(steps, WARMUP_BUDGET_MS / 1000)
+    print(f'🔥 Warmup: {warmup_report.summary()}')
+    return warmup_report
+
+
+async def get_todays_company() -> Optional[Dict]:
+    """Hämta dagens företag från den förberäknade rotationen"""
+    await ensure_rotation()
+    today = datetime.now(ZoneInfo(DEFAULT_TIMEZONE)).date()
+    company_id = rotation.next_company_id(today)
+    if company_id is None:
+        return None
+    company = await db.run('get_company', company_id)
+    if not company:
+        # Företaget har försvunnit ur katalogen - synka och ta nästa
+        rotation.sync(await db.run('get_daily_eligible_ids'))
+        rotation.skip_current()
+        company_id = rotation.next_company_id(today)
+        company = await db.run('get_company', company_id) if company_id is not None else None
+    return company
+
+
+async def register_legacy_channel():
+    """
+    Registrera DAILY_CHANNEL_ID som prenumeration (bakåtkompatibilitet)
+
+    Körs i setup_hook, innan READY har fyllt kanalcachen, så kanalen hämtas
+    via API:t om den inte redan finns i cachen.
+    """
+    channel_id = os.getenv('DAILY_CHANNEL_ID')
+    if not channel_id:
         return
-    
     try:
-        CHANNEL_ID = int(CHANNEL_ID)
+        channel_id = int(channel_id)
     except ValueError:
-        print(f"❌ DAILY_CHANNEL_ID är inte ett giltigt nummer: {CHANNEL_ID}")
+        print(f"❌ DAILY_CHANNEL_ID är inte ett giltigt nummer: {channel_id}")
         return
-    
-    channel = bot.get_channel(CHANNEL_ID)
-    if not channel:
-        print(f"❌ Kunde inte hitta kanal med ID: {CHANNEL_ID}")
+    channel = bot.get_channel(channel_id)
+    if channel is None:
+        try:
+            channel = await bot.fetch_channel(channel_id)
+        except discord.HTTPException as e:
+            print(f"❌ Kunde inte hämta kanal med ID {channel_id}: {e}")
+            return
+    if not getattr(channel, 'guild', None):
+        print(f"❌ Kunde inte hitta kanal med ID: {channel_id}")
+        return
+    existing = {s.channel_id for s in subscriptions.list_subscriptions(channel.guild.id)}
+    if channel_id not in existing:
+        subscriptions.subscribe(channel.guild.id, channel_id)
+        print(f"✅ DAILY_CHANNEL_ID {channel_id} registrerad som prenumeration (08:00)")
+
+
+def is_retryable_send_error(error: Exception) -> bool:
+    """Rate limits och serverfel försöks igen - saknade rättigheter gör det inte"""
+    if isinstance(error, discord.HTTPException):
+        return error.status == 429 or error.status >= 500
+    return isinstance(error, asyncio.TimeoutError)
+
+
+@tasks.loop(minutes=1)
+async def daily_company():
+    """
+    Posta 'Dagens AI-företag' till alla prenumererade kanaler
+
+    Varje kanal har egen tid och tidszon (/prenumerera). Embed renderas
+    en gång och skickas sedan parallellt till alla kanaler som är på tur.
+    """
+    # Varje process levererar bara till servrar på sina egna shards
+    due = [sub for sub in subscriptions.due_subscriptions() if shard_config.owns_guild(sub.guild_id)]
+    if not due:
+        return
+
+    try:
+        company = await get_todays_company()
+    except sqlite3.Error as e:
+        print(f"❌ Kunde inte läsa rotation-state ({rotation.state_path}): {e}")
         return
-    
-    # Hämta dagens företag
-    company = db.get_random_company_strict()
-    
     if not company:
-        await channel.send("❌ Kunde inte hitta dagens företag")
+        print("❌ Kunde inte hitta dagens företag")
         return
-    
-    # Skapa meddelande
-    embed = discord.Embed(
-        title=f"🌅 Dagens AI-företag: {company['name']}",
-        url=company['website'] if company['website'] else None,
-        description=company['description'][:500] + "..." if company.get('description') and len(company.get('description', '')) > 500 else company.get('description', ''),
-        color=discord.Color.gold()
+
+    day = datetime.now(ZoneInfo(DEFAULT_TIMEZONE)).strftime('%Y-%m-%d')
+    embed = daily_embed(company, day)
+    view = DMEmbedForAnyoneView(company['id'], daily=True, day=day)
+
+    async def send(sub: Subscription):
+        channel = bot.get_channel(sub.channel_id)
+        if channel is None:
+            raise LookupError(f"kanal {sub.channel_id} finns inte")
+        await send_queue.submit(
+            f"channel:{channel.id}",
+            lambda: channel.send(embed=embed, view=view),
+        )
+
+    results = await fan_out(
+        due,
+        send,
+        max_concurrency=DAILY_FANOUT_CONCURRENCY,
+        is_retryable=is_retryable_send_error,
     )
-    
-    if company.get('website'):
-        embed.add_field(name="🌐 Hemsida", value=company['website'], inline=False)
-    
-    if company.get('location_city'):
-        location = company['location_city']
-        if company.get('location_greater_stockholm'):
-            location += " (Greater Stockholm)"
-        embed.add_field(name="📍 Plats", value=location, inline=True)
-    
-    embed.add_field(name="📊 Typ", value=company['type'].capitalize(), inline=True)
-    
-    if company.get('ai_capabilities'):
-        ai_caps = ', '.join(company['ai_capabilities'][:3])
-        embed.add_field(name="🤖 AI-förmågor", value=ai_caps, inline=False)
-    
-    if company.get('logo_url'):
-        embed.set_thumbnail(url=company['logo_url'])
-    
-    embed.set_footer(text=f"Dagens AI-företag • {datetime.now().strftime('%Y-%m-%d')} • Använd /help för fler kommandon\nDetta är ett AI-genererat meddelande, dubbelkolla alltid viktig fakta")
-    
-    await channel.send(embed=embed, view=DMEmbedForAnyoneView(embed))
-    print(f"✅ Postade dagens företag: {company['name']}")
+
+    now_utc = datetime.now(timezone.utc)
+    for sub, result in zip(due, results):
+        day = sub.local_now(now_utc).date().isoformat()
+        subscriptions.record_delivery(sub, day, company['id'], result)
+        if not result.ok:
+            print(f"❌ Kunde inte posta i kanal {sub.channel_id} efter {result.attempts} försök: {result.error}")
+
+    delivered = sum(1 for r in results if r.ok)
+    slowest = max(r.latency_ms for r in results)
+    print(f"✅ Postade dagens företag: {company['name']} → {delivered}/{len(results)} kanaler (max {slowest:.0f} ms)")
+    queue_stats = send_queue.metrics()
+    print(f"📬 Utgående kö: djup {queue_stats['depth']}, väntetid p95 {queue_stats['wait_p95_ms']:.0f} ms")
 
 @daily_company.before_loop
 async def before_daily_company():
     """Vänta tills botten är redo innan schemat startar"""
     await bot.wait_until_ready()
 
+
+# Hur ofta katalogfilen kontrolleras (0 = aldrig)
+CATALOG_RELOAD_S = float(os.getenv('CATALOG_RELOAD_S', '60'))
+
+
+@tasks.loop(seconds=max(CATALOG_RELOAD_S, 1))
+async def reload_catalog():
+    """Läs in katalogen igen när build_database/import_eu_data publicerat en ny"""
+    if not await db.run('reload_if_changed'):
+        return
+    daily_embed_cache.clear()
+    eligible = await db.run('get_daily_eligible_ids')
+    if rotation.conn is not None:
+        rotation.sync(eligible)
+    print(f'🔄 Ny katalog inläst ({len(eligible)} företag för daglig post)')
+    # Den nya filen är kall: sidcache, heta tabeller och dagliga embeds värms igen
+    start_warmup()
+
+
+@tasks.loop(seconds=max(ANALYTICS_FLUSH_S, 1))
+async def flush_analytics():
+    """Skriv analysbufferten till analytics.db (egen tråd, egen fil)"""
+    await analytics.call('flush')
+
+
+@bot.tree.command(name="prenumerera", description="Posta 'Dagens AI-företag' i en kanal varje dag")
+@app_commands.describe(
+    kanal="Kanalen där dagens företag ska postas",
+    tid="Klockslag (HH:MM), default 08:00",
+    tidszon="IANA-tidszon, default Europe/Stockholm",
+)
+@app_commands.guild_only()
+@app_commands.default_permissions(manage_guild=True)
+async def prenumerera(interaction: discord.Interaction, kanal: discord.TextChannel,
+                      tid: str = DEFAULT_POST_TIME, tidszon: str = DEFAULT_TIMEZONE):
+    try:
+        sub = subscriptions.subscribe(interaction.guild_id, kanal.id, tid, tidszon)
+    except ValueError as e:
+        await interaction.response.send_message(f"❌ Ogiltig tid eller tidszon: {e}", ephemeral=True)
+        return
+    await interaction.response.send_message(
+        f"✅ {kanal.mention} får 'Dagens AI-företag' kl {sub.post_time} ({sub.timezone}) varje dag.",
+        ephemeral=True
+    )
+
+
+@bot.tree.command(name="avprenumerera", description="Sluta posta 'Dagens AI-företag' i en kanal")
+@app_commands.describe(kanal="Kanalen (lämna tomt för alla kanaler på servern)")
+@app_commands.guild_only()
+@app_commands.default_permissions(manage_guild=True)
+async def avprenumerera(interaction: discord.Interaction, kanal: Optional[discord.TextChannel] = None):
+    removed = subscriptions.unsubscribe(interaction.guild_id, kanal.id if kanal else None)
+    if not removed:
+        await interaction.response.send_message("ℹ️ Det fanns ingen prenumeration att ta bort.", ephemeral=True)
+        return
+    await interaction.response.send_message(f"✅ Tog bort {removed} prenumeration(er).", ephemeral=True)
+
+# ==================== STATUS / MÄTVÄRDEN ====================
+
+def _ms(value: Optional[float]) -> str:
+    return f"{value:.0f} ms" if value is not None else "–"
+
+
+@bot.tree.command(name="botstatus", description="Visa interna mätvärden för botten (admin)")
+@app_commands.default_permissions(manage_guild=True)
+async def botstatus(interaction: discord.Interaction):
+    embed = discord.Embed(title="📈 Botstatus", color=discord.Color.dark_grey())
+    q = send_queue.metrics()
+    embed.add_field(
+        name="📬 Utgående kö",
+        value=(
+            f"Djup: {q['depth']} • Routes: {q['routes']}\n"
+            f"Skickade: {q['sent']} • Fel: {q['failed']}\n"
+            f"Sammanslagna: {q['coalesced']} • Avvisade: {q['rejected']}\n"
+            f"Väntetid: snitt {q['wait_avg_ms']:.0f} ms • p95 {q['wait_p95_ms']:.0f} ms • max {q['wait_max_ms']:.0f} ms"
+        ),
+        inline=False
+    )
+    embed.add_field(
+        name="🔄 Livscykel",
+        value=(
+            f"setup_hook: {shard_metrics.setup_runs} • on_ready: {shard_metrics.ready_events}\n"
+            f"DB-anslutningar öppnade: {db.connections_opened}\n"
+            f"Warmup: {warmup_report.summary() if warmup_report else 'ej klar'}\n"
+            f"Första kommando: {_ms(shard_metrics.first_command_ms)}"
+        ),
+        inline=False
+    )
+    sf = single_flight.metrics()
+    users, guilds = user_limiter.metrics(), guild_limiter.metrics()
+    embed.add_field(
+        name="🔀 Coalescing och rate limit",
+        value=(
+            f"Sökningar: {sf['calls']} • Körda: {sf['executed']} • Delade: {sf['coalesced']} "
+            f"({sf['coalesce_rate']:.0%})\n"
+            f"Avvisade: {users['rejected']} (användare) • {guilds['rejected']} (server)"
+        ),
+        inline=False
+    )
+    if analytics.conn is not None:
+        a = analytics.metrics()
+        from analytics import ANALYTICS_TIMEZONE
+        today = datetime.now(ANALYTICS_TIMEZONE).date().isoformat()
+        unique = await analytics.call('unique_users', today)
+        embed.add_field(
+            name="📊 Analyslogg",
+            value=(
+                f"Unika användare idag: ~{unique}\n"
+                f"Loggade: {a['recorded']} • I buffert: {a['buffered']} • Tappade: {a['dropped']}\n"
+                f"Skrivna: {a['flushed']} i {a['flushes']} batcher • Senaste: {_ms(a['last_flush_ms'])}"
+            ),
+            inline=False
+        )
+    slow = budgets.metrics()[:5]
+    if slow:
+        embed.add_field(
+            name="⏱️ Latensbudget",
+            value="\n".join(
+                f"/{c['command']}: {c['violations']} överskridna • {c['deferred']} defer • "
+                f"{c['trimmed']} trimmade • ~{c['expected_ms']:.0f} ms (max {c['max_ms']:.0f})"
+                for c in slow
+            ),
+            inline=False
+        )
+    for shard in shard_status():
+        latency = _ms(shard['latency_ms'])
+        embed.add_field(
+            name=f"🧩 Shard {shard['shard_id']}",
+            value=(
+                f"Servrar: {shard['guilds']} • Latens: {latency}\n"
+                f"Kommandon: {shard['commands']} (fel: {shard['command_errors']})\n"
+                f"Anslutningar: {shard['connects']} • Avbrott: {shard['disconnects']} • Resumes: {shard['resumes']}\n"
+                f"Återanslutning: {_ms(shard['reconnect_last_ms'])} (snitt {_ms(shard['reconnect_avg_ms'])})"
+            ),
+            inline=True
+        )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
 # ==================== STARTA BOT ====================
 
+def configure_from_env() -> str:
+    """
+    Skapa databas och state-lager från environment variables
+
+    Returns:
+        Databasens sökväg (PostgreSQL: värden, utan inloggningsuppgifter)
+    """
+    # Läs databas-path från environment variable
+    db_path = os.getenv('DATABASE_PATH', 'ai_companies.db')
+    database_url = os.getenv('DATABASE_URL', '')
+
+    # Uppdatera global databas-instans
+    global db, rotation, subscriptions, command_sync_state, button_labels, analytics
+    if database_url.startswith(('postgres://', 'postgresql://')):
+        # Delad PostgreSQL för flera bot-instanser (se CLOUD_DATABASE.md)
+        from repository import PostgresBackend
+        db = CompanyDatabase(backend=PostgresBackend(
+            database_url,
+            min_size=int(os.getenv('PG_POOL_MIN', '1')),
+            max_size=int(os.getenv('PG_POOL_MAX', '10')),
+        ))
+        db_path = database_url.split('@')[-1]  # utan inloggningsuppgifter
+    else:
+        db = CompanyDatabase(
+            db_path,
+            mmap_size=int(os.getenv('DATABASE_MMAP_SIZE', str(256 * 1024 * 1024))),
+            snapshot_path=os.getenv('SNAPSHOT_PATH', 'ai_companies.snapshot'),
+        )
+    state_path = os.getenv('STATE_DATABASE_PATH', 'bot_state.db')
+    rotation = DailyRotation(state_path)
+    subscriptions = SubscriptionStore(state_path)
+    command_sync_state = CommandSyncState(state_path)
+    button_labels = ButtonLabelStore(state_path)
+    # Tom ANALYTICS_DATABASE_PATH stänger av analysloggen
+    analytics = AnalyticsLog(os.getenv('ANALYTICS_DATABASE_PATH', 'analytics.db') or None)
+    return db_path
+
+
 def main():
     """Huvudfunktion - starta botten"""
     
@@ -770,15 +1390,11 @@ def main():
         print("💡 Sätt DISCORD_BOT_TOKEN i .env eller environment variable")
         sys.exit(1)
     
-    # Läs databas-path från environment variable
-    db_path = os.getenv('DATABASE_PATH', 'ai_companies.db')
-    
-    # Uppdatera global databas-instans
-    global db
-    db = CompanyDatabase(db_path)
-    
+    db_path = configure_from_env()
+    database_url = os.getenv('DATABASE_URL', '')
+
     # Kolla att databas finns
-    if not Path(db_path).exists():
+    if not database_url and not Path(db_path).exists():
         print(f"⚠️  VARNING: {db_path} hittades inte!")
         print("💡 Kör 'python build_database.py' först för att skapa databasen")
         print("⏳ Botten startar ändå, men kommandon kommer inte fungera...\n")
@@ -792,17 +1408,34 @@ def main():
         bot.run(TOKEN)
     except Exception as e:
         print(f"\n❌ Kunde inte starta botten: {e}")
+        import traceback
         traceback.print_exc()
         sys.exit(1)
-
-if __name__ == "__main__":
-    main()
+    finally:
+        if export_pool is not None:
+            export_pool.shutdown(cancel_futures=True)
+        # Det som ligger kvar i bufferten skrivs innan processen avslutas
+        analytics.close()
 
 # ==================== SLASH-KOMMANDO ERROR HANDLER ====================
 
 @bot.tree.error
 async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    if isinstance(error, RateLimited):
+        await respond(
+            interaction,
+            f"⏳ Du skickar kommandon lite för snabbt – försök igen om {error.retry_after:.0f} s.",
+            ephemeral=True,
+        )
+        return
+    command_name = interaction.command.name if interaction.command else 'okänt'
+    shard_metrics.on_command(interaction_shard_id(interaction), command_name, ok=False)
+    record_interaction(interaction, command_name, ok=False)
     try:
         await interaction.response.send_message(f"❌ Ett fel uppstod: {error}", ephemeral=True)
     except discord.InteractionResponded:
-        await interaction.followup.send(f"❌ Ett fel uppstod: {error}", ephemeral=True)
\ No newline at end of file
+        await interaction.followup.send(f"❌ Ett fel uppstod: {error}", ephemeral=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+ORTBERIKNING - Fyll i saknad location från beskrivning och hemsida
+==================================================================
+my.ai.se-företagen (~900 st) saknar location_city/location_greater_stockholm,
+så /stad och /stockholm hittade bara EU-företag. Det här steget letar efter
+svenska ortnamn i beskrivningen och hemsidans domän.
+
+- gazetteer_se.csv: alla 290 kommuner, stadsdelar/orter och engelska/ASCII-
+  stavningar (Gothenburg -> Göteborg). Kolumnen storstockholm markerar de
+  26 kommunerna i Stockholms län
+- Alla namn kompileras till en Aho-Corasick-automat (aho_corasick.py), så
+  varje text läses en gång oavsett hur många ortnamn som finns
+- Företagsnamnet ("Lunds kommun") och domänen söks också, även i ASCII-
+  form (goteborg, malmo)
+- Varje träff vägs: "i/in/från Kista" väger mer än ett namn utan sammanhang,
+  och tvetydiga namn (Mark, Vara, Salem ...) räknas bara efter ett sådant ord.
+  Nämns flera orter delas säkerheten mellan dem
+- Resultatet skrivs med location_confidence (0-1). NULL betyder att platsen
+  kom från källdatan; sådana rader rörs aldrig
+- Alla företag med ort får sedan ortens koordinater (location_lat/lon) för
+  radiesökning med /nara (repository/geo.py)
+
+Körs av build_database.py efter importen. Fristående (bygger i en kopia och
+publicerar, se publish.py):
+    python enrich_locations.py
+"""
+
+import csv
+import os
+import re
+import sqlite3
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+from urllib.parse import urlparse
+
+from aho_corasick import Automaton, fold
+
+GAZETTEER_PATH = Path(__file__).with_name("gazetteer_se.csv")
+MIN_CONFIDENCE = float(os.getenv('LOCATION_MIN_CONFIDENCE', '0.5'))
+
+# Vikt per träff
+CUE_WEIGHT = 0.9      # "kontor i Stockholm", "based in Gothenburg"
+NAME_WEIGHT = 0.8     # "Region Stockholm", "Lunds kommun"
+HOST_WEIGHT = 0.7     # stockholm-ai.se, goteborg.example.com
+PLAIN_WEIGHT = 0.6    # namnet utan sammanhang
+
+# Ord direkt före ortnamnet som betyder "ligger i"
+CUE_WORDS = {'i', 'in', 'från', 'from', 'vid', 'at', 'near', 'nära', 'utanför', 'outside'}
+_PREVIOUS_WORD = re.compile(r"(\w+)\W*$")
+# ... eller direkt efter: "Stockholm-based", "Göteborgsbaserat"
+_BASED = re.compile(r"s?[- ]?(based|baserad|baserat)\b", re.IGNORECASE)
+
+
+class Place(NamedTuple):
+    city: str
+    municipality: str
+    greater_stockholm: bool
+    ambiguous: bool
+    lat: float
+    lon: float
+
+
+class Placement(NamedTuple):
+    city: str
+    greater_stockholm: bool
+    confidence: float
+
+
+def _ascii(name: str) -> str:
+    """Domäner och engelska texter skriver ofta goteborg, malmo"""
+    return name.translate(_ASCII)
+
+
+_ASCII = str.maketrans('åäöéü', 'aaoeu')
+
+
+class Gazetteer:
+    """Ortnamn kompilerade till en automat"""
+
+    def __init__(self, path: Path = GAZETTEER_PATH):
+        places: Dict[str, Place] = {}
+        with open(path, encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                name = fold(row['namn'])
+                places[name] = Place(
+                    city=row['ort'],
+                    municipality=row['kommun'],
+                    greater_stockholm=row['storstockholm'] == '1',
+                    ambiguous=row['tvetydig'] == '1',
+                    lat=float(row['lat']),
+                    lon=float(row['lon']),
+                )
+                # Korta ASCII-former krockar med engelska ord (Åre -> "are")
+                ascii_name = _ascii(name)
+                if ascii_name not in places:
+                    places[ascii_name] = places[name]._replace(
+                        ambiguous=places[name].ambiguous or len(ascii_name) < 5
+                    )
+        self.places = places
+        self.automaton = Automaton(places)
+        self.cities = sorted({place.city for place in places.values()})
+
+    def resolve(self, text: Optional[str]) -> Optional[Place]:
+        """
+        Ort för ett platsnamn: "Uppsala", "Gothenburg", "Stockholms kommun/Kista"
+
+        Exakt namn först, annars den sista (mest specifika) orten i texten.
+        """
+        if not text:
+            return None
+        folded = fold(text.strip())
+        place = self.places.get(folded) or self.places.get(_ascii(folded))
+        if place is None:
+            matches = self.automaton.find_words(text)
+            place = matches[-1][2] if matches else None
+        return place
+
+    def suggest(self, prefix: str = "", limit: int = 25) -> List[str]:
+        """Ortnamn för autocomplete"""
+        folded = fold(prefix.strip())
+        return [city for city in self.cities if fold(city).startswith(folded)][:limit]
+
+    def locate(self, description: Optional[str], website: Optional[str],
+               name: Optional[str] = None) -> Optional[Placement]:
+        """
+        Trolig ort för ett företag
+
+        Returns:
+            Placement eller None om inget ortnamn hittades
+        """
+        evidence: Dict[str, float] = defaultdict(float)
+        strongest: Dict[str, float] = defaultdict(float)
+        by_city: Dict[str, Place] = {}
+
+        def add(place: Place, weight: float):
+            by_city[place.city] = place
+            evidence[place.city] += weight
+            strongest[place.city] = max(strongest[place.city], weight)
+
+        if description:
+            for start, end, place in self.automaton.find_words(description):
+                previous = _PREVIOUS_WORD.search(description[max(0, start - 20):start])
+                cued = (previous is not None and previous.group(1).lower() in CUE_WORDS) \
+                    or _BASED.match(description, end) is not None
+                if place.ambiguous and not (cued and description[start].isupper()):
+                    continue
+                add(place, CUE_WEIGHT if cued else PLAIN_WEIGHT)
+
+        if name:
+            for _, _, place in self.automaton.find_words(name):
+                if not place.ambiguous:
+                    add(place, NAME_WEIGHT)
+
+        if website:
+            host = urlparse(website if '//' in website else f"//{website}").hostname or ''
+            for _, _, place in self.automaton.find_words(host):
+                if not place.ambiguous:
+                    add(place, HOST_WEIGHT)
+
+        if not evidence:
+            return None
+        best = max(evidence, key=lambda city: (evidence[city], strongest[city]))
+        share = evidence[best] / sum(evidence.values())
+        return Placement(best, by_city[best].greater_stockholm, round(strongest[best] * share, 2))
+
+
+LOCATION_COLUMNS = (
+    ('location_confidence', 'REAL'),
+    ('location_lat', 'REAL'),
+    ('location_lon', 'REAL'),
+)
+
+
+def ensure_location_columns(conn: sqlite3.Connection) -> None:
+    """Äldre databaser saknar location_confidence och koordinaterna"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(companies)")}
+    for name, sql_type in LOCATION_COLUMNS:
+        if name not in columns:
+            conn.execute(f"ALTER TABLE companies ADD COLUMN {name} {sql_type}")
+    conn.commit()
+
+
+def enrich_locations(conn: sqlite3.Connection, gazetteer: Optional[Gazetteer] = None,
+                     min_confidence: float = MIN_CONFIDENCE) -> Dict[str, int]:
+    """
+    Fyll i location för företag som saknar den (och räkna om tidigare berikade)
+
+    Returns:
+        Statistik: antal undersökta, ifyllda och i Storstockholm
+    """
+    ensure_location_columns(conn)
+    gazetteer = gazetteer or Gazetteer()
+    rows = conn.execute(
+        "SELECT id, name, description, website FROM companies "
+        "WHERE location_city IS NULL OR location_confidence IS NOT NULL"
+    ).fetchall()
+
+    updates = []
+    stats = {'scanned': len(rows), 'located': 0, 'greater_stockholm': 0}
+    for company_id, name, description, website in rows:
+        placement = gazetteer.locate(description, website, name)
+        if placement and placement.confidence >= min_confidence:
+            updates.append((placement.city, int(placement.greater_stockholm), placement.confidence, company_id))
+            stats['located'] += 1
+            stats['greater_stockholm'] += placement.greater_stockholm
+        else:
+            updates.append((None, None, None, company_id))
+
+    conn.executemany(
+        "UPDATE companies SET location_city = ?, location_greater_stockholm = ?, "
+        "location_confidence = ? WHERE id = ?",
+        updates,
+    )
+    conn.commit()
+    return stats
+
+
+def geocode_locations(conn: sqlite3.Connection, gazetteer: Optional[Gazetteer] = None) -> int:
+    """
+    Sätt location_lat/location_lon från orten för alla företag med location_city
+
+    Koordinaten är ortens centrum i gazetteer_se.csv - tillräckligt för
+    /nara, där radien är minst några kilometer.
+
+    Returns:
+        Antal företag som fick koordinater
+    """
+    ensure_location_columns(conn)
+    gazetteer = gazetteer or Gazetteer()
+    updates = []
+    for company_id, city in conn.execute("SELECT id, location_city FROM companies"):
+        place = gazetteer.resolve(city)
+        updates.append((place.lat, place.lon, company_id) if place else (None, None, company_id))
+    conn.executemany("UPDATE companies SET location_lat = ?, location_lon = ? WHERE id = ?", updates)
+    conn.commit()
+    return sum(1 for lat, _, _ in updates if lat is not None)
+
+
+def enrich_step(conn: sqlite3.Connection) -> None:
+    """Byggsteg med utskrift (build_database.py, import_eu_data.py)"""
+    gazetteer = Gazetteer()
+    stats = enrich_locations(conn, gazetteer)
+    print(f"\n📍 Ortberikning: {stats['located']} av {stats['scanned']} företag fick en ort "
+          f"({stats['greater_stockholm']} i Storstockholm)")
+    print(f"🗺️  Koordinater: {geocode_locations(conn, gazetteer)} företag")
+
+
+def main():
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "ai_companies.db"
+    if not Path(db_path).exists():
+        print(f"❌ Databas saknas: {db_path}")
+        print("   Kör först: python build_database.py")
+        sys.exit(1)
+
+    from build_database import export_snapshot_step
+    from publish import staged_database
+
+    with staged_database(db_path) as staging:
+        conn = sqlite3.connect(staging)
+        try:
+            enrich_step(conn)
+        finally:
+            conn.close()
+    export_snapshot_step(db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+EXPORT - Katalogen till CSV, JSONL eller Parquet
+================================================
+Samma filter som CompanyRepository.filter_companies (och menyval 2 i
+query_database.py). Raderna strömmas från databasmarkören direkt till
+filen, så minnet är konstant oavsett antal träffar; Parquet skrivs en
+radgrupp (PARQUET_ROW_GROUP rader) i taget.
+
+Körs av /export i en separat process (se discord_bot.py), så att botens
+event loop aldrig väntar på en stor export.
+
+Användning:
+    python export_catalog.py startups.csv --type startup
+    python export_catalog.py ml.jsonl --capability "machine learning" --min-quality 50
+    python export_catalog.py sthlm.parquet --greater-stockholm --praktik
+
+Parquet kräver: pip install pyarrow
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from repository import CompanyRepository
+
+FORMATS = ('csv', 'jsonl', 'parquet')
+# Kolumnerna i resultatlistor (repository.sqlite.LIST_COLUMNS)
+EXPORT_FIELDS = (
+    'id', 'name', 'website', 'type', 'description', 'location_city',
+    'location_greater_stockholm', 'data_quality_score', 'source',
+)
+PARQUET_ROW_GROUP = 10_000
+
+
+class ExportError(Exception):
+    """Okänt format eller saknat beroende"""
+
+
+def format_for(path: str, fmt: Optional[str] = None) -> str:
+    """Formatet, angivet eller från filändelsen"""
+    fmt = (fmt or Path(path).suffix.lstrip('.')).lower()
+    if fmt == 'json':
+        fmt = 'jsonl'
+    if fmt not in FORMATS:
+        raise ExportError(f"Okänt format '{fmt}' - välj {', '.join(FORMATS)}")
+    return fmt
+
+
+def _record(company: Dict) -> Dict:
+    record = {field: company.get(field) for field in EXPORT_FIELDS}
+    if record['location_greater_stockholm'] is not None:
+        record['location_greater_stockholm'] = bool(record['location_greater_stockholm'])
+    return record
+
+
+def write_csv(companies: Iterable[Dict], path: str) -> int:
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+        for company in companies:
+            writer.writerow(_record(company))
+            count += 1
+    return count
+
+
+def write_jsonl(companies: Iterable[Dict], path: str) -> int:
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for company in companies:
+            f.write(json.dumps(_record(company), ensure_ascii=False))
+            f.write('\n')
+            count += 1
+    return count
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ExportError("Parquet kräver pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+def write_parquet(companies: Iterable[Dict], path: str, row_group: int = PARQUET_ROW_GROUP) -> int:
+    pa = _import_pyarrow()
+    schema = pa.schema([
+        ('id', pa.int64()), ('name', pa.string()), ('website', pa.string()), ('type', pa.string()),
+        ('description', pa.string()), ('location_city', pa.string()),
+        ('location_greater_stockholm', pa.bool_()), ('data_quality_score', pa.int32()),
+        ('source', pa.string()),
+    ])
+    count = 0
+    batch = []
+    with pa.parquet.ParquetWriter(path, schema, compression='zstd') as writer:
+        for company in companies:
+            batch.append(_record(company))
+            if len(batch) >= row_group:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                count += len(batch)
+                batch = []
+        if batch or not count:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            count += len(batch)
+    return count
+
+
+WRITERS = {'csv': write_csv, 'jsonl': write_jsonl, 'parquet': write_parquet}
+
+
+def export_companies(path: str, fmt: Optional[str] = None, db_path: str = "ai_companies.db",
+                     database_url: Optional[str] = None, **filters) -> Dict:
+    """
+    Exportera filtrerade företag till en fil
+
+    Öppnar en egen anslutning, så funktionen kan köras i en annan process
+    (ProcessPoolExecutor) eller tråd än den som äger botens repository.
+
+    Args:
+        path: Utfil; skrivs till path + '.part' och byter namn när den är klar
+        fmt: 'csv', 'jsonl' eller 'parquet' (default: filändelsen)
+        db_path: SQLite-katalogen
+        database_url: PostgreSQL i stället för SQLite (se CLOUD_DATABASE.md)
+        **filters: Som CompanyRepository.filter_companies (utom limit)
+
+    Returns:
+        Statistik: rader, bytes, format och sökväg
+
+    Raises:
+        ExportError: Okänt format, saknad pyarrow eller databas som inte går att öppna
+    """
+    fmt = format_for(path, fmt)
+    if database_url:
+        from repository import PostgresBackend
+        repo = CompanyRepository(backend=PostgresBackend(database_url, min_size=1, max_size=1))
+    else:
+        repo = CompanyRepository(db_path)
+    if not repo.connect():
+        raise ExportError(f"Kunde inte öppna katalogen: {'PostgreSQL' if database_url else db_path}")
+    partial = f"{path}.part"
+    try:
+        rows = WRITERS[fmt](repo.iter_companies(**filters), partial)
+        os.replace(partial, path)
+    finally:
+        repo.close()
+        if os.path.exists(partial):
+            os.remove(partial)
+    return {'rows': rows, 'bytes': os.path.getsize(path), 'format': fmt, 'path': path}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('output', help='Utfil (.csv, .jsonl eller .parquet)')
+    parser.add_argument('--format', choices=FORMATS, help='Default: filändelsen')
+    parser.add_argument('--db', default=os.getenv('DATABASE_PATH', 'ai_companies.db'))
+    parser.add_argument('--type', dest='company_type', help="t.ex. 'startup'")
+    parser.add_argument('--sector', help="t.ex. 'Education'")
+    parser.add_argument('--domain', help="t.ex. 'IT & Software'")
+    parser.add_argument('--capability', dest='ai_capability', help="t.ex. 'machine learning'")
+    parser.add_argument('--city', dest='location_city', help='Del av stadens namn')
+    parser.add_argument('--greater-stockholm', dest='location_greater_stockholm', action='store_true', default=None)
+    parser.add_argument('--min-quality', type=int, default=0)
+    parser.add_argument('--praktik', dest='only_praktik_relevant', action='store_true',
+                        help='Bara praktik-relevanta typer')
+    args = vars(parser.parse_args())
+    output, fmt, db_path = args.pop('output'), args.pop('format'), args.pop('db')
+
+    try:
+        stats = export_companies(output, fmt, db_path, **args)
+    except ExportError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print(f"✅ {stats['rows']} företag exporterade till {output} ({stats['bytes'] / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,8 @@ from typing import Dict, List, Set
 from pathlib import Path
 import sys
 
+from tags import TagDictionary, normalize_step, split_tags
+
 
 class EUImporter:
     """Hanterar import av EU-data"""
@@ -26,6 +28,7 @@ class EUImporter:
         self.db_path = db_path
         self.conn = None
         self.cursor = None
+        self.tags = None
     
     def connect(self):
         """Anslut till databas"""
@@ -39,6 +42,7 @@ class EUImporter:
         if self.conn:
             self.conn.commit()
             self.conn.close()
+            self.conn = None
     
     def normalize_name(self, name: str) -> str:
         """
@@ -114,10 +118,7 @@ class EUImporter:
         Exempel:
         "artificial intelligence, saas" → ["artificial intelligence", "saas"]
         """
-        if not type_string:
-            return []
-        
-        return [t.strip() for t in type_string.split(',') if t.strip()]
+        return split_tags(type_string)
     
     def calculate_quality_score(self, company: Dict) -> int:
         """Beräkna datakvalitetspoäng för EU-företag"""
@@ -149,26 +150,10 @@ class EUImporter:
         return (max_id or 0) + 1
     
     def get_or_create_capability_id(self, capability: str) -> int:
-        """Hämta eller skapa AI-capability ID"""
-        if not capability:
-            return None
-        
-        # Kolla om finns
-        self.cursor.execute(
-            'SELECT id FROM ai_capabilities WHERE name = ?', 
-            (capability,)
-        )
-        result = self.cursor.fetchone()
-        
-        if result:
-            return result[0]
-        
-        # Skapa ny
-        self.cursor.execute(
-            'INSERT INTO ai_capabilities (name) VALUES (?)', 
-            (capability,)
-        )
-        return self.cursor.lastrowid
+        """Hämta eller skapa AI-capability ID (kanonisk form, se tags.py)"""
+        if self.tags is None:
+            self.tags = TagDictionary(self.conn)
+        return self.tags.id_for('ai_capabilities', capability)
     
     def import_csv(self, csv_path: str, only_unique: bool = True):
         """
@@ -266,7 +251,7 @@ class EUImporter:
                         cap_id = self.get_or_create_capability_id(capability)
                         if cap_id:
                             self.cursor.execute('''
-                            INSERT OR IGNORE INTO company_ai_capabilities 
+                            INSERT OR IGNORE INTO company_ai_capabilities (company_id, capability_id)
                             VALUES (?, ?)
                             ''', (next_id, cap_id))
                     
@@ -318,22 +303,42 @@ def main():
         print("   Kör först: python build_database.py")
         sys.exit(1)
     
-    # Importera
-    importer = EUImporter(db_path)
+    # Importera i en kopia och publicera atomiskt (se publish.py)
+    from build_database import ensure_flag_columns, export_snapshot_step
+    from enrich_locations import enrich_step
+    from publish import staged_database
+    from tag_capabilities import tagging_step
+    importer = None
     
     try:
-        importer.connect()
-        importer.import_csv(csv_file, only_unique=True)
+        with staged_database(db_path) as staging:
+            importer = EUImporter(staging)
+            importer.connect()
+            # Äldre databaser har kombinerade taggar och saknar name_key
+            normalize_step(importer.conn)
+            importer.import_csv(csv_file, only_unique=True)
+            # Koordinater för de nya orterna (och ortberikning om den saknas)
+            enrich_step(importer.conn)
+            # Förmågor ur beskrivningarna (och provenienskolumnen om den saknas)
+            tagging_step(importer.conn)
+            # Äldre databaser saknar flaggkolumnerna och deras index
+            ensure_flag_columns(importer.conn)
+            importer.close()
+
+        # Katalogen ändrades - exportera om snapshoten som botten läser
+        export_snapshot_step(db_path)
         
         print("🎉 Klart! Testa med: python query_database.py")
         
     except Exception as e:
         print(f"\n❌ FEL: {e}")
+        print(f"   {db_path} lämnades orörd")
         import traceback
         traceback.print_exc()
     
     finally:
-        importer.close()
+        if importer:
+            importer.close()
 
 
 if __name__ == "__main__":
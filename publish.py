@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+PUBLICERING - Bygg i en kopia och byt atomiskt
+==============================================
+build_database.py och import_eu_data.py skriver aldrig i den fil som botten
+läser. I stället:
+
+1. Den aktuella katalogen kopieras (SQLites backup-API, konsistent kopia)
+   till en temporär fil i samma mapp
+2. Importen körs mot kopian
+3. Kopian kontrolleras och optimeras: integrity_check, foreign_key_check,
+   VACUUM, ANALYZE och PRAGMA optimize
+4. Ändringarna mot den publicerade filen sparas som changeset
+   (sync_catalog.py) så att bot-värdarna slipper hämta hela filen
+5. os.replace() byter filen atomiskt
+
+En bot som läser samtidigt ser alltid en hel katalog - den gamla tills den
+öppnar filen igen (se CompanyRepository.reload_if_changed), aldrig en
+halvimporterad, och får aldrig "database is locked".
+
+Användning:
+    with staged_database("ai_companies.db") as staging:
+        builder = CatalogBuilder(staging)
+        ...
+"""
+
+import os
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows - ingen lås mellan samtidiga byggen
+    fcntl = None
+
+
+class PublishError(Exception):
+    """Den byggda databasen klarade inte kontrollerna och publicerades inte"""
+
+
+def finalize_database(path: str) -> None:
+    """
+    Kontrollera och optimera en färdigbyggd databas
+
+    Raises:
+        PublishError: Om integrity_check eller foreign_key_check hittar fel
+    """
+    conn = sqlite3.connect(path)
+    try:
+        integrity = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+        if integrity != ['ok']:
+            raise PublishError(f"integrity_check: {'; '.join(integrity[:5])}")
+        broken = conn.execute("PRAGMA foreign_key_check").fetchall()
+        if broken:
+            raise PublishError(f"foreign_key_check: {len(broken)} rader pekar på saknade rader")
+        # En fil utan -wal/-journal, så att en rename flyttar hela databasen
+        conn.execute("PRAGMA journal_mode = DELETE")
+        conn.execute("VACUUM")
+        # Färsk statistik så att planeraren väljer rätt (partiella) index
+        conn.execute("ANALYZE")
+        conn.execute("PRAGMA optimize")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _fsync_dir(path: Path) -> None:
+    """Se till att själva bytet (katalogposten) överlever ett strömavbrott"""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def _build_lock(db_path: Path) -> Iterator[None]:
+    """Ett bygge i taget per databas (annars skriver det sista över det första)"""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{db_path}.lock", 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+@contextmanager
+def staged_database(db_path: str, copy_current: bool = True,
+                    record_changes: bool = True) -> Iterator[str]:
+    """
+    Ge en temporär sökväg att bygga i och publicera den när blocket är klart
+
+    Args:
+        db_path: Databasen som ska ersättas
+        copy_current: Börja från en kopia av nuvarande databas (som när
+            importen skrev direkt i filen); False = bygg från tom fil
+        record_changes: Skriv en changeset till CHANGESET_DIR (default
+            changesets/, tom sträng = av) som bot-värdarna kan applicera,
+            se sync_catalog.py
+
+    Blir det ett undantag i blocket (eller i kontrollerna) tas den temporära
+    filen bort och den publicerade databasen lämnas orörd.
+    """
+    target = Path(db_path)
+    staging = target.with_name(f"{target.name}.building")
+    with _build_lock(target):
+        for leftover in (staging, Path(f"{staging}-journal")):
+            if leftover.exists():
+                leftover.unlink()
+        try:
+            if copy_current and target.exists():
+                source = sqlite3.connect(f"{target.resolve().as_uri()}?mode=ro", uri=True)
+                dest = sqlite3.connect(staging)
+                try:
+                    source.backup(dest)
+                finally:
+                    dest.close()
+                    source.close()
+            yield str(staging)
+            finalize_database(str(staging))
+            changeset_dir = os.getenv('CHANGESET_DIR', 'changesets')
+            if record_changes and changeset_dir and target.exists():
+                from sync_catalog import record_changeset
+                record_changeset(str(target), str(staging), str(target.resolve().parent / changeset_dir))
+            with open(staging, 'rb') as f:
+                os.fsync(f.fileno())
+            os.replace(staging, target)
+            _fsync_dir(target.resolve().parent)
+        except BaseException:
+            if staging.exists():
+                staging.unlink()
+            raise
+    print(f"📤 Publicerad: {target}")
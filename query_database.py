@@ -6,241 +6,39 @@ Script för att söka, filtrera och utforska företagsdatabasen.
 
 Användning:
     python query_database.py
+    python query_database.py --batch queries.jsonl [-o svar.jsonl] [--workers 4]
+
+Batch-läge: en fråga per rad (JSONL, "-" läser stdin), ett svar per rad i
+samma ordning. "ref" skickas tillbaka oförändrat:
+    {"ref": "a", "search": "vision", "limit": 5}
+    {"filter": {"company_type": "startup", "sector": "Education"}, "limit": 20}
+    {"id": 2325}
+    {"ids": [2325, 2326]}
 """
 
+import argparse
+import json
+import multiprocessing
 import sqlite3
-import random
-from typing import List, Dict, Optional
 import sys
+import time
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO
+
+from repository import CompanyRepository, PRAKTIK_TYPES
 
 
 # Definiera praktik-relevanta typer
-PRAKTIK_RELEVANTA_TYPER = ['corporation', 'startup', 'supplier']
+PRAKTIK_RELEVANTA_TYPER = list(PRAKTIK_TYPES)
 
 
-class CompanyQuery:
-    """Verktyg för att söka i företagsdatabasen"""
-    
-    def __init__(self, db_path: str = "ai_companies.db"):
-        self.db_path = db_path
-        self.conn = None
-        self.cursor = None
-        
-    def connect(self):
-        """Anslut till databas"""
-        try:
-            self.conn = sqlite3.connect(self.db_path)
-            self.conn.row_factory = sqlite3.Row
-            self.cursor = self.conn.cursor()
-            return True
-        except sqlite3.Error as e:
-            print(f"❌ Kunde inte ansluta till databas: {e}")
-            return False
-    
-    def close(self):
-        """Stäng databas"""
-        if self.conn:
-            self.conn.close()
-    
-    def search_by_name(self, search_term: str) -> List[Dict]:
-        """Sök företag efter namn"""
-        self.cursor.execute('''
-        SELECT * FROM companies 
-        WHERE name LIKE ? 
-        ORDER BY data_quality_score DESC
-        ''', (f'%{search_term}%',))
-        
-        return [dict(row) for row in self.cursor.fetchall()]
-    
-    def filter_companies(
-        self,
-        company_type: Optional[str] = None,
-        sector: Optional[str] = None,
-        domain: Optional[str] = None,
-        ai_capability: Optional[str] = None,
-        location_city: Optional[str] = None,  # NYTT!
-        location_greater_stockholm: Optional[bool] = None,  # NYTT!
-        min_quality: int = 0,
-        limit: int = 100,
-        only_praktik_relevant: bool = False  # NYTT!
-    ) -> List[Dict]:
-        """
-        Filtrera företag baserat på olika kriterier
-        
-        Args:
-            company_type: Typ av företag
-            sector: Sektor
-            domain: Domän
-            ai_capability: AI-förmåga
-            location_city: Stad (NYTT!)
-            location_greater_stockholm: Greater Stockholm boolean (NYTT!)
-            min_quality: Minimum datakvalitetspoäng
-            limit: Max antal resultat
-            only_praktik_relevant: Filtrera endast praktik-relevanta typer
-        """
-        query = 'SELECT DISTINCT c.* FROM companies c'
-        conditions = []
-        params = []
-        
-        # Join tables om vi filtrerar på dem
-        if sector:
-            query += '''
-            JOIN company_sectors cs ON c.id = cs.company_id
-            JOIN sectors s ON cs.sector_id = s.id
-            '''
-            conditions.append('s.name LIKE ?')
-            params.append(f'%{sector}%')
-        
-        if domain:
-            query += '''
-            JOIN company_domains cd ON c.id = cd.company_id
-            JOIN domains d ON cd.domain_id = d.id
-            '''
-            conditions.append('d.name LIKE ?')
-            params.append(f'%{domain}%')
-        
-        if ai_capability:
-            query += '''
-            JOIN company_ai_capabilities cac ON c.id = cac.company_id
-            JOIN ai_capabilities ac ON cac.capability_id = ac.id
-            '''
-            conditions.append('ac.name LIKE ?')
-            params.append(f'%{ai_capability}%')
-        
-        # WHERE-villkor
-        if company_type:
-            conditions.append('c.type = ?')
-            params.append(company_type)
-        
-        if min_quality > 0:
-            conditions.append('c.data_quality_score >= ?')
-            params.append(min_quality)
-        
-        # LOCATION-FILTER (NYTT!)
-        if location_city:
-            conditions.append('c.location_city LIKE ?')
-            params.append(f'%{location_city}%')
-            # OBS: my.ai.se-data (80%) saknar location - bara EU-företag har det
-        
-        if location_greater_stockholm is not None:
-            conditions.append('c.location_greater_stockholm = ?')
-            params.append(1 if location_greater_stockholm else 0)
-        
-        # PRAKTIK-RELEVANT FILTER
-        if only_praktik_relevant:
-            placeholders = ','.join('?' * len(PRAKTIK_RELEVANTA_TYPER))
-            conditions.append(f'c.type IN ({placeholders})')
-            params.extend(PRAKTIK_RELEVANTA_TYPER)
-        
-        # Lägg till WHERE
-        if conditions:
-            query += ' WHERE ' + ' AND '.join(conditions)
-        
-        query += ' ORDER BY c.data_quality_score DESC LIMIT ?'
-        params.append(limit)
-        
-        self.cursor.execute(query, params)
-        return [dict(row) for row in self.cursor.fetchall()]
-    
-    def get_random_companies(
-        self, 
-        count: int = 1, 
-        company_type: Optional[str] = None,
-        only_praktik_relevant: bool = False
-    ) -> List[Dict]:
-        """Hämta slumpmässiga företag"""
-        query = 'SELECT * FROM companies'
-        params = []
-        conditions = []
-        
-        if company_type:
-            conditions.append('type = ?')
-            params.append(company_type)
-        
-        if only_praktik_relevant:
-            placeholders = ','.join('?' * len(PRAKTIK_RELEVANTA_TYPER))
-            conditions.append(f'type IN ({placeholders})')
-            params.extend(PRAKTIK_RELEVANTA_TYPER)
-        
-        if conditions:
-            query += ' WHERE ' + ' AND '.join(conditions)
-        
-        query += ' ORDER BY RANDOM() LIMIT ?'
-        params.append(count)
-        
-        self.cursor.execute(query, params)
-        return [dict(row) for row in self.cursor.fetchall()]
-    
-    def get_company_details(self, company_id: int) -> Optional[Dict]:
-        """Hämta fullständig information om ett företag"""
-        # Grundinfo
-        self.cursor.execute('SELECT * FROM companies WHERE id = ?', (company_id,))
-        company = self.cursor.fetchone()
-        
-        if not company:
-            return None
-        
-        result = dict(company)
-        
-        # Sektorer
-        self.cursor.execute('''
-        SELECT s.name FROM sectors s
-        JOIN company_sectors cs ON s.id = cs.sector_id
-        WHERE cs.company_id = ?
-        ''', (company_id,))
-        result['sectors'] = [row[0] for row in self.cursor.fetchall()]
-        
-        # Domäner
-        self.cursor.execute('''
-        SELECT d.name FROM domains d
-        JOIN company_domains cd ON d.id = cd.domain_id
-        WHERE cd.company_id = ?
-        ''', (company_id,))
-        result['domains'] = [row[0] for row in self.cursor.fetchall()]
-        
-        # AI-förmågor
-        self.cursor.execute('''
-        SELECT ac.name FROM ai_capabilities ac
-        JOIN company_ai_capabilities cac ON ac.id = cac.capability_id
-        WHERE cac.company_id = ?
-        ''', (company_id,))
-        result['ai_capabilities'] = [row[0] for row in self.cursor.fetchall()]
-        
-        # Dimensioner
-        self.cursor.execute('''
-        SELECT d.name FROM dimensions d
-        JOIN company_dimensions cd ON d.id = cd.dimension_id
-        WHERE cd.company_id = ?
-        ''', (company_id,))
-        result['dimensions'] = [row[0] for row in self.cursor.fetchall()]
-        
-        return result
-    
-    def list_all_values(self, table: str) -> List[str]:
-        """Lista alla unika värden från en tabell"""
-        valid_tables = ['types', 'sectors', 'domains', 'ai_capabilities', 'dimensions']
-        
-        if table == 'types':
-            self.cursor.execute('SELECT DISTINCT type FROM companies WHERE type IS NOT NULL ORDER BY type')
-            return [row[0] for row in self.cursor.fetchall()]
-        
-        if table in valid_tables and table != 'types':
-            self.cursor.execute(f'SELECT name FROM {table} ORDER BY name')
-            return [row[0] for row in self.cursor.fetchall()]
-        
-        return []
-    
-    def list_cities(self) -> List[tuple]:
-        """Lista alla städer med antal företag"""
-        self.cursor.execute('''
-        SELECT location_city, COUNT(*) as count
-        FROM companies
-        WHERE location_city IS NOT NULL
-        GROUP BY location_city
-        ORDER BY count DESC
-        ''')
-        return self.cursor.fetchall()
-    
+class CompanyQuery(CompanyRepository):
+    """Verktyg för att söka i företagsdatabasen (samma läslager som botten)"""
+
+    def search_by_name(self, search_term: str, limit: Optional[int] = None) -> List[Dict]:
+        """Sök företag efter namn (alla träffar)"""
+        return super().search_by_name(search_term, limit)
+
     def print_company(self, company: Dict, detailed: bool = False):
         """Skriv ut företagsinformation"""
         print("\n" + "=" * 70)
@@ -336,8 +134,8 @@ def interactive_menu():
                 greater_sthlm = input("Greater Stockholm? (j/n): ").strip().lower()  # NYTT!
                 greater_stockholm = True if greater_sthlm == 'j' else None if not greater_sthlm else False
                 
-                sector = input("Sektor (del av namn): ").strip() or None
-                ai_cap = input("AI-förmåga (del av namn): ").strip() or None
+                sector = input("Sektor (t.ex. Education): ").strip() or None
+                ai_cap = input("AI-förmåga (t.ex. machine learning): ").strip() or None
                 
                 praktik = input("Endast praktik-relevanta? (j/n): ").strip().lower()
                 only_praktik = praktik == 'j'
@@ -420,5 +218,184 @@ def interactive_menu():
         db.close()
 
 
+# ==================== BATCH-LÄGE ====================
+
+BATCH_CHUNK = 200
+# Nycklar i en filterfråga (samma som CompanyRepository.filter_companies)
+FILTER_KEYS = {
+    'company_type', 'sector', 'domain', 'ai_capability', 'location_city',
+    'location_greater_stockholm', 'min_quality', 'only_praktik_relevant',
+}
+
+
+SCALAR_TYPES = (str, int, float, bool, type(None))
+
+
+def _query_limit(query: Dict) -> Optional[int]:
+    limit = query.get('limit', 10)
+    if limit is not None and (isinstance(limit, bool) or not isinstance(limit, int) or limit < 0):
+        raise ValueError("limit ska vara ett heltal >= 0")
+    return limit
+
+
+def run_query(db: CompanyQuery, query: Dict) -> List[Dict]:
+    """
+    Kör en batch-fråga
+
+    Raises:
+        ValueError: Frågan har ingen känd typ, okända filter eller
+            argument av fel typ
+    """
+    limit = _query_limit(query)
+    if 'search' in query:
+        if limit is None:
+            raise ValueError("search kräver en limit")
+        return db.search_by_name(str(query['search']), limit)
+    if 'filter' in query:
+        filters = query['filter']
+        if not isinstance(filters, dict):
+            raise ValueError("filter ska vara ett JSON-objekt")
+        unknown = set(filters) - FILTER_KEYS
+        if unknown:
+            raise ValueError(f"okända filter: {', '.join(sorted(unknown))}")
+        nested = sorted(key for key, value in filters.items() if not isinstance(value, SCALAR_TYPES))
+        if nested:
+            raise ValueError(f"filtervärden ska vara enkla värden: {', '.join(nested)}")
+        return db.filter_companies(limit=limit if limit is not None else 2 ** 31 - 1, **filters)
+    if 'id' in query:
+        company = db.get_company_details(int(query['id']))
+        return [company] if company else []
+    if 'ids' in query:
+        if not isinstance(query['ids'], list):
+            raise ValueError("ids ska vara en lista")
+        return db.get_companies([int(i) for i in query['ids']])
+    raise ValueError("frågan saknar search, filter, id eller ids")
+
+
+def answer_lines(db: CompanyQuery, lines: Iterable[tuple]) -> List[tuple]:
+    """
+    Svar på (radnummer, rad)
+
+    Returns:
+        (JSONL-rad, antal träffar) per fråga; fel blir {"error": ...} med
+        antal None
+    """
+    answers = []
+    for number, line in lines:
+        # Radnumret används bara när raden inte går att läsa som ett JSON-objekt
+        ref = number
+        try:
+            query = json.loads(line)
+            if not isinstance(query, dict):
+                raise ValueError("raden är inte ett JSON-objekt")
+            ref = query.get('ref', number)
+            results = run_query(db, query)
+            answer, count = {'ref': ref, 'results': results}, len(results)
+        except (ValueError, TypeError, OverflowError, sqlite3.Error) as e:
+            # Fel på en rad stoppar aldrig resten av batchen
+            answer, count = {'ref': ref, 'error': str(e)}, None
+        answers.append((json.dumps(answer, ensure_ascii=False, default=str), count))
+    return answers
+
+
+def _numbered(source: TextIO) -> Iterator[tuple]:
+    for number, line in enumerate(source, 1):
+        if line.strip():
+            yield number, line
+
+
+def _chunks(items: Iterator, size: int) -> Iterator[List]:
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# En anslutning per arbetsprocess, öppnad en gång (statement-cachen återanvänds)
+_worker_db: Optional[CompanyQuery] = None
+
+
+def _init_worker(db_path: str) -> None:
+    global _worker_db
+    _worker_db = CompanyQuery(db_path)
+    _worker_db.connect()
+
+
+def _answer_chunk(chunk: List[tuple]) -> List[tuple]:
+    return answer_lines(_worker_db, chunk)
+
+
+def run_batch(source: TextIO, output: TextIO, db_path: str = "ai_companies.db",
+              workers: int = 1, chunk_size: int = BATCH_CHUNK) -> Dict:
+    """
+    Kör alla frågor i source och skriv svaren till output, i samma ordning
+
+    Med workers > 1 delas frågorna i block om chunk_size rader som körs i en
+    processpool (en anslutning per process); svaren skrivs fortfarande i
+    ordning så fort deras block är klart.
+
+    Returns:
+        Statistik: frågor, fel, rader och sekunder
+    """
+    started = time.perf_counter()
+    stats = {'queries': 0, 'errors': 0, 'rows': 0}
+
+    def write(answers: List[tuple]) -> None:
+        for answer, count in answers:
+            output.write(answer)
+            output.write('\n')
+            stats['queries'] += 1
+            if count is None:
+                stats['errors'] += 1
+            else:
+                stats['rows'] += count
+
+    chunks = _chunks(_numbered(source), chunk_size)
+    if workers > 1:
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(db_path,)) as pool:
+            for answers in pool.imap(_answer_chunk, chunks):
+                write(answers)
+    else:
+        db = CompanyQuery(db_path)
+        if not db.connect():
+            raise RuntimeError(f"Kunde inte ansluta till {db_path}")
+        try:
+            for chunk in chunks:
+                write(answer_lines(db, chunk))
+        finally:
+            db.close()
+    output.flush()
+    stats['seconds'] = time.perf_counter() - started
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch', metavar='FIL', help='JSONL med frågor ("-" = stdin)')
+    parser.add_argument('-o', '--output', default='-', help='Svar som JSONL (default: stdout)')
+    parser.add_argument('--workers', type=int, default=1, help='Processer för stora batcher')
+    parser.add_argument('--db', default='ai_companies.db')
+    args = parser.parse_args()
+
+    if not args.batch:
+        interactive_menu()
+        return
+
+    source = sys.stdin if args.batch == '-' else open(args.batch, encoding='utf-8')
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        stats = run_batch(source, output, args.db, args.workers)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+    rate = stats['queries'] / stats['seconds'] if stats['seconds'] else 0
+    # Sammanfattningen på stderr så att stdout bara innehåller svaren
+    print(f"✅ {stats['queries']} frågor ({stats['errors']} fel), {stats['rows']} rader "
+          f"på {stats['seconds']:.2f} s - {rate:.0f} frågor/s", file=sys.stderr)
+
+
 if __name__ == "__main__":
-    interactive_menu()
+    main()
@@ -0,0 +1,42 @@
+"""
+Repository för AI-företagskatalogen
+===================================
+Ett gemensamt läslager för botten, CLI:t och exporter:
+
+    from repository import CompanyRepository
+
+    repo = CompanyRepository("ai_companies.db", snapshot_path="ai_companies.snapshot")
+    repo.connect()
+    repo.filter_by_city("Stockholm")
+
+- filters.py  - praktik/daglig post som SQL-fragment och Python-predikat
+- backend.py  - CatalogBackend, interfacet en databas implementerar
+- sqlite.py   - SQLiteBackend (read-only, mmap, statement-cache)
+- postgres.py - PostgresBackend (asyncpg-pool, delad databas för flera instanser)
+- companies.py - CompanyRepository med snapshot- och indexlagret
+- geo.py      - rutnätsindex och avstånd för radiesökning (/nara)
+- autocomplete.py - prefixsökning i minnet för autocomplete
+"""
+
+from .autocomplete import AutocompleteIndex
+from .backend import CatalogBackend
+from .companies import CompanyRepository, nearby_label, parse_nearby_label
+from .filters import PRAKTIK_TYPES, is_daily_eligible, is_praktik
+from .geo import GridIndex, haversine_km
+from .postgres import PostgresBackend
+from .sqlite import SQLiteBackend
+
+__all__ = [
+    'AutocompleteIndex',
+    'CatalogBackend',
+    'CompanyRepository',
+    'GridIndex',
+    'haversine_km',
+    'nearby_label',
+    'parse_nearby_label',
+    'SQLiteBackend',
+    'PostgresBackend',
+    'PRAKTIK_TYPES',
+    'is_praktik',
+    'is_daily_eligible',
+]
@@ -0,0 +1,40 @@
+"""
+Autocomplete i minnet
+=====================
+Sorterade facettvärden (typ, stad) med antal per värde. Prefixsökningen är
+en binärsökning, så autocomplete behöver ingen SQL-fråga per tangenttryck.
+
+Byggs av CompanyRepository.load_facets (anropas från warmup-steget i
+discord_bot.py).
+"""
+
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+
+class AutocompleteIndex:
+    """Sorterad lista med (gemener, värde, antal) för prefixsökning utan SQL"""
+
+    def __init__(self, counts: Dict[str, int]):
+        self._entries: List[Tuple[str, str, int]] = sorted(
+            (value.lower(), value, count) for value, count in counts.items() if value
+        )
+        self._keys = [entry[0] for entry in self._entries]
+        self._counts = {value: count for _, value, count in self._entries}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def suggest(self, prefix: str = "", limit: int = 25) -> List[str]:
+        """Värden som börjar med prefix (skiftlägesokänsligt), i bokstavsordning"""
+        prefix = prefix.lower()
+        start = bisect_left(self._keys, prefix)
+        results = []
+        for key, value, _ in self._entries[start:]:
+            if not key.startswith(prefix) or len(results) >= limit:
+                break
+            results.append(value)
+        return results
+
+    def count(self, value: str) -> Optional[int]:
+        return self._counts.get(value)
@@ -0,0 +1,144 @@
+"""
+Backend-interface för katalogen
+===============================
+CompanyRepository pratar bara med en CatalogBackend. SQLiteBackend är
+standard; andra databaser implementerar samma metoder och får då snapshot-
+och indexlagret i CompanyRepository på köpet.
+
+Alla metoder returnerar vanliga dicts (inte databasspecifika rader).
+"""
+
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class CatalogBackend(ABC):
+    """Läsoperationer mot företagskatalogen"""
+
+    #: Sökväg till databasfilen, None för databaser som inte är filer
+    db_path: Optional[str] = None
+    connections_opened: int = 0
+
+    @abstractmethod
+    def connect(self) -> bool:
+        """Öppna anslutningen (idempotent). False om det inte gick."""
+
+    @abstractmethod
+    def close(self) -> None:
+        """Stäng anslutningen"""
+
+    @property
+    @abstractmethod
+    def connected(self) -> bool:
+        """Är anslutningen öppen?"""
+
+    # ---------- slump och uppslagning ----------
+
+    @abstractmethod
+    def random_companies(self, count: int = 1, company_type: Optional[str] = None,
+                         only_praktik_relevant: bool = False, strict: bool = False) -> List[Dict]:
+        """
+        Slumpa företag
+
+        Args:
+            only_praktik_relevant: Bara praktik-relevanta typer
+            strict: Kraven för daglig post (hemsida, logga, beskrivning)
+        """
+
+    @abstractmethod
+    def daily_eligible_ids(self) -> List[int]:
+        """ID:n för alla företag som kvalificerar för daglig post, sorterade"""
+
+    @abstractmethod
+    def get_company(self, company_id: int, capability_limit: Optional[int] = 5) -> Optional[Dict]:
+        """Ett företag med AI-förmågor"""
+
+    @abstractmethod
+    def get_company_details(self, company_id: int) -> Optional[Dict]:
+        """Ett företag med alla kolumner, sektorer, domäner, förmågor och dimensioner"""
+
+    @abstractmethod
+    def get_companies(self, company_ids: List[int]) -> List[Dict]:
+        """Flera företag i given ordning"""
+
+    # ---------- sökning och filter ----------
+
+    @abstractmethod
+    def search_by_name(self, search_term: str, limit: Optional[int] = 5) -> List[Dict]:
+        """Namn innehåller söktermen, sorterat på namn"""
+
+    @abstractmethod
+    def filter_by_type(self, company_type: str, limit: int = 5) -> List[Dict]:
+        """Slumpade företag av en typ som har hemsida"""
+
+    @abstractmethod
+    def filter_by_city(self, city: str, limit: int = 10) -> List[Dict]:
+        """Slumpade praktik-relevanta företag i en stad"""
+
+    @abstractmethod
+    def filter_greater_stockholm(self, limit: int = 10) -> List[Dict]:
+        """Slumpade praktik-relevanta företag i Greater Stockholm"""
+
+    @abstractmethod
+    def filter_companies(self, company_type: Optional[str] = None, sector: Optional[str] = None,
+                         domain: Optional[str] = None, ai_capability: Optional[str] = None,
+                         location_city: Optional[str] = None,
+                         location_greater_stockholm: Optional[bool] = None,
+                         min_quality: int = 0, limit: int = 100,
+                         only_praktik_relevant: bool = False) -> List[Dict]:
+        """Kombinerade filter, sorterat på datakvalitet"""
+
+    @abstractmethod
+    def filter_page(self, filters: Dict, cursor: Optional[Tuple[int, int]] = None,
+                    limit: int = 20) -> Tuple[List[Dict], bool]:
+        """filter_companies-filtren med keyset-paginering på (data_quality_score, id)"""
+
+    def iter_companies(self, **filters) -> Iterator[Dict]:
+        """
+        Samma filter som filter_companies, alla träffar (exporter)
+
+        Standard är filter_companies utan praktisk gräns; SQLiteBackend
+        strömmar i stället rad för rad.
+        """
+        yield from self.filter_companies(limit=2 ** 31 - 1, **filters)
+
+    @abstractmethod
+    def browse_page(self, kind: str, label: str, cursor: Optional[Tuple[int, int]] = None,
+                    direction: str = 'next', limit: int = 5) -> Tuple[List[Dict], bool]:
+        """Keyset-paginering på (data_quality_score, id)"""
+
+    # ---------- listor och facetter ----------
+
+    @abstractmethod
+    def suggest(self, kind: str, prefix: str = "", limit: int = 25) -> List[str]:
+        """Distinkta värden för autocomplete; kind = 'type' eller 'city'"""
+
+    @abstractmethod
+    def facet_counts(self, kind: str) -> Dict[str, int]:
+        """Antal företag per värde; kind = 'type' eller 'city'"""
+
+    @abstractmethod
+    def list_all_values(self, table: str) -> List[str]:
+        """Alla värden för typer, sektorer, domäner, AI-förmågor eller dimensioner"""
+
+    def coordinates(self) -> List[Tuple[int, float, float]]:
+        """(id, lat, lon) för företag med känd position (radiesökning, se geo.py)"""
+        return []
+
+    def changed_on_disk(self) -> bool:
+        """Har databasen bytts ut sedan anslutningen öppnades? (se publish.py)"""
+        return False
+
+    def reopen(self) -> bool:
+        """Öppna anslutningen på nytt"""
+        self.close()
+        return self.connect()
+
+    async def call(self, method: str, *args):
+        """Awaita en läsmetod från en event loop; standard är trådpoolen"""
+        return await asyncio.to_thread(getattr(self, method), *args)
+
+    def warm(self, deadline: Optional[float] = None) -> int:
+        """Läs in heta tabeller/index i cachen; returnerar antal steg"""
+        return 0
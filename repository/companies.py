@@ -0,0 +1,419 @@
+"""
+CompanyRepository
+=================
+Det enda läslagret för katalogen - används av botten, CLI:t och exporter.
+
+Ovanpå en CatalogBackend (SQLite som standard) ligger:
+- Snapshot: uppslagningar på ID läses ur den memory-mappade snapshoten
+  (catalog_snapshot.py) när den finns och är aktuell
+- Index i minnet: antal per typ/stad för autocomplete (fylls av warmup)
+  och ett rutnät över företagens koordinater för /nara (geo.py)
+"""
+
+import asyncio
+import os
+import time
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .autocomplete import AutocompleteIndex
+from .backend import CatalogBackend
+from .geo import GridIndex
+from .sqlite import SQLiteBackend
+
+# Besvaras ur snapshoten i minnet när den är laddad (se run)
+SNAPSHOT_METHODS = ('get_company', 'get_companies', 'get_daily_eligible_ids')
+
+# /nara kodar plats och radie i en etikett: "25|Uppsala"
+NEARBY_SEPARATOR = '|'
+
+
+def nearby_label(place: str, radius_km: float) -> str:
+    return f"{radius_km:g}{NEARBY_SEPARATOR}{place}"
+
+
+def parse_nearby_label(label: str) -> Tuple[str, float]:
+    radius, _, place = label.partition(NEARBY_SEPARATOR)
+    return place, float(radius)
+
+
+class CompanyRepository:
+    """Databas-interface för AI-företag"""
+
+    def __init__(self, db_path: str = "ai_companies.db", mmap_size: int = 256 * 1024 * 1024,
+                 snapshot_path: Optional[str] = None, backend: Optional[CatalogBackend] = None):
+        """
+        Args:
+            db_path: SQLite-fil (används om ingen backend anges)
+            mmap_size: Bytes att memory-mappa av SQLite-filen
+            snapshot_path: Katalog-snapshot för uppslagningar på ID
+            backend: Annan backend än SQLite
+        """
+        self.backend = backend or SQLiteBackend(db_path, mmap_size)
+        self.snapshot_path = snapshot_path
+        self.snapshot = None
+        self._snapshot_id = None
+        # Fylls av warmup; autocomplete faller tillbaka på backend tills dess
+        self.autocomplete: Dict[str, AutocompleteIndex] = {}
+        # Byggs när snapshoten laddas, annars vid första radiesökningen
+        self.geo: Optional[GridIndex] = None
+        self._gazetteer = None
+
+    @property
+    def db_path(self) -> Optional[str]:
+        return self.backend.db_path
+
+    @property
+    def conn(self):
+        """Backendens anslutning (None när den är stängd)"""
+        return getattr(self.backend, 'conn', None)
+
+    @property
+    def connections_opened(self) -> int:
+        return self.backend.connections_opened
+
+    def connect(self) -> bool:
+        """Anslut (idempotent) och ladda snapshoten om den finns"""
+        if self.backend.connected:
+            return True
+        if not self.backend.connect():
+            return False
+        self.load_snapshot()
+        return True
+
+    def close(self):
+        """Stäng databas-anslutning"""
+        self.backend.close()
+        self.geo = None
+        if self.snapshot:
+            self.snapshot.close()
+            self.snapshot = None
+
+    def load_snapshot(self) -> bool:
+        """
+        Memory-mappa katalog-snapshoten om den finns och är aktuell
+
+        Uppslagningar på ID (dagens företag, knappar, resultatlistor) läses
+        då direkt ur snapshoten. Sökningar och bläddring går fortfarande
+        mot backenden.
+        """
+        self._snapshot_id = self._snapshot_identity()
+        if not self.snapshot_path or not Path(self.snapshot_path).exists():
+            return False
+        # Importeras först här - katalogen fungerar utan snapshot
+        from catalog_snapshot import CatalogSnapshot, SnapshotError
+        if self.db_path and Path(self.db_path).exists() and \
+                Path(self.snapshot_path).stat().st_mtime < Path(self.db_path).stat().st_mtime:
+            print(f"⚠️ {self.snapshot_path} är äldre än databasen - kör build_database.py --snapshot-only")
+            return False
+        try:
+            self.snapshot = CatalogSnapshot.open(self.snapshot_path)
+        except SnapshotError as e:
+            print(f"⚠️ Kunde inte läsa snapshot: {e}")
+            return False
+        index = GridIndex(self.snapshot.coordinates())
+        self.geo = index if len(index) else None
+        return True
+
+    def _snapshot_identity(self) -> Optional[Tuple[int, int]]:
+        if not self.snapshot_path:
+            return None
+        try:
+            st = os.stat(self.snapshot_path)
+        except OSError:
+            return None
+        return st.st_ino, st.st_mtime_ns
+
+    @property
+    def catalog_version(self) -> Optional[str]:
+        """
+        Ändras när en ny katalog publiceras (ETag i api_server.py)
+
+        Snapshotens innehållshash om den är laddad, annars databasfilens
+        identitet. None för databaser utan fil (PostgreSQL).
+        """
+        if self.snapshot:
+            return self.snapshot.content_hash
+        file_id = getattr(self.backend, 'file_id', None)
+        return '-'.join(map(str, file_id)) if file_id else None
+
+    def reload_if_changed(self) -> bool:
+        """
+        Öppna om katalogen och snapshoten om de publicerats på nytt
+
+        build_database.py och import_eu_data.py byter filerna atomiskt
+        (publish.py); utan omöppning skulle botten läsa den gamla katalogen
+        tills den startas om.
+
+        Returns:
+            True om något lästes in på nytt
+        """
+        if not self.backend.connected:
+            return False
+        db_changed = self.backend.changed_on_disk()
+        if not db_changed and self._snapshot_identity() == self._snapshot_id:
+            return False
+        if db_changed and not self.backend.reopen():
+            return False
+        self.geo = None
+        if self.snapshot:
+            self.snapshot.close()
+            self.snapshot = None
+        self.load_snapshot()
+        if self.autocomplete:
+            self.load_facets()
+        return True
+
+    async def call(self, method: str, *args):
+        """
+        Kör en sök-/filtermetod på backenden utan att blockera event loopen
+
+        SQLite körs i trådpoolen; PostgreSQL awaitas direkt på sin pool.
+        """
+        return await self.backend.call(method, *args)
+
+    async def run(self, method: str, *args):
+        """
+        Kör en metod på repositoryt (browse_page, get_company ...) utan att
+        blockera event loopen
+
+        Uppslagningar som snapshoten svarar på körs direkt; allt annat i
+        trådpoolen, där PostgresBackend kan vänta på nätverket utan att
+        gateway-loopen står still.
+        """
+        if self.snapshot and method in SNAPSHOT_METHODS:
+            return getattr(self, method)(*args)
+        return await asyncio.to_thread(getattr(self, method), *args)
+
+    # ---------- autocomplete ----------
+
+    def suggest_types(self, prefix: str = "", limit: int = 25) -> List[str]:
+        """Hämta distinkta företagstyper för autocomplete"""
+        if 'type' in self.autocomplete:
+            return self.autocomplete['type'].suggest(prefix, limit)
+        if not self.backend.connected:
+            return []
+        return self.backend.suggest('type', prefix, limit)
+
+    def suggest_cities(self, prefix: str = "", limit: int = 25) -> List[str]:
+        """Hämta distinkta städer för autocomplete"""
+        if 'city' in self.autocomplete:
+            return self.autocomplete['city'].suggest(prefix, limit)
+        if not self.backend.connected:
+            return []
+        return self.backend.suggest('city', prefix, limit)
+
+    # ---------- warmup ----------
+
+    def warm_tables(self, deadline: Optional[float] = None) -> int:
+        """Läs igenom heta tabeller/index så att sidorna ligger i cachen"""
+        if not self.backend.connected:
+            return 0
+        return self.backend.warm(deadline)
+
+    def load_facets(self, deadline: Optional[float] = None) -> None:
+        """Räkna företag per typ och stad och bygg autocomplete-index i minnet"""
+        if not self.backend.connected:
+            return
+        for kind in ('type', 'city'):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            self.autocomplete[kind] = AutocompleteIndex(self.backend.facet_counts(kind))
+
+    def facet_count(self, kind: str, value: str) -> Optional[int]:
+        """Antal företag för en typ/stad (None innan warmup)"""
+        index = self.autocomplete.get(kind)
+        return index.count(value) if index else None
+
+    # ---------- uppslagning ----------
+
+    def get_random_company(self, only_praktik_relevant: bool = True) -> Optional[Dict]:
+        """
+        Hämta ett slumpmässigt företag
+
+        Args:
+            only_praktik_relevant: Om True, visa bara praktik-relevanta företag
+        """
+        return self._random_one(only_praktik_relevant=only_praktik_relevant)
+
+    def get_random_company_strict(self) -> Optional[Dict]:
+        """Slumpa ett företag som uppfyller minimikraven för daglig post"""
+        return self._random_one(strict=True)
+
+    def _random_one(self, **filters) -> Optional[Dict]:
+        if not self.backend.connected:
+            return None
+        rows = self.backend.random_companies(1, **filters)
+        return self.get_company(rows[0]['id']) if rows else None
+
+    def get_random_companies(self, count: int = 5, company_type: Optional[str] = None,
+                             only_praktik_relevant: bool = False) -> List[Dict]:
+        """Slumpa fram företag med alla kolumner"""
+        if not self.backend.connected:
+            return []
+        return self.backend.random_companies(count, company_type, only_praktik_relevant)
+
+    def get_daily_eligible_ids(self) -> List[int]:
+        """Hämta ID:n för alla företag som uppfyller kraven för daglig post"""
+        if self.snapshot:
+            from catalog_snapshot import FLAG_DAILY
+            return self.snapshot.ids_with_flag(FLAG_DAILY)
+        if not self.backend.connected:
+            return []
+        return self.backend.daily_eligible_ids()
+
+    def get_company(self, company_id: int) -> Optional[Dict]:
+        """Hämta ett företag på ID (uppslagning på primärnyckel)"""
+        if self.snapshot:
+            return self.snapshot.get(company_id)
+        if not self.backend.connected:
+            return None
+        return self.backend.get_company(company_id)
+
+    def get_companies(self, company_ids: List[int]) -> List[Dict]:
+        """Hämta flera företag på ID i given ordning (för att återskapa resultatlistor)"""
+        if self.snapshot:
+            return [c for c in map(self.snapshot.get, company_ids) if c is not None]
+        if not self.backend.connected or not company_ids:
+            return []
+        return self.backend.get_companies(company_ids)
+
+    def get_company_details(self, company_id: int) -> Optional[Dict]:
+        """Hämta all information om ett företag inkl. taggar"""
+        if not self.backend.connected:
+            return None
+        return self.backend.get_company_details(company_id)
+
+    # ---------- sökning och filter ----------
+
+    def search_by_name(self, search_term: str, limit: Optional[int] = 5) -> List[Dict]:
+        """Sök företag efter namn (limit=None ger alla träffar)"""
+        if not self.backend.connected:
+            return []
+        return self.backend.search_by_name(search_term, limit)
+
+    def filter_by_type(self, company_type: str, limit: int = 5) -> List[Dict]:
+        """Filtrera företag på typ"""
+        if not self.backend.connected:
+            return []
+        return self.backend.filter_by_type(company_type, limit)
+
+    def filter_by_city(self, city: str, limit: int = 10) -> List[Dict]:
+        """Filtrera företag på stad (bara praktik-relevanta)"""
+        if not self.backend.connected:
+            return []
+        return self.backend.filter_by_city(city, limit)
+
+    def filter_greater_stockholm(self, limit: int = 10) -> List[Dict]:
+        """Filtrera företag i Greater Stockholm (bara praktik-relevanta)"""
+        if not self.backend.connected:
+            return []
+        return self.backend.filter_greater_stockholm(limit)
+
+    def filter_companies(self, **filters) -> List[Dict]:
+        """Kombinerade filter (se CatalogBackend.filter_companies)"""
+        if not self.backend.connected:
+            return []
+        return self.backend.filter_companies(**filters)
+
+    def filter_page(self, filters: Dict, cursor: Optional[Tuple[int, int]] = None,
+                    limit: int = 20) -> Tuple[List[Dict], bool]:
+        """En sida av filter_companies, keyset-paginerad (se SQLiteBackend.filter_page)"""
+        if not self.backend.connected:
+            return [], False
+        return self.backend.filter_page(filters, cursor, limit)
+
+    def iter_companies(self, **filters) -> Iterator[Dict]:
+        """Alla träffar för filter_companies-filtren, rad för rad (se export_catalog.py)"""
+        if not self.backend.connected:
+            return iter(())
+        return self.backend.iter_companies(**filters)
+
+    def browse_page(self, kind: str, label: str, cursor=None, direction: str = 'next',
+                    limit: int = 5):
+        """Keyset-paginering, se SQLiteBackend.browse_page ('nara': nearby_page)"""
+        if not self.backend.connected:
+            return [], False
+        if kind == 'nara':
+            place, radius_km = parse_nearby_label(label)
+            return self.nearby_page(place, radius_km, cursor, direction, limit)
+        return self.backend.browse_page(kind, label, cursor, direction, limit)
+
+    # ---------- radiesökning ----------
+
+    @property
+    def gazetteer(self):
+        """Ortnamn med koordinater (gazetteer_se.csv), laddas vid första användning"""
+        if self._gazetteer is None:
+            from enrich_locations import Gazetteer
+            self._gazetteer = Gazetteer()
+        return self._gazetteer
+
+    def suggest_places(self, prefix: str = "", limit: int = 25) -> List[str]:
+        """Ortnamn för autocomplete i /nara"""
+        return self.gazetteer.suggest(prefix, limit)
+
+    def geo_index(self) -> GridIndex:
+        if self.geo is None:
+            self.geo = GridIndex(self.backend.coordinates() if self.backend.connected else [])
+        return self.geo
+
+    def nearby(self, place: str, radius_km: float) -> Optional[List[Tuple[float, int]]]:
+        """
+        Företag inom radius_km från en ort
+
+        Returns:
+            (avstånd i km, företags-ID) närmast först, eller None om orten är okänd
+        """
+        resolved = self.gazetteer.resolve(place)
+        if resolved is None:
+            return None
+        return self.geo_index().within(resolved.lat, resolved.lon, radius_km)
+
+    def nearby_page(self, place: str, radius_km: float, cursor: Optional[Tuple[int, int]] = None,
+                    direction: str = 'next', limit: int = 5) -> Tuple[List[Dict], bool]:
+        """
+        En sida av nearby() med samma keyset-kontrakt som browse_page
+
+        Ordningen är (avstånd i meter, id) stigande och cursorn är den
+        nyckeln för en kantrad. Raderna får 'distance_km'.
+        """
+        hits = self.nearby(place, radius_km) or []
+        # Sortera på den avrundade nyckeln: två avstånd inom samma meter kan
+        # annars hamna i annan ordning än (meter, id) och bisect hoppar över rader
+        keys = sorted((round(distance * 1000), company_id) for distance, company_id in hits)
+        if cursor is None:
+            start = 0
+        elif direction == 'next':
+            start = bisect_right(keys, tuple(cursor))
+        elif direction == 'from':
+            start = bisect_left(keys, tuple(cursor))
+        elif direction == 'prev':
+            end = bisect_left(keys, tuple(cursor))
+            start = max(0, end - limit)
+            selected, has_more = keys[start:end], start > 0
+        else:
+            raise ValueError(f"Okänd riktning: {direction}")
+        if cursor is None or direction != 'prev':
+            selected, has_more = keys[start:start + limit], len(keys) > start + limit
+
+        companies = {c['id']: c for c in self.get_companies([company_id for _, company_id in selected])}
+        rows = []
+        for distance_m, company_id in selected:
+            if company_id in companies:
+                rows.append(dict(companies[company_id], distance_km=distance_m / 1000))
+        return rows, has_more
+
+    def list_all_values(self, table: str) -> List[str]:
+        """Alla värden för 'types', 'sectors', 'domains', 'ai_capabilities' eller 'dimensions'"""
+        if not self.backend.connected:
+            return []
+        return self.backend.list_all_values(table)
+
+    def list_cities(self) -> List[Tuple[str, int]]:
+        """Städer med antal företag, flest först"""
+        if not self.backend.connected:
+            return []
+        counts = self.backend.facet_counts('city')
+        return sorted(counts.items(), key=lambda item: (-item[1], item[0]))
@@ -0,0 +1,74 @@
+"""
+Gemensamma filter för katalogen
+===============================
+Alla lager (bot, CLI, snapshot-export) använder samma definition av vad
+som är praktik-relevant och vad som kvalificerar för daglig post, både
+som SQL-fragment och som Python-predikat.
+
+SQL-fragmenten är konstanta strängar (typerna inbakade, inga parametrar),
+så varje fråga får samma text varje gång och återanvänder sitt förberedda
+statement i anslutningens statement-cache.
+"""
+
+from typing import Mapping, Optional
+
+# Företagstyper som tar emot praktikanter
+PRAKTIK_TYPES = ('corporation', 'startup', 'supplier')
+
+_TYPES_SQL = ", ".join(f"'{t}'" for t in PRAKTIK_TYPES)
+
+
+def _col(column: str, alias: str) -> str:
+    return f"{alias}.{column}" if alias else column
+
+
+def has_text_sql(column: str, alias: str = "") -> str:
+    """Kolumnen är satt och inte tom"""
+    c = _col(column, alias)
+    return f"{c} IS NOT NULL AND TRIM({c}) <> ''"
+
+
+def praktik_types_sql(alias: str = "") -> str:
+    """Typen är praktik-relevant"""
+    return f"{_col('type', alias)} IN ({_TYPES_SQL})"
+
+
+def praktik_sql(alias: str = "") -> str:
+    """Praktik-relevant typ och har hemsida (det botten visar i listor)"""
+    return f"{praktik_types_sql(alias)} AND {has_text_sql('website', alias)}"
+
+
+def daily_sql(alias: str = "") -> str:
+    """Uppfyller kraven för daglig post: praktik + logga + beskrivning"""
+    return (
+        f"{praktik_sql(alias)} AND {has_text_sql('logo_url', alias)}"
+        f" AND {has_text_sql('description', alias)}"
+    )
+
+
+# Genererade kolumner med samma definitioner (build_database.ensure_flag_columns).
+# Partiella index på dem gör att botens filter inte utvärderar TRIM() per rad.
+PRAKTIK_FLAG = 'is_praktik_eligible'
+DAILY_FLAG = 'is_daily_eligible'
+
+
+def flag_sql(flag: str, alias: str = "") -> str:
+    """Villkor på en genererad flagga, samma text som i de partiella indexen"""
+    return f"{_col(flag, alias)} = 1"
+
+
+def has_text(value: Optional[str]) -> bool:
+    """Python-motsvarighet till has_text_sql (SQL TRIM tar bara mellanslag)"""
+    return bool(value and value.strip(' '))
+
+
+def is_praktik(company: Mapping) -> bool:
+    return company.get('type') in PRAKTIK_TYPES and has_text(company.get('website'))
+
+
+def is_daily_eligible(company: Mapping) -> bool:
+    return (
+        is_praktik(company)
+        and has_text(company.get('logo_url'))
+        and has_text(company.get('description'))
+    )
@@ -0,0 +1,77 @@
+"""
+Rumsligt index för radiesökning
+===============================
+Företagens koordinater (location_lat/lon, satta av enrich_locations.py)
+läggs i ett rutnät av celler om CELL_DEGREES grader. En sökning inom en
+radie läser bara cellerna som täcker radiens omskrivna rektangel och räknar
+avståndet (haversine) för de punkterna - ingen genomsökning av hela katalogen.
+
+Byggs i minnet när snapshoten laddas (CompanyRepository.load_snapshot).
+"""
+
+import math
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+CELL_DEGREES = 0.25
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Storcirkelavstånd i km"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GridIndex:
+    """Punkter (företags-ID, lat, lon) i ett rutnät"""
+
+    def __init__(self, points: Iterable[Tuple[int, float, float]], cell_degrees: float = CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self._cells: Dict[Tuple[int, int], List[Tuple[int, float, float]]] = defaultdict(list)
+        self._size = 0
+        for company_id, lat, lon in points:
+            self._cells[self._cell(lat, lon)].append((company_id, lat, lon))
+            self._size += 1
+        self._cells = dict(self._cells)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees)
+
+    def within(self, lat: float, lon: float, radius_km: float) -> List[Tuple[float, int]]:
+        """
+        Alla punkter inom radius_km från (lat, lon)
+
+        Returns:
+            (avstånd i km, företags-ID), närmast först (lika avstånd: lägst ID)
+        """
+        dlat = radius_km / KM_PER_DEGREE
+        dlon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+        row_min, col_min = self._cell(lat - dlat, lon - dlon)
+        row_max, col_max = self._cell(lat + dlat, lon + dlon)
+
+        # Stor radie: färre upptagna celler än celler i rektangeln
+        if (row_max - row_min + 1) * (col_max - col_min + 1) > len(self._cells):
+            cells = [points for (row, col), points in self._cells.items()
+                     if row_min <= row <= row_max and col_min <= col <= col_max]
+        else:
+            cells = [self._cells[(row, col)]
+                     for row in range(row_min, row_max + 1)
+                     for col in range(col_min, col_max + 1)
+                     if (row, col) in self._cells]
+
+        hits = []
+        for points in cells:
+            for company_id, plat, plon in points:
+                distance = haversine_km(lat, lon, plat, plon)
+                if distance <= radius_km:
+                    hits.append((distance, company_id))
+        hits.sort()
+        return hits
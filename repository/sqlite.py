@@ -0,0 +1,494 @@
+"""
+SQLite-backend
+==============
+Read-only, memory-mappad anslutning mot ai_companies.db.
+
+- Frågetexterna är konstanta så att sqlite3:s statement-cache
+  (cached_statements) återanvänder förberedda statements
+- Slumpade urval görs genom att sampla ID:n ur ett index i stället för
+  ORDER BY RANDOM(), som sorterar hela tabellen för varje anrop
+- Frågor körs inom kommandots latensbudget (se budget.py)
+"""
+
+import os
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from budget import BudgetExceeded, current_deadline, mark_trimmed, sqlite_deadline
+from tags import TAG_TABLES, tag_key
+
+from .backend import CatalogBackend
+from .filters import (
+    DAILY_FLAG, PRAKTIK_FLAG, daily_sql, flag_sql, has_text_sql, praktik_sql, praktik_types_sql,
+)
+
+# Kolumner i resultatlistor (bot, CLI och export)
+LIST_COLUMNS = (
+    "id, name, website, type, description, location_city, "
+    "location_greater_stockholm, data_quality_score, source"
+)
+COMPANY_COLUMNS = (
+    "id, name, website, type, logo_url, description, "
+    "location_city, location_greater_stockholm, data_quality_score, location_confidence"
+)
+
+FACET_COLUMNS = {'type': 'type', 'city': 'location_city'}
+
+
+class SQLiteBackend(CatalogBackend):
+    """Katalogen i en SQLite-fil"""
+
+    # Extratid för ett sista försök när en fråga avbrutits utan att ge rader
+    FALLBACK_GRACE_S = 0.25
+
+    # Frågor som läser in tabeller och index som kommandona använder
+    WARMUP_QUERIES = (
+        "SELECT COUNT(*), SUM(LENGTH(name) + LENGTH(description) + LENGTH(website)) FROM companies",
+        "SELECT COUNT(*) FROM companies WHERE type >= ''",
+        "SELECT COUNT(*) FROM companies WHERE location_city >= ''",
+        "SELECT COUNT(*) FROM companies WHERE name >= ''",
+        "SELECT COUNT(*) FROM company_ai_capabilities",
+        "SELECT COUNT(*), SUM(LENGTH(name)) FROM ai_capabilities",
+    )
+
+    def __init__(self, db_path: str = "ai_companies.db", mmap_size: int = 256 * 1024 * 1024,
+                 cached_statements: int = 256):
+        self.db_path = db_path
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+        self.conn: Optional[sqlite3.Connection] = None
+        self.file_id: Optional[Tuple[int, int, int]] = None
+        self.connections_opened = 0
+        # Villkor för praktik/daglig post; flaggkolumnerna används om de finns
+        self.praktik_where = praktik_sql()
+        self.daily_where = daily_sql()
+        self.has_coordinates = False
+        # location_confidence läggs till av enrich_locations.py; NULL i äldre databaser
+        self.company_columns = COMPANY_COLUMNS.replace('location_confidence', 'NULL AS location_confidence')
+        # Taggfilter är exakta uppslag på name_key om databasen har kolumnen
+        self.has_tag_keys = False
+        # Frågor kan köras från trådpoolen (se discord_bot.query); en i taget
+        self._lock = threading.RLock()
+
+    # ---------- anslutning ----------
+
+    def connect(self) -> bool:
+        """
+        Anslut till databasen (read-only, memory-mappad)
+
+        Katalogen skrivs aldrig härifrån. Med mode=ro och mmap läses
+        sidorna direkt ur OS:ets page cache, så flera processer (shards,
+        CLI) på samma maskin delar samma fysiska minne för katalogen.
+
+        Idempotent: en redan öppen anslutning återanvänds.
+        """
+        if self.conn is not None:
+            return True
+        try:
+            uri = Path(self.db_path).resolve().as_uri() + "?mode=ro"
+            self.conn = sqlite3.connect(
+                uri, uri=True, check_same_thread=False,
+                cached_statements=self.cached_statements,
+            )
+            self.conn.row_factory = sqlite3.Row
+            self.conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+            self.connections_opened += 1
+        except sqlite3.Error as e:
+            print(f"❌ Kunde inte ansluta till databas: {e}")
+            self.conn = None
+            return False
+        self.file_id = self._file_identity()
+        self._detect_flags()
+        return True
+
+    def _file_identity(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.db_path)
+        except OSError:
+            return None
+        return st.st_dev, st.st_ino, st.st_mtime_ns
+
+    def changed_on_disk(self) -> bool:
+        """
+        Har filen bytts ut?
+
+        publish.py ersätter databasen med os.replace(); en öppen anslutning
+        läser då fortfarande den gamla filen tills den öppnas på nytt.
+        """
+        if self.conn is None:
+            return False
+        current = self._file_identity()
+        return current is not None and current != self.file_id
+
+    def reopen(self) -> bool:
+        """Byt till den nya filen; pågående frågor får köra klart mot den gamla"""
+        with self._lock:
+            old, self.conn = self.conn, None
+            if not self.connect():
+                self.conn = old
+                return False
+            if old is not None:
+                old.close()
+            return True
+
+    def _detect_flags(self) -> None:
+        """Använd genererade flaggor (och deras partiella index) om databasen har dem"""
+        try:
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_xinfo(companies)")}
+        except sqlite3.Error:
+            return
+        self.has_coordinates = {'location_lat', 'location_lon'} <= columns
+        if 'location_confidence' in columns:
+            self.company_columns = COMPANY_COLUMNS
+        self.has_tag_keys = any(
+            row[1] == 'name_key' for row in self.conn.execute("PRAGMA table_info(sectors)")
+        )
+        if PRAKTIK_FLAG in columns and DAILY_FLAG in columns:
+            self.praktik_where = flag_sql(PRAKTIK_FLAG)
+            self.daily_where = flag_sql(DAILY_FLAG)
+        else:
+            self.praktik_where = praktik_sql()
+            self.daily_where = daily_sql()
+
+    def close(self) -> None:
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    @property
+    def connected(self) -> bool:
+        return self.conn is not None
+
+    # ---------- intern ----------
+
+    def _fetch(self, query: str, params: Sequence = ()) -> List[sqlite3.Row]:
+        """
+        Kör en fråga inom kommandots latensbudget (se budget.py)
+
+        Går frågan över budgeten returneras de rader som hann hämtas. Gav den
+        inga rader alls görs ett sista försök med kort extratid.
+        """
+        if self.conn is None:
+            return []
+        with self._lock:
+            rows = []
+            try:
+                with sqlite_deadline(self.conn, current_deadline()):
+                    for row in self.conn.execute(query, params):
+                        rows.append(row)
+            except BudgetExceeded:
+                mark_trimmed()
+                if rows:
+                    return rows
+                try:
+                    with sqlite_deadline(self.conn, time.monotonic() + self.FALLBACK_GRACE_S):
+                        for row in self.conn.execute(query, params):
+                            rows.append(row)
+                except BudgetExceeded:
+                    pass
+            return rows
+
+    def _sample_ids(self, where: str, params: Sequence, count: int) -> List[int]:
+        """Slumpa `count` ID:n bland företag som matchar `where`"""
+        ids = [row[0] for row in self._fetch(f"SELECT id FROM companies WHERE {where}", params)]
+        return random.sample(ids, min(count, len(ids)))
+
+    def _rows_by_ids(self, company_ids: List[int], columns: str = LIST_COLUMNS) -> List[Dict]:
+        """Hämta rader på ID i given ordning"""
+        if not company_ids:
+            return []
+        placeholders = ','.join('?' * len(company_ids))
+        rows = self._fetch(
+            f"SELECT {columns} FROM companies WHERE id IN ({placeholders})", list(company_ids)
+        )
+        by_id = {row['id']: dict(row) for row in rows}
+        return [by_id[company_id] for company_id in company_ids if company_id in by_id]
+
+    def _tags(self, table: str, company_id: int, limit: Optional[int] = None) -> List[str]:
+        junction, column = TAG_TABLES[table]
+        rows = self._fetch(
+            f"""
+            SELECT t.name FROM {table} t
+            JOIN {junction} j ON t.id = j.{column}
+            WHERE j.company_id = ?
+            LIMIT ?
+            """,
+            (company_id, -1 if limit is None else limit),
+        )
+        return [row[0] for row in rows]
+
+    # ---------- slump och uppslagning ----------
+
+    def random_companies(self, count: int = 1, company_type: Optional[str] = None,
+                         only_praktik_relevant: bool = False, strict: bool = False) -> List[Dict]:
+        conditions = ["1"]
+        params: List = []
+        if company_type:
+            conditions.append("type = ?")
+            params.append(company_type)
+        if strict:
+            conditions.append(self.daily_where)
+        elif only_praktik_relevant:
+            conditions.append(praktik_types_sql())
+        ids = self._sample_ids(' AND '.join(conditions), params, count)
+        return self._rows_by_ids(ids, "*")
+
+    def daily_eligible_ids(self) -> List[int]:
+        return [row[0] for row in self._fetch(f"SELECT id FROM companies WHERE {self.daily_where} ORDER BY id")]
+
+    def get_company(self, company_id: int, capability_limit: Optional[int] = 5) -> Optional[Dict]:
+        rows = self._fetch(f"SELECT {self.company_columns} FROM companies WHERE id = ?", (company_id,))
+        if not rows:
+            return None
+        company = dict(rows[0])
+        company['ai_capabilities'] = self._tags('ai_capabilities', company_id, capability_limit)
+        return company
+
+    def get_company_details(self, company_id: int) -> Optional[Dict]:
+        rows = self._fetch("SELECT * FROM companies WHERE id = ?", (company_id,))
+        if not rows:
+            return None
+        company = dict(rows[0])
+        for table in TAG_TABLES:
+            company[table] = self._tags(table, company_id)
+        return company
+
+    def get_companies(self, company_ids: List[int]) -> List[Dict]:
+        return self._rows_by_ids(company_ids)
+
+    # ---------- sökning och filter ----------
+
+    def search_by_name(self, search_term: str, limit: Optional[int] = 5) -> List[Dict]:
+        rows = self._fetch(
+            f"SELECT {LIST_COLUMNS} FROM companies WHERE name LIKE ? ORDER BY name LIMIT ?",
+            (f"%{search_term}%", -1 if limit is None else limit),
+        )
+        return [dict(row) for row in rows]
+
+    def filter_by_type(self, company_type: str, limit: int = 5) -> List[Dict]:
+        ids = self._sample_ids(
+            f"type = LOWER(?) AND {has_text_sql('website')}", (company_type,), limit
+        )
+        return self._rows_by_ids(ids)
+
+    def filter_by_city(self, city: str, limit: int = 10) -> List[Dict]:
+        ids = self._sample_ids(f"location_city LIKE ? AND {self.praktik_where}", (f"%{city}%",), limit)
+        return self._rows_by_ids(ids)
+
+    def filter_greater_stockholm(self, limit: int = 10) -> List[Dict]:
+        ids = self._sample_ids(f"location_greater_stockholm = 1 AND {self.praktik_where}", (), limit)
+        return self._rows_by_ids(ids)
+
+    def filter_companies(self, company_type: Optional[str] = None, sector: Optional[str] = None,
+                         domain: Optional[str] = None, ai_capability: Optional[str] = None,
+                         location_city: Optional[str] = None,
+                         location_greater_stockholm: Optional[bool] = None,
+                         min_quality: int = 0, limit: int = 100,
+                         only_praktik_relevant: bool = False) -> List[Dict]:
+        query, params = self._filter_query(
+            'c.*', company_type, sector, domain, ai_capability, location_city,
+            location_greater_stockholm, min_quality, only_praktik_relevant,
+        )
+        return [dict(row) for row in self._fetch(query, params + [limit])]
+
+    def iter_companies(self, **filters) -> Iterator[Dict]:
+        """
+        Samma filter som filter_companies, rad för rad och utan gräns
+
+        Läser från markören medan raderna konsumeras, så minnet är konstant
+        oavsett antal träffar. Ingen latensbudget - för exporter, inte för
+        kommandon. Använd en egen backend (anslutningen är upptagen tills
+        generatorn är slut).
+        """
+        if self.conn is None:
+            return
+        query, params = self._filter_query(
+            ', '.join(f'c.{column.strip()}' for column in LIST_COLUMNS.split(',')), **filters
+        )
+        for row in self.conn.execute(query, params + [-1]):
+            yield dict(row)
+
+    def filter_page(self, filters: Dict, cursor: Optional[Tuple[int, int]] = None,
+                    limit: int = 20) -> Tuple[List[Dict], bool]:
+        """
+        En sida av filter_companies med keyset-paginering
+
+        Samma ordning som filter_companies, (data_quality_score DESC, id DESC);
+        cursor är (data_quality_score, id) för sista raden på förra sidan.
+
+        Returns:
+            (rader, finns fler)
+        """
+        query, params = self._filter_query(
+            ', '.join(f'c.{column.strip()}' for column in LIST_COLUMNS.split(',')),
+            after=cursor, **filters,
+        )
+        rows = [dict(row) for row in self._fetch(query, params + [limit + 1])]
+        return rows[:limit], len(rows) > limit
+
+    def _filter_query(self, select: str, company_type: Optional[str] = None, sector: Optional[str] = None,
+                      domain: Optional[str] = None, ai_capability: Optional[str] = None,
+                      location_city: Optional[str] = None,
+                      location_greater_stockholm: Optional[bool] = None,
+                      min_quality: int = 0, only_praktik_relevant: bool = False,
+                      after: Optional[Tuple[int, int]] = None) -> Tuple[str, List]:
+        """Frågan bakom filter_companies/iter_companies/filter_page; LIMIT läggs till av anroparen"""
+        query = f'SELECT DISTINCT {select} FROM companies c'
+        conditions = []
+        params: List = []
+
+        # Join:a bara de taggtabeller vi filtrerar på
+        for table, value in (('sectors', sector), ('domains', domain), ('ai_capabilities', ai_capability)):
+            if value:
+                junction, column = TAG_TABLES[table]
+                query += f' JOIN {junction} j_{table} ON c.id = j_{table}.company_id'
+                query += f' JOIN {table} t_{table} ON j_{table}.{column} = t_{table}.id'
+                if self.has_tag_keys:
+                    # Kanonisk nyckel ("IT" -> "information technology"), unikt index
+                    conditions.append(f't_{table}.name_key = ?')
+                    params.append(tag_key(table, value))
+                else:
+                    conditions.append(f't_{table}.name LIKE ?')
+                    params.append(f'%{value}%')
+
+        if company_type:
+            conditions.append('c.type = ?')
+            params.append(company_type)
+        if min_quality > 0:
+            conditions.append('c.data_quality_score >= ?')
+            params.append(min_quality)
+        if location_city:
+            # OBS: my.ai.se-data (80%) saknar location - bara EU-företag har det
+            conditions.append('c.location_city LIKE ?')
+            params.append(f'%{location_city}%')
+        if location_greater_stockholm is not None:
+            conditions.append('c.location_greater_stockholm = ?')
+            params.append(1 if location_greater_stockholm else 0)
+        if only_praktik_relevant:
+            conditions.append(praktik_types_sql('c'))
+        if after is not None:
+            conditions.append('(c.data_quality_score, c.id) < (?, ?)')
+            params.extend(after)
+
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY c.data_quality_score DESC, c.id DESC LIMIT ?'
+        return query, params
+
+    def browse_page(self, kind: str, label: str, cursor: Optional[Tuple[int, int]] = None,
+                    direction: str = 'next', limit: int = 5) -> Tuple[List[Dict], bool]:
+        """
+        Hämta en sida med keyset-paginering (ingen OFFSET, inget totalantal)
+
+        Ordningen är (data_quality_score DESC, id DESC). Endast cursorn, dvs
+        (data_quality_score, id) för en kantrad på sidan, behöver sparas
+        mellan sidorna - varje sida kostar lika mycket oavsett hur långt in
+        i resultatet man bläddrat.
+
+        Args:
+            kind: 'sok', 'typ', 'stad' eller 'sthlm'
+            label: Sökterm, typ eller stad (ignoreras för 'sthlm')
+            cursor: (data_quality_score, id) att utgå från, None = första sidan
+            direction: 'next' = efter cursorn, 'prev' = före cursorn,
+                       'from' = från och med cursorn (ladda om samma sida)
+            limit: Antal rader per sida
+
+        Returns:
+            (rader, finns_det_fler_i_riktningen)
+        """
+        if self.conn is None:
+            return [], False
+        conditions, params = self._browse_conditions(kind, label)
+        order = "data_quality_score DESC, id DESC"
+        if cursor is not None:
+            if direction == 'next':
+                conditions.append("(data_quality_score, id) < (?, ?)")
+            elif direction == 'prev':
+                conditions.append("(data_quality_score, id) > (?, ?)")
+                order = "data_quality_score ASC, id ASC"
+            elif direction == 'from':
+                conditions.append("(data_quality_score, id) <= (?, ?)")
+            else:
+                raise ValueError(f"Okänd riktning: {direction}")
+            params.extend(cursor)
+
+        with self._lock:
+            rows = [dict(row) for row in self.conn.execute(
+                f"""
+                SELECT {LIST_COLUMNS}
+                FROM companies
+                WHERE {' AND '.join(conditions)}
+                ORDER BY {order}
+                LIMIT ?
+                """,
+                params + [limit + 1],
+            )]
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if direction == 'prev':
+            rows.reverse()
+        return rows, has_more
+
+    def _browse_conditions(self, kind: str, label: str):
+        """WHERE-villkor för bläddringslägena (samma filter som kommandona)"""
+        if kind == 'sok':
+            return ['name LIKE ?'], [f"%{label}%"]
+        if kind == 'typ':
+            # Typer lagras med gemener - jämför utan LOWER(type) så index kan användas
+            return [has_text_sql('website'), 'type = LOWER(?)'], [label]
+        if kind == 'stad':
+            return [self.praktik_where, 'location_city LIKE ?'], [f"%{label}%"]
+        if kind == 'sthlm':
+            return [self.praktik_where, 'location_greater_stockholm = 1'], []
+        raise ValueError(f"Okänt bläddringsläge: {kind}")
+
+    # ---------- listor och facetter ----------
+
+    def suggest(self, kind: str, prefix: str = "", limit: int = 25) -> List[str]:
+        column = FACET_COLUMNS[kind]
+        rows = self._fetch(
+            f"""
+            SELECT DISTINCT {column} FROM companies
+            WHERE {column} IS NOT NULL AND LOWER({column}) LIKE LOWER(?)
+            ORDER BY {column} LIMIT ?
+            """,
+            (f"{prefix}%", limit),
+        )
+        return [row[0] for row in rows if row[0]]
+
+    def facet_counts(self, kind: str) -> Dict[str, int]:
+        column = FACET_COLUMNS[kind]
+        return {row[0]: row[1] for row in self._fetch(
+            f"SELECT {column}, COUNT(*) FROM companies WHERE {column} IS NOT NULL GROUP BY {column}"
+        )}
+
+    def coordinates(self) -> List[Tuple[int, float, float]]:
+        if not self.has_coordinates:
+            return []
+        return [tuple(row) for row in self._fetch(
+            "SELECT id, location_lat, location_lon FROM companies WHERE location_lat IS NOT NULL"
+        )]
+
+    def list_all_values(self, table: str) -> List[str]:
+        if table == 'types':
+            return [row[0] for row in self._fetch(
+                'SELECT DISTINCT type FROM companies WHERE type IS NOT NULL ORDER BY type'
+            )]
+        if table in TAG_TABLES:
+            return [row[0] for row in self._fetch(f'SELECT name FROM {table} ORDER BY name')]
+        return []
+
+    def warm(self, deadline: Optional[float] = None) -> int:
+        if self.conn is None:
+            return 0
+        done = 0
+        for sql in self.WARMUP_QUERIES:
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            self._fetch(sql)
+            done += 1
+        return done
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+UTGÅENDE KÖ - Rate limit-medveten sändning till Discord
+========================================================
+Alla utgående meddelanden som inte är direkta svar på en interaktion
+(DMs från "Skicka till mina DMs"-knappar, daglig posting) går via en
+central kö i stället för att skickas direkt.
+
+- Token bucket per route (t.ex. "dm:<user_id>", "channel:<channel_id>")
+  plus en global bucket för hela botten
+- Varje route har en egen FIFO; workers tar bara routes som har en token
+  (ready-kön). En route med tom bucket väntar på en timer i stället för
+  att uppta en worker, så en het kanal aldrig blockerar andras DMs
+- Coalescing: identiska jobb som redan ligger i kön slås ihop
+- Backpressure: kön har ett maxdjup, submit() kastar QueueFullError
+- Mätvärden: ködjup, väntetid, antal skickade/sammanslagna/avvisade
+"""
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional
+
+
+class QueueFullError(Exception):
+    """Kön är full - anroparen ska be användaren försöka igen senare"""
+
+
+class TokenBucket:
+    """Enkel token bucket: `rate` tokens/sekund, max `capacity` i buffert"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> float:
+        """Ta en token om möjligt; returnerar annars sekunder att vänta"""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self) -> None:
+        """Vänta tills en token finns och ta den"""
+        while True:
+            delay = self.try_acquire()
+            if delay == 0:
+                return
+            await asyncio.sleep(delay)
+
+    def is_idle(self) -> bool:
+        """Full bucket = inga nyliga sändningar, kan rensas bort"""
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+@dataclass
+class _Job:
+    route: str
+    send: Callable[[], Awaitable[Any]]
+    future: asyncio.Future
+    coalesce_key: Optional[Hashable]
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class OutboundQueue:
+    """Central kö för utgående Discord-anrop"""
+
+    def __init__(
+        self,
+        max_depth: int = 1000,
+        workers: int = 4,
+        route_rate: float = 1.0,
+        route_burst: float = 5,
+        global_rate: float = 40.0,
+        global_burst: float = 50,
+        max_routes: int = 10000,
+    ):
+        """
+        Args:
+            max_depth: Max antal väntande jobb innan submit() avvisar
+            workers: Antal parallella workers som tömmer kön
+            route_rate: Tokens/sekund per route
+            route_burst: Max burst per route
+            global_rate: Tokens/sekund för hela botten (Discord: 50 req/s)
+            global_burst: Max burst globalt
+            max_routes: Antal route-buckets innan inaktiva rensas
+        """
+        self.max_depth = max_depth
+        self.worker_count = workers
+        self.route_rate = route_rate
+        self.route_burst = route_burst
+        self.max_routes = max_routes
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.route_buckets: Dict[str, TokenBucket] = {}
+
+        # Väntande jobb per route, och routes vars första jobb får skickas nu
+        self._routes: Dict[str, Deque[_Job]] = {}
+        self._ready: Optional[asyncio.Queue] = None
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._depth = 0
+        self._unfinished = 0
+        self._idle: Optional[asyncio.Event] = None
+        self._workers: List[asyncio.Task] = []
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+        self._waits: Deque[float] = deque(maxlen=1000)
+        self.counters = {
+            'submitted': 0,
+            'sent': 0,
+            'failed': 0,
+            'coalesced': 0,
+            'rejected': 0,
+        }
+
+    # ---------- livscykel ----------
+
+    def start(self) -> None:
+        """Starta workers i den körande event-loopen (idempotent)"""
+        if self._workers:
+            return
+        self._ready = asyncio.Queue()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"outbound-queue-{i}")
+            for i in range(self.worker_count)
+        ]
+
+    async def stop(self) -> None:
+        """Stoppa workers (väntande jobb avbryts)"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for jobs in self._routes.values():
+            for job in jobs:
+                if not job.future.done():
+                    job.future.cancel()
+        self._routes.clear()
+        self._pending.clear()
+        self._depth = self._unfinished = 0
+        if self._idle is not None:
+            self._idle.set()
+        # Nästa submit startar nya workers (och en ny ready-kö) med start()
+        self._ready = None
+
+    async def join(self) -> None:
+        """Vänta tills alla köade jobb har körts"""
+        if self._idle is not None:
+            await self._idle.wait()
+
+    @property
+    def depth(self) -> int:
+        """Antal jobb som väntar i kön"""
+        return self._depth
+
+    # ---------- publikt API ----------
+
+    def submit(
+        self,
+        route: str,
+        send: Callable[[], Awaitable[Any]],
+        coalesce_key: Optional[Hashable] = None,
+    ) -> asyncio.Future:
+        """
+        Lägg ett utgående anrop i kön
+
+        Args:
+            route: Rate limit-route, t.ex. "dm:<user_id>"
+            send: Funktion som returnerar korutinen som gör själva anropet
+            coalesce_key: Jobb med samma nyckel som redan väntar slås ihop
+
+        Returns:
+            Future som blir klar när anropet har körts
+
+        Raises:
+            QueueFullError: Om kön är full (backpressure)
+        """
+        if self._ready is None:
+            self.start()
+
+        if coalesce_key is not None and coalesce_key in self._pending:
+            self.counters['coalesced'] += 1
+            return self._pending[coalesce_key]
+
+        if self.depth >= self.max_depth:
+            self.counters['rejected'] += 1
+            raise QueueFullError(f"utgående kö full ({self.max_depth})")
+
+        future = asyncio.get_running_loop().create_future()
+        job = _Job(route, send, future, coalesce_key)
+        if coalesce_key is not None:
+            self._pending[coalesce_key] = future
+        jobs = self._routes.get(route)
+        if jobs is None:
+            # Routen var tom: schemalägg den (annars gör workern det efter förra jobbet)
+            jobs = self._routes[route] = deque()
+            jobs.append(job)
+            self._schedule(route)
+        else:
+            jobs.append(job)
+        self._depth += 1
+        self._unfinished += 1
+        self._idle.clear()
+        self.counters['submitted'] += 1
+        return future
+
+    def metrics(self) -> Dict[str, Any]:
+        """Mätvärden för status/loggning"""
+        waits = sorted(self._waits)
+        p95 = waits[int(len(waits) * 0.95) - 1] if waits else 0.0
+        return {
+            **self.counters,
+            'depth': self.depth,
+            'routes': len(self.route_buckets),
+            'wait_avg_ms': (sum(waits) / len(waits) * 1000) if waits else 0.0,
+            'wait_p95_ms': p95 * 1000,
+            'wait_max_ms': (waits[-1] * 1000) if waits else 0.0,
+        }
+
+    # ---------- intern ----------
+
+    def _bucket_for(self, route: str) -> TokenBucket:
+        bucket = self.route_buckets.get(route)
+        if bucket is None:
+            if len(self.route_buckets) >= self.max_routes:
+                self.route_buckets = {
+                    key: b for key, b in self.route_buckets.items() if not b.is_idle()
+                }
+            bucket = TokenBucket(self.route_rate, self.route_burst)
+            self.route_buckets[route] = bucket
+        return bucket
+
+    def _schedule(self, route: str) -> None:
+        """Lägg routen i ready-kön när dess bucket har en token"""
+        self._timers.pop(route, None)
+        if route not in self._routes:
+            return
+        delay = self._bucket_for(route).try_acquire()
+        if delay == 0:
+            self._ready.put_nowait(route)
+        else:
+            self._timers[route] = asyncio.get_running_loop().call_later(delay, self._schedule, route)
+
+    def _finish(self, route: str) -> None:
+        """Jobbet är klart: nästa jobb på routen schemaläggs, tomma routes tas bort"""
+        jobs = self._routes.get(route)
+        if jobs:
+            self._schedule(route)
+        elif jobs is not None:
+            del self._routes[route]
+        self._unfinished -= 1
+        if self._unfinished <= 0:
+            self._unfinished = 0
+            self._idle.set()
+
+    async def _worker(self) -> None:
+        while True:
+            route = await self._ready.get()
+            jobs = self._routes.get(route)
+            if not jobs:
+                continue
+            job: _Job = jobs.popleft()
+            self._depth -= 1
+            try:
+                # Route-token är redan tagen av _schedule; globalt gäller alla routes lika
+                await self.global_bucket.acquire()
+                self._waits.append(time.monotonic() - job.enqueued_at)
+                if job.coalesce_key is not None:
+                    self._pending.pop(job.coalesce_key, None)
+                try:
+                    result = await job.send()
+                except Exception as e:
+                    self.counters['failed'] += 1
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                else:
+                    self.counters['sent'] += 1
+                    if not job.future.done():
+                        job.future.set_result(result)
+            except asyncio.CancelledError:
+                if not job.future.done():
+                    job.future.cancel()
+                raise
+            finally:
+                self._finish(route)
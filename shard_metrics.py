@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+SHARDING - Konfiguration och mätvärden per shard
+================================================
+Botten kan köras som en process (vanlig commands.Bot) eller shardad med
+AutoShardedBot, antingen med alla shards i samma process eller med
+explicita shard-intervall per process:
+
+    SHARD_COUNT=4 SHARD_IDS=0-1 python discord_bot.py   # process 1
+    SHARD_COUNT=4 SHARD_IDS=2-3 python discord_bot.py   # process 2
+
+    AUTO_SHARD=1 python discord_bot.py                  # Discord väljer antal
+
+Varje process rapporterar mätvärden för sina egna shards.
+"""
+
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional
+
+
+@dataclass
+class ShardConfig:
+    """Vilka shards den här processen ska köra"""
+    sharded: bool = False
+    shard_count: Optional[int] = None
+    shard_ids: Optional[List[int]] = None
+
+    def owns_guild(self, guild_id: int) -> bool:
+        """Hanteras servern av en shard i den här processen?"""
+        if not self.sharded or not self.shard_count or self.shard_ids is None:
+            return True
+        return shard_for_guild(guild_id, self.shard_count) in self.shard_ids
+
+    def describe(self) -> str:
+        if not self.sharded:
+            return "ingen sharding"
+        if self.shard_ids is None:
+            return f"alla shards ({self.shard_count or 'auto'})"
+        return f"shards {self.shard_ids} av {self.shard_count}"
+
+
+def shard_for_guild(guild_id: int, shard_count: int) -> int:
+    """Discords formel för vilken shard en server tillhör"""
+    return (guild_id >> 22) % shard_count
+
+
+def parse_shard_ids(value: str) -> List[int]:
+    """Tolka '0,1,2', '0-3' eller blandat '0-1,4'"""
+    ids = []
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+            ids.extend(range(int(start), int(end) + 1))
+        else:
+            ids.append(int(part))
+    return sorted(set(ids))
+
+
+def shard_config_from_env(env=None) -> ShardConfig:
+    """
+    Läs sharding-konfiguration från environment variables
+
+    - SHARD_COUNT: totalt antal shards (över alla processer)
+    - SHARD_IDS: shards för den här processen, t.ex. "0-1" (kräver SHARD_COUNT)
+    - AUTO_SHARD: "1" för AutoShardedBot med Discords rekommenderade antal
+    """
+    env = os.environ if env is None else env
+    count = env.get('SHARD_COUNT')
+    ids = env.get('SHARD_IDS')
+    auto = env.get('AUTO_SHARD', '').lower() in ('1', 'true', 'yes', 'ja')
+
+    if ids and not count:
+        raise ValueError("SHARD_IDS kräver att SHARD_COUNT är satt")
+
+    shard_count = int(count) if count else None
+    shard_ids = parse_shard_ids(ids) if ids else None
+    if shard_ids and shard_count and max(shard_ids) >= shard_count:
+        raise ValueError(f"SHARD_IDS {shard_ids} utanför SHARD_COUNT={shard_count}")
+
+    return ShardConfig(
+        sharded=bool(auto or shard_count),
+        shard_count=shard_count,
+        shard_ids=shard_ids,
+    )
+
+
+@dataclass
+class _ShardStats:
+    connects: int = 0
+    disconnects: int = 0
+    resumes: int = 0
+    commands: int = 0
+    command_errors: int = 0
+    readies: int = 0
+    last_ready: Optional[float] = None
+    last_disconnect: Optional[float] = None
+    commands_by_name: Dict[str, int] = field(default_factory=dict)
+    # Tid från avbrott till ready/resumed, sekunder (senaste 100)
+    reconnect_times: Deque[float] = field(default_factory=lambda: deque(maxlen=100))
+    _down_since: Optional[float] = None
+
+
+class ShardMetrics:
+    """Räknare per shard för den här processen"""
+
+    def __init__(self):
+        self.started = time.time()
+        self.shards: Dict[int, _ShardStats] = {}
+        # Livscykel för processen: setup_hook ska köras exakt en gång,
+        # on_ready kan komma flera gånger (återanslutningar)
+        self.setup_runs = 0
+        self.ready_events = 0
+        # Latens för första kommandot efter start (påverkas av warmup)
+        self.first_command_ms: Optional[float] = None
+
+    def _stats(self, shard_id: Optional[int]) -> _ShardStats:
+        return self.shards.setdefault(shard_id or 0, _ShardStats())
+
+    def on_connect(self, shard_id: Optional[int]) -> None:
+        self._stats(shard_id).connects += 1
+
+    def _back_up(self, stats: _ShardStats) -> None:
+        if stats._down_since is not None:
+            stats.reconnect_times.append(time.monotonic() - stats._down_since)
+            stats._down_since = None
+
+    def on_ready(self, shard_id: Optional[int]) -> None:
+        stats = self._stats(shard_id)
+        stats.readies += 1
+        stats.last_ready = time.time()
+        self._back_up(stats)
+
+    def on_disconnect(self, shard_id: Optional[int]) -> None:
+        stats = self._stats(shard_id)
+        stats.disconnects += 1
+        stats.last_disconnect = time.time()
+        if stats._down_since is None:
+            stats._down_since = time.monotonic()
+
+    def on_resumed(self, shard_id: Optional[int]) -> None:
+        stats = self._stats(shard_id)
+        stats.resumes += 1
+        self._back_up(stats)
+
+    def on_command(self, shard_id: Optional[int], name: str, ok: bool = True) -> None:
+        stats = self._stats(shard_id)
+        stats.commands += 1
+        if not ok:
+            stats.command_errors += 1
+        stats.commands_by_name[name] = stats.commands_by_name.get(name, 0) + 1
+
+    def snapshot(self, latencies: Dict[int, float], guild_counts: Dict[int, int]) -> List[Dict]:
+        """
+        Sammanställ mätvärden per shard
+
+        Args:
+            latencies: shard_id → gateway-latens i sekunder
+            guild_counts: shard_id → antal servrar
+        """
+        shard_ids = sorted(set(self.shards) | set(latencies) | set(guild_counts))
+        rows = []
+        for shard_id in shard_ids:
+            stats = self._stats(shard_id)
+            latency = latencies.get(shard_id)
+            rows.append({
+                'shard_id': shard_id,
+                'guilds': guild_counts.get(shard_id, 0),
+                'latency_ms': None if latency is None or latency != latency else latency * 1000,
+                'connects': stats.connects,
+                'disconnects': stats.disconnects,
+                'resumes': stats.resumes,
+                'commands': stats.commands,
+                'command_errors': stats.command_errors,
+                'readies': stats.readies,
+                'reconnect_last_ms': stats.reconnect_times[-1] * 1000 if stats.reconnect_times else None,
+                'reconnect_avg_ms': (
+                    sum(stats.reconnect_times) / len(stats.reconnect_times) * 1000
+                    if stats.reconnect_times else None
+                ),
+            })
+        return rows
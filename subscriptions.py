@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+PRENUMERATIONER - Daglig posting till flera servrar och kanaler
+===============================================================
+Varje server (guild) kan prenumerera en eller flera kanaler på
+"Dagens AI-företag" med egen tid och tidszon via /prenumerera.
+
+- SubscriptionStore: tabeller i state-databasen (samma som rotationen)
+- fan_out: skickar ett färdigrenderat meddelande till alla kanaler
+  parallellt via en begränsad semafor, med omförsök och
+  leveransstatistik per kanal
+"""
+
+import asyncio
+import sqlite3
+import time as _time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+
+DEFAULT_POST_TIME = "08:00"
+DEFAULT_TIMEZONE = "Europe/Stockholm"
+
+
+@dataclass
+class Subscription:
+    """En kanal som prenumererar på daglig posting"""
+    guild_id: int
+    channel_id: int
+    post_time: str = DEFAULT_POST_TIME
+    timezone: str = DEFAULT_TIMEZONE
+    last_delivered_day: Optional[str] = None
+
+    def local_now(self, now_utc: datetime) -> datetime:
+        """Aktuell tid i prenumerationens tidszon"""
+        return now_utc.astimezone(ZoneInfo(self.timezone))
+
+    def is_due(self, now_utc: datetime) -> bool:
+        """
+        Är posten för idag (lokal tid) förfallen och ännu inte levererad?
+
+        Missade tider (t.ex. under omstart) levereras i efterhand samma dag.
+        """
+        local = self.local_now(now_utc)
+        if self.last_delivered_day == local.date().isoformat():
+            return False
+        return local.strftime("%H:%M") >= self.post_time
+
+
+@dataclass
+class DeliveryResult:
+    """Resultat av en leverans till en kanal"""
+    channel_id: int
+    ok: bool
+    attempts: int
+    latency_ms: float
+    error: Optional[str] = None
+
+
+def parse_post_time(value: str) -> str:
+    """Normalisera 'H:MM'/'HH:MM' till 'HH:MM' (ValueError om ogiltig)"""
+    parsed = datetime.strptime(value.strip(), "%H:%M")
+    return parsed.strftime("%H:%M")
+
+
+def parse_timezone(value: str) -> str:
+    """Validera IANA-tidszon, t.ex. 'Europe/Stockholm' (ValueError om okänd)"""
+    name = value.strip()
+    try:
+        ZoneInfo(name)
+    except Exception:
+        raise ValueError(f"Okänd tidszon: {value}")
+    return name
+
+
+class SubscriptionStore:
+    """Lagring av prenumerationer och leveransstatistik"""
+
+    def __init__(self, state_path: str = "bot_state.db"):
+        self.state_path = state_path
+        self.conn = None
+
+    def connect(self):
+        """Öppna state-databasen och skapa tabeller vid behov"""
+        self.conn = sqlite3.connect(self.state_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS daily_subscriptions (
+            guild_id INTEGER NOT NULL,
+            channel_id INTEGER NOT NULL,
+            post_time TEXT NOT NULL DEFAULT '08:00',
+            timezone TEXT NOT NULL DEFAULT 'Europe/Stockholm',
+            last_delivered_day TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (guild_id, channel_id)
+        )
+        ''')
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS daily_deliveries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER,
+            channel_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            company_id INTEGER,
+            ok BOOLEAN NOT NULL,
+            attempts INTEGER NOT NULL,
+            latency_ms REAL,
+            error TEXT,
+            delivered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+        self.conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_deliveries_channel ON daily_deliveries(channel_id, day)'
+        )
+        self.conn.commit()
+
+    def close(self):
+        """Stäng state-databasen"""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def subscribe(self, guild_id: int, channel_id: int,
+                  post_time: str = DEFAULT_POST_TIME,
+                  timezone_name: str = DEFAULT_TIMEZONE) -> Subscription:
+        """Lägg till eller uppdatera en prenumeration"""
+        post_time = parse_post_time(post_time)
+        timezone_name = parse_timezone(timezone_name)
+        sub = Subscription(guild_id, channel_id, post_time, timezone_name)
+        # Nya prenumerationer vars tid redan passerat idag börjar imorgon
+        local = sub.local_now(datetime.now(timezone.utc))
+        skip_today = local.date().isoformat() if local.strftime("%H:%M") >= post_time else None
+        self.conn.execute('''
+        INSERT INTO daily_subscriptions (guild_id, channel_id, post_time, timezone, last_delivered_day)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (guild_id, channel_id)
+        DO UPDATE SET post_time = excluded.post_time, timezone = excluded.timezone
+        ''', (guild_id, channel_id, post_time, timezone_name, skip_today))
+        self.conn.commit()
+        return sub
+
+    def unsubscribe(self, guild_id: int, channel_id: Optional[int] = None) -> int:
+        """Ta bort en kanals (eller hela serverns) prenumerationer"""
+        if channel_id is None:
+            cursor = self.conn.execute(
+                'DELETE FROM daily_subscriptions WHERE guild_id = ?', (guild_id,)
+            )
+        else:
+            cursor = self.conn.execute(
+                'DELETE FROM daily_subscriptions WHERE guild_id = ? AND channel_id = ?',
+                (guild_id, channel_id),
+            )
+        self.conn.commit()
+        return cursor.rowcount
+
+    def list_subscriptions(self, guild_id: Optional[int] = None) -> List[Subscription]:
+        """Lista prenumerationer (alla eller för en server)"""
+        query = '''
+        SELECT guild_id, channel_id, post_time, timezone, last_delivered_day
+        FROM daily_subscriptions
+        '''
+        params = ()
+        if guild_id is not None:
+            query += ' WHERE guild_id = ?'
+            params = (guild_id,)
+        return [Subscription(*row) for row in self.conn.execute(query, params)]
+
+    def due_subscriptions(self, now_utc: Optional[datetime] = None) -> List[Subscription]:
+        """Prenumerationer vars lokala posttid har passerat idag"""
+        now_utc = now_utc or datetime.now(timezone.utc)
+        return [sub for sub in self.list_subscriptions() if sub.is_due(now_utc)]
+
+    def record_delivery(self, sub: Subscription, day: str, company_id: Optional[int],
+                        result: DeliveryResult) -> None:
+        """Spara leveransutfall och markera dagen som hanterad"""
+        self.conn.execute('''
+        INSERT INTO daily_deliveries
+        (guild_id, channel_id, day, company_id, ok, attempts, latency_ms, error)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (sub.guild_id, sub.channel_id, day, company_id, result.ok,
+              result.attempts, result.latency_ms, result.error))
+        self.conn.execute('''
+        UPDATE daily_subscriptions SET last_delivered_day = ?
+        WHERE guild_id = ? AND channel_id = ?
+        ''', (day, sub.guild_id, sub.channel_id))
+        self.conn.commit()
+        sub.last_delivered_day = day
+
+    def delivery_stats(self, channel_id: Optional[int] = None) -> List[Dict]:
+        """Leveransstatistik per kanal (antal, fel, omförsök, latens)"""
+        query = '''
+        SELECT channel_id,
+               COUNT(*) AS deliveries,
+               SUM(CASE WHEN ok THEN 0 ELSE 1 END) AS failures,
+               SUM(attempts - 1) AS retries,
+               AVG(latency_ms) AS avg_latency_ms,
+               MAX(latency_ms) AS max_latency_ms,
+               MAX(delivered_at) AS last_delivery
+        FROM daily_deliveries
+        '''
+        params = ()
+        if channel_id is not None:
+            query += ' WHERE channel_id = ?'
+            params = (channel_id,)
+        query += ' GROUP BY channel_id ORDER BY channel_id'
+        return [dict(row) for row in self.conn.execute(query, params)]
+
+
+async def fan_out(
+    subscriptions: List[Subscription],
+    send: Callable[[Subscription], Awaitable[None]],
+    max_concurrency: int = 5,
+    max_attempts: int = 3,
+    is_retryable: Callable[[Exception], bool] = lambda e: True,
+    retry_delay: Callable[[Exception, int], float] = lambda e, attempt: 2.0 ** attempt,
+) -> List[DeliveryResult]:
+    """
+    Skicka till alla prenumeranter parallellt
+
+    Args:
+        subscriptions: Kanaler att leverera till
+        send: Korutin som skickar det färdiga meddelandet till en kanal
+        max_concurrency: Max antal samtidiga sändningar (semafor)
+        max_attempts: Max antal försök per kanal
+        is_retryable: Avgör om ett fel ska försökas igen (t.ex. 429/5xx)
+        retry_delay: Väntetid i sekunder före nästa försök
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def deliver(sub: Subscription) -> DeliveryResult:
+        started = _time.perf_counter()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                async with semaphore:
+                    await send(sub)
+                return DeliveryResult(
+                    sub.channel_id, True, attempt,
+                    (_time.perf_counter() - started) * 1000,
+                )
+            except Exception as e:
+                if attempt >= max_attempts or not is_retryable(e):
+                    return DeliveryResult(
+                        sub.channel_id, False, attempt,
+                        (_time.perf_counter() - started) * 1000,
+                        f"{type(e).__name__}: {e}",
+                    )
+                # Vänta utanför semaforen så andra kanaler inte blockeras
+                await asyncio.sleep(retry_delay(e, attempt))
+
+    return await asyncio.gather(*(deliver(sub) for sub in subscriptions))
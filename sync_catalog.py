@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+SYNK - Skicka katalogändringar till bot-värdar (RasPi, Railway)
+===============================================================
+I stället för att kopiera hela ai_companies.db efter varje import skickas
+en changeset: de rader som lagts till, ändrats eller tagits bort.
+
+- Varje publicering (publish.py) skriver en changeset till CHANGESET_DIR
+  (default changesets/) med innehållshash före och efter
+- `apply` på värden kontrollerar att dess katalog har rätt hash, applicerar
+  ändringarna i en kopia och byter fil atomiskt - botten läser in den själv
+- Saknas en obruten kedja av changesets (ny värd, schemaändring) skickas
+  hela filen, kopierad med SQLites online backup-API i sidblock så att
+  läsare aldrig låses
+
+Användning:
+    python sync_catalog.py status ai_companies.db
+    python sync_catalog.py diff gammal.db ny.db -o delta.changeset.gz
+    python sync_catalog.py apply delta.changeset.gz --db ai_companies.db
+    python sync_catalog.py backup ai_companies.db kopia.db
+    python sync_catalog.py push ai_companies.db --host /mnt/pi --host /mnt/railway
+
+Till en fjärrvärd utan monterad katalog:
+    scp changesets/<fil> pi@raspberrypi.local:~/aim25-intel-bot/
+    ssh pi@raspberrypi.local "cd ~/aim25-intel-bot && python sync_catalog.py apply <fil>"
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+FORMAT_VERSION = 1
+DB_NAME = "ai_companies.db"
+SNAPSHOT_NAME = "ai_companies.snapshot"
+INBOX_DIR = "changesets"
+
+
+class ChangesetError(Exception):
+    """Changeset passar inte katalogen (fel bas) eller gav fel resultat"""
+
+
+# ==================== INNEHÅLL ====================
+
+def _open_ro(path: str) -> sqlite3.Connection:
+    return sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True)
+
+
+def _tables(conn: sqlite3.Connection) -> List[str]:
+    """Användartabeller (sqlite_stat1/sqlite_sequence räknas om på värden)"""
+    return [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    )]
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> Tuple[List[str], List[str]]:
+    """Lagrade kolumner (inte genererade) och primärnyckelns kolumner"""
+    info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+    columns = [row[1] for row in info]
+    pk = [row[1] for row in sorted(info, key=lambda r: r[5]) if row[5] > 0]
+    return columns, pk or ['rowid']
+
+
+def _schema(conn: sqlite3.Connection) -> List[str]:
+    return [row[0] for row in conn.execute(
+        "SELECT sql FROM sqlite_master WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    )]
+
+
+def _rows(conn: sqlite3.Connection, table: str) -> Dict[tuple, tuple]:
+    columns, pk = _columns(conn, table)
+    select = ', '.join(pk + columns)
+    return {
+        row[:len(pk)]: row[len(pk):]
+        for row in conn.execute(f"SELECT {select} FROM {table} ORDER BY {', '.join(pk)}")
+    }
+
+
+def catalog_digest(conn: sqlite3.Connection) -> str:
+    """Hash av schema och innehåll (oberoende av sidlayout, VACUUM och statistik)"""
+    h = hashlib.sha256()
+    for sql in _schema(conn):
+        h.update(sql.encode())
+    for table in _tables(conn):
+        h.update(f"\0{table}\0".encode())
+        for key, values in _rows(conn, table).items():
+            h.update(repr((key, values)).encode())
+    return h.hexdigest()
+
+
+def file_digest(path: str) -> str:
+    conn = _open_ro(path)
+    try:
+        return catalog_digest(conn)
+    finally:
+        conn.close()
+
+
+# ==================== CHANGESETS ====================
+
+def _dependency_order(conn: sqlite3.Connection, tables: List[str]) -> List[str]:
+    """Tabeller som andra pekar på först (för insert; omvänt för delete)"""
+    parents = {
+        table: {row[2] for row in conn.execute(f"PRAGMA foreign_key_list({table})")} & set(tables)
+        for table in tables
+    }
+    ordered: List[str] = []
+    while len(ordered) < len(tables):
+        ready = [t for t in tables if t not in ordered and parents[t] <= set(ordered)]
+        ordered.extend(ready or [t for t in tables if t not in ordered])
+    return ordered
+
+
+def make_changeset(old_path: str, new_path: str) -> Optional[Dict]:
+    """
+    Radändringar från old_path till new_path
+
+    Returns:
+        Changeset som dict, eller None om schemat ändrats (då måste hela
+        filen skickas)
+    """
+    old, new = _open_ro(old_path), _open_ro(new_path)
+    try:
+        if _schema(old) != _schema(new):
+            return None
+        tables = {}
+        for table in _dependency_order(new, _tables(new)):
+            columns, pk = _columns(new, table)
+            before, after = _rows(old, table), _rows(new, table)
+            upsert = [list(key + values) for key, values in after.items() if before.get(key) != values]
+            delete = [list(key) for key in before if key not in after]
+            if upsert or delete:
+                tables[table] = {'pk': pk, 'columns': columns, 'upsert': upsert, 'delete': delete}
+        return {
+            'format': FORMAT_VERSION,
+            'base': catalog_digest(old),
+            'result': catalog_digest(new),
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'tables': tables,
+        }
+    finally:
+        old.close()
+        new.close()
+
+
+def write_changeset(changeset: Dict, directory: str) -> Path:
+    """Spara som <bas>-<resultat>.changeset.gz; returnerar sökvägen"""
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    path = Path(directory) / f"{changeset['base'][:16]}-{changeset['result'][:16]}.changeset.gz"
+    tmp = path.with_name(path.name + ".tmp")
+    with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+        json.dump(changeset, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, path)
+    return path
+
+
+def read_changeset(path: str) -> Dict:
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        changeset = json.load(f)
+    if changeset.get('format') != FORMAT_VERSION:
+        raise ChangesetError(f"{path}: okänt format {changeset.get('format')}")
+    return changeset
+
+
+def record_changeset(old_path: str, new_path: str, directory: str) -> Optional[Path]:
+    """Anropas av publish.py före filbytet"""
+    changeset = make_changeset(old_path, new_path)
+    if changeset is None:
+        print("⚠️ Schemat ändrades - värdarna behöver en hel kopia (sync_catalog.py push)")
+        return None
+    if changeset['base'] == changeset['result']:
+        return None
+    path = write_changeset(changeset, directory)
+    print(f"🧾 Changeset: {path} ({path.stat().st_size / 1024:.1f} KB)")
+    return path
+
+
+def apply_to_connection(conn: sqlite3.Connection, changeset: Dict) -> None:
+    """
+    Applicera på en öppen (skrivbar) anslutning
+
+    Raises:
+        ChangesetError: Om katalogen inte har changesetens bas eller om
+            resultatet inte blev det förväntade
+    """
+    if catalog_digest(conn) != changeset['base']:
+        raise ChangesetError("katalogen har inte changesetens bas - skicka hela filen")
+    tables = changeset['tables']
+    for table in reversed(list(tables)):
+        spec = tables[table]
+        where = ' AND '.join(f"{col} = ?" for col in spec['pk'])
+        conn.executemany(f"DELETE FROM {table} WHERE {where}", spec['delete'])
+    for table, spec in tables.items():
+        # Raderna är primärnyckel + alla kolumner; rowid-tabeller behåller nyckeln
+        if spec['pk'] == ['rowid']:
+            insert_columns, rows = ['rowid'] + spec['columns'], spec['upsert']
+        else:
+            width = len(spec['pk'])
+            insert_columns, rows = spec['columns'], [row[width:] for row in spec['upsert']]
+        placeholders = ', '.join('?' * len(insert_columns))
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {table} ({', '.join(insert_columns)}) VALUES ({placeholders})",
+            rows,
+        )
+    conn.commit()
+    if catalog_digest(conn) != changeset['result']:
+        raise ChangesetError("resultatet matchar inte källan efter applicering")
+
+
+def apply_changeset(path: str, db_path: str) -> None:
+    """Applicera i en kopia och publicera atomiskt; snapshoten exporteras om"""
+    from publish import staged_database
+
+    changeset = read_changeset(path)
+    with staged_database(db_path, record_changes=False) as staging:
+        conn = sqlite3.connect(staging)
+        try:
+            apply_to_connection(conn, changeset)
+        finally:
+            conn.close()
+    snapshot = Path(db_path).with_name(SNAPSHOT_NAME)
+    if snapshot.exists():
+        from catalog_snapshot import export_snapshot
+        export_snapshot(db_path, str(snapshot))
+
+
+# ==================== HELA FILEN ====================
+
+def online_backup(source: str, dest: str, pages: int = 256) -> int:
+    """
+    Konsistent kopia med SQLites backup-API, `pages` sidor åt gången
+
+    Källan öppnas read-only och låses bara under varje block, så en bot
+    som läser samtidigt blockeras aldrig. Kopian byts in atomiskt.
+
+    Returns:
+        Storlek på kopian i byte
+    """
+    tmp = f"{dest}.tmp"
+    src = _open_ro(source)
+    dst = sqlite3.connect(tmp)
+    try:
+        src.backup(dst, pages=pages)
+        dst.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        dst.close()
+        src.close()
+    os.replace(tmp, dest)
+    return Path(dest).stat().st_size
+
+
+# ==================== PUSH ====================
+
+def _chain(directory: str, start: str, goal: str) -> Optional[List[Path]]:
+    """Changesets som tar en katalog från `start` till `goal`, i ordning"""
+    by_base = {}
+    for path in sorted(Path(directory).glob("*.changeset.gz")) if Path(directory).exists() else []:
+        header = read_changeset(str(path))
+        by_base[header['base']] = (header['result'], path)
+    chain, current, seen = [], start, set()
+    while current != goal:
+        if current not in by_base or current in seen:
+            return None
+        seen.add(current)
+        current, path = by_base[current]
+        chain.append(path)
+    return chain
+
+
+def push(source_db: str, hosts: List[str], changeset_dir: str = INBOX_DIR) -> List[Dict]:
+    """
+    Uppdatera varje värdkatalog (en mapp med ai_companies.db) till källans innehåll
+
+    Returns:
+        En rapport per värd: metod och antal överförda byte
+    """
+    goal = file_digest(source_db)
+    reports = []
+    for host in hosts:
+        host_db = Path(host) / DB_NAME
+        report = {'host': host, 'method': 'oförändrad', 'bytes': 0, 'files': 0}
+        current = file_digest(str(host_db)) if host_db.exists() else None
+        chain = _chain(changeset_dir, current, goal) if current else None
+        if current == goal:
+            pass
+        elif chain:
+            inbox = Path(host) / INBOX_DIR
+            inbox.mkdir(exist_ok=True)
+            for path in chain:
+                shutil.copyfile(path, inbox / path.name)
+                report['bytes'] += path.stat().st_size
+                apply_changeset(str(inbox / path.name), str(host_db))
+            report.update(method='changeset', files=len(chain))
+        else:
+            report.update(method='hel fil', files=1, bytes=online_backup(source_db, str(host_db)))
+        reports.append(report)
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('status', help='Visa katalogens innehållshash')
+    p.add_argument('db')
+
+    p = sub.add_parser('diff', help='Skapa changeset mellan två kataloger')
+    p.add_argument('old')
+    p.add_argument('new')
+    p.add_argument('-o', '--output-dir', default=os.getenv('CHANGESET_DIR', INBOX_DIR))
+
+    p = sub.add_parser('apply', help='Applicera en changeset på värden')
+    p.add_argument('changeset')
+    p.add_argument('--db', default=DB_NAME)
+
+    p = sub.add_parser('backup', help='Kopiera hela katalogen utan att låsa läsare')
+    p.add_argument('source')
+    p.add_argument('dest')
+
+    p = sub.add_parser('push', help='Uppdatera värdmappar med changesets eller hel fil')
+    p.add_argument('db')
+    p.add_argument('--host', action='append', required=True, help='Mapp med ai_companies.db (kan upprepas)')
+    p.add_argument('--changesets', default=os.getenv('CHANGESET_DIR', INBOX_DIR))
+
+    args = parser.parse_args()
+    try:
+        if args.command == 'status':
+            print(file_digest(args.db))
+        elif args.command == 'diff':
+            record_changeset(args.old, args.new, args.output_dir)
+        elif args.command == 'apply':
+            apply_changeset(args.changeset, args.db)
+            print(f"✅ {args.changeset} applicerad på {args.db}")
+        elif args.command == 'backup':
+            size = online_backup(args.source, args.dest)
+            print(f"✅ {args.dest} ({size / 1024:.0f} KB)")
+        elif args.command == 'push':
+            full = Path(args.db).stat().st_size
+            for report in push(args.db, args.host, args.changesets):
+                print(f"📤 {report['host']}: {report['method']}, {report['files']} fil(er), "
+                      f"{report['bytes'] / 1024:.1f} KB (hela filen: {full / 1024:.0f} KB)")
+    except ChangesetError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+AI-FÖRMÅGOR - Tagga företag från beskrivningen
+==============================================
+Många företag saknar rader i company_ai_capabilities. Det här steget letar
+efter förmågor i beskrivningen och lägger till dem som härledda taggar.
+
+- Vokabulären är AI-förmågorna i databasen (utom rena affärsmodeller som
+  "subscription") plus CAPABILITY_SYNONYMS nedan, på svenska och engelska
+- Alla mönster kompileras till en Aho-Corasick-automat (aho_corasick.py),
+  så varje beskrivning läses en gång oavsett vokabulärens storlek
+- Härledda taggar sparas med company_ai_capabilities.inferred = 1. Taggar
+  från källdatan (inferred = 0) rörs aldrig, och varje körning ersätter
+  de härledda taggarna från förra körningen
+
+Körs av build_database.py och import_eu_data.py. Fristående (bygger i en
+kopia och publicerar, se publish.py):
+    python tag_capabilities.py
+"""
+
+import sqlite3
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Set
+
+from aho_corasick import Automaton, fold
+from tags import TagDictionary, normalize_tags
+
+# Förmåga -> ord i beskrivningen som betyder den (gemener). Förmågor utan
+# synonymer matchas på sitt eget namn.
+CAPABILITY_SYNONYMS: Dict[str, List[str]] = {
+    # my.ai.se
+    'Vision': ['computer vision', 'datorseende', 'bildanalys', 'image analysis', 'image recognition',
+               'bildigenkänning', 'object detection', 'video analytics', 'videoanalys'],
+    'Language': ['natural language', 'natural language processing', 'nlp', 'language model', 'llm',
+                 'språkmodell', 'språkmodeller', 'språkteknologi', 'chatbot', 'chatbotar', 'text analysis', 'textanalys',
+                 'machine translation', 'maskinöversättning'],
+    'Hearing': ['speech recognition', 'taligenkänning', 'speech-to-text', 'tal till text',
+                'voice assistant', 'röstassistent', 'audio analysis', 'ljudanalys'],
+    'Prediction': ['prediction', 'predictive', 'forecasting', 'prognos', 'prognoser',
+                   'prediktion', 'prediktiv', 'prediktiva'],
+    'Optimization': ['optimization', 'optimisation', 'optimering', 'optimize', 'optimise'],
+    'Robotics (Agentic)': ['robot', 'robotics', 'robotik', 'robotar', 'ai agent', 'ai-agent',
+                           'ai-agenter', 'agentic', 'rpa'],
+    'Creation (Generative)': ['generative', 'generativ', 'generativa', 'genai', 'gen ai',
+                              'image generation', 'text-to-image', 'content generation'],
+    'Discovery': ['anomaly detection', 'avvikelsedetektering', 'data mining', 'pattern recognition',
+                  'mönsterigenkänning', 'dataanalys', 'data analytics'],
+    # EU-källan
+    'machine learning': ['machine learning', 'maskininlärning'],
+    'deep learning': ['deep learning', 'djupinlärning', 'neural network', 'neurala nätverk'],
+    'natural language processing': ['natural language processing', 'nlp', 'språkteknologi'],
+    'recognition': ['image recognition', 'speech recognition', 'face recognition',
+                    'bildigenkänning', 'taligenkänning', 'ansiktsigenkänning'],
+    'big data': ['big data'],
+    'iot internetofthings': ['iot', 'internet of things', 'sakernas internet'],
+    'augmented reality': ['augmented reality', 'förstärkt verklighet', 'mixed reality'],
+    'virtual reality': ['virtual reality', 'vr', 'virtuell verklighet'],
+    'sensor tech': ['sensor', 'sensorer', 'lidar'],
+    'autonomous & sensor tech': ['autonomous', 'autonoma', 'självkörande', 'self-driving'],
+    'deep tech': ['deep tech', 'deeptech'],
+    'nanotech': ['nanotech', 'nanotechnology', 'nanoteknik'],
+    '3d technology': ['3d'],
+    'connected device': ['connected device', 'uppkopplade enheter'],
+    'mobile app': ['mobile app', 'mobilapp'],
+}
+
+# Taggar som inte är förmågor och inte kan läsas ut ur en beskrivning
+# ("AI" står i nästan varje beskrivning; affärsmodeller nämns i förbigående)
+UNTAGGED = {
+    'artificial intelligence', 'subscription', 'commission', 'selling own',
+    'selling own inventory', 'advertising', 'marketplace',
+}
+
+
+def ensure_provenance_column(conn: sqlite3.Connection) -> None:
+    """Äldre databaser saknar company_ai_capabilities.inferred"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(company_ai_capabilities)")}
+    if 'inferred' not in columns:
+        conn.execute("ALTER TABLE company_ai_capabilities ADD COLUMN inferred INTEGER NOT NULL DEFAULT 0")
+        conn.commit()
+
+
+class CapabilityTagger:
+    """Förmågor och synonymer kompilerade till en automat"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        """
+        Läser vokabulären ur ai_capabilities och skapar förmågor ur
+        CAPABILITY_SYNONYMS som saknas där
+
+        Args:
+            conn: Skrivbar anslutning med normaliserade taggar
+                (tags.normalize_tags)
+        """
+        ids = {fold(name): capability_id for capability_id, name
+               in conn.execute("SELECT id, name FROM ai_capabilities")}
+        tags = TagDictionary(conn)
+        for name in CAPABILITY_SYNONYMS:
+            if fold(name) not in ids:
+                ids[fold(name)] = tags.id_for('ai_capabilities', name)
+
+        patterns: Dict[str, Set[int]] = defaultdict(set)
+        synonyms = {fold(name): words for name, words in CAPABILITY_SYNONYMS.items()}
+        for name, capability_id in ids.items():
+            if name in UNTAGGED:
+                continue
+            for word in synonyms.get(name, [name]):
+                patterns[fold(word)].add(capability_id)
+        self.automaton: Automaton[FrozenSet[int]] = Automaton(
+            {word: frozenset(capability_ids) for word, capability_ids in patterns.items()}
+        )
+
+    def tag(self, text: str) -> Set[int]:
+        """ID:n för förmågorna som nämns i texten"""
+        found: Set[int] = set()
+        for _, _, capability_ids in self.automaton.find_words(text):
+            found |= capability_ids
+        return found
+
+
+def tag_capabilities(conn: sqlite3.Connection) -> Dict[str, int]:
+    """
+    Ersätt de härledda förmågorna med en ny körning över alla beskrivningar
+
+    Returns:
+        Statistik: antal beskrivningar, härledda taggar och företag som
+        fick sin första förmåga
+    """
+    ensure_provenance_column(conn)
+    normalize_tags(conn)
+    tagger = CapabilityTagger(conn)
+    conn.execute("DELETE FROM company_ai_capabilities WHERE inferred = 1")
+    tagged_before = {row[0] for row in conn.execute(
+        "SELECT DISTINCT company_id FROM company_ai_capabilities"
+    )}
+
+    rows = []
+    scanned = 0
+    for company_id, description in conn.execute(
+        "SELECT id, description FROM companies WHERE description IS NOT NULL"
+    ):
+        scanned += 1
+        rows.extend((company_id, capability_id) for capability_id in tagger.tag(description))
+
+    # OR IGNORE: taggar från källdatan har redan raden (med inferred = 0)
+    before = conn.total_changes
+    conn.executemany(
+        "INSERT OR IGNORE INTO company_ai_capabilities (company_id, capability_id, inferred) "
+        "VALUES (?, ?, 1)",
+        rows,
+    )
+    inserted = conn.total_changes - before
+    conn.commit()
+    newly_tagged = {company_id for company_id, _ in rows} - tagged_before
+    return {'scanned': scanned, 'inferred': inserted, 'newly_tagged': len(newly_tagged)}
+
+
+def tagging_step(conn: sqlite3.Connection) -> None:
+    """Byggsteg med utskrift (build_database.py, import_eu_data.py)"""
+    stats = tag_capabilities(conn)
+    print(f"\n🤖 AI-förmågor: {stats['inferred']} härledda taggar ur {stats['scanned']} beskrivningar "
+          f"({stats['newly_tagged']} företag fick sina första)")
+
+
+def main():
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "ai_companies.db"
+    if not Path(db_path).exists():
+        print(f"❌ Databas saknas: {db_path}")
+        print("   Kör först: python build_database.py")
+        sys.exit(1)
+
+    from build_database import export_snapshot_step
+    from publish import staged_database
+
+    with staged_database(db_path) as staging:
+        conn = sqlite3.connect(staging)
+        try:
+            tagging_step(conn)
+        finally:
+            conn.close()
+    export_snapshot_step(db_path)
+
+
+if __name__ == "__main__":
+    main()
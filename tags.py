@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+TAGGAR - Normalisering av sektorer, domäner, dimensioner och AI-förmågor
+========================================================================
+Källorna levererar taggar som kommaseparerade strängar ("Technology, Data").
+Här delas de upp i enskilda taggar och mappas till en kanonisk form, så att
+lookup-tabellerna bara innehåller atomära taggar och varje tagg bara finns
+en gång oavsett stavning.
+
+- split_tags: lista eller kommasträng -> enskilda taggar
+- tag_key: jämförelsenyckel (casefold, blanksteg, synonymer). Sparas i
+  <tabell>.name_key med ett unikt index; filter i repository/ är exakta
+  uppslag på nyckeln i stället för LIKE '%x%'
+- TagDictionary: ID per kanonisk tagg, delas av build_database.py,
+  import_eu_data.py och tag_capabilities.py
+- normalize_tags: migrerar en befintlig databas (delar kombinationsrader,
+  slår ihop dubbletter, fyller i name_key). Körs av båda importerna
+
+Fristående (bygger i en kopia och publicerar, se publish.py):
+    python tags.py
+"""
+
+import re
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Lookup-tabell -> (junction-tabell, kolumn i junction)
+TAG_TABLES = {
+    'sectors': ('company_sectors', 'sector_id'),
+    'domains': ('company_domains', 'domain_id'),
+    'ai_capabilities': ('company_ai_capabilities', 'capability_id'),
+    'dimensions': ('company_dimensions', 'dimension_id'),
+}
+
+# Alternativa stavningar -> kanoniskt namn (nycklarna i gemener)
+TAG_SYNONYMS: Dict[str, Dict[str, str]] = {
+    'sectors': {
+        'it': 'Information Technology',
+        'healthcare': 'Healthcare & Life Sciences',
+        'life sciences': 'Healthcare & Life Sciences',
+        'finance': 'Financial',
+        'logistics': 'Transportation & Logistics',
+        'consulting': 'Consulting & Advisory',
+    },
+    'domains': {
+        'it': 'IT & Software',
+        'software': 'IT & Software',
+        'r&d': 'Research & Development',
+        'hr': 'Human Resources',
+        'marketing': 'Marketing & Communications',
+        'csr': 'Sustainability / Ethics / CSR',
+    },
+    'dimensions': {
+        'strategy': 'Vision & Strategy',
+        'competence': 'Competence & Expertise',
+        'use cases': 'Usecases & Inspiration',
+    },
+    'ai_capabilities': {
+        'ai': 'artificial intelligence',
+        'ml': 'machine learning',
+        'nlp': 'natural language processing',
+        'iot': 'iot internetofthings',
+        'internet of things': 'iot internetofthings',
+        'ar': 'augmented reality',
+        'vr': 'virtual reality',
+        'generative': 'Creation (Generative)',
+        'generative ai': 'Creation (Generative)',
+        'robotics': 'Robotics (Agentic)',
+        'agentic': 'Robotics (Agentic)',
+    },
+}
+
+_SPACES = re.compile(r'\s+')
+
+
+def _fold(name: str) -> str:
+    return _SPACES.sub(' ', name).strip().casefold()
+
+
+def split_tags(value: Any) -> List[str]:
+    """
+    Dela upp ett taggfält i enskilda taggar
+
+    "Technology, Data" -> ["Technology", "Data"]. Listor delas också
+    (element kan själva vara kommasträngar). Dubbletter tas bort, ordningen
+    behålls.
+    """
+    if not value:
+        return []
+    parts = value if isinstance(value, list) else [value]
+    tags, seen = [], set()
+    for part in parts:
+        for tag in str(part).split(','):
+            tag = _SPACES.sub(' ', tag).strip()
+            if tag and _fold(tag) not in seen:
+                seen.add(_fold(tag))
+                tags.append(tag)
+    return tags
+
+
+def canonical_name(table: str, name: str) -> str:
+    """Kanoniskt namn för en tagg (synonymer ersatta)"""
+    name = _SPACES.sub(' ', name).strip()
+    return TAG_SYNONYMS.get(table, {}).get(_fold(name), name)
+
+
+def tag_key(table: str, name: str) -> str:
+    """Jämförelsenyckel: samma för alla stavningar av samma tagg"""
+    return _fold(canonical_name(table, name))
+
+
+def ensure_tag_keys(conn: sqlite3.Connection) -> None:
+    """name_key-kolumner och index för taggfilter (äldre databaser saknar dem)"""
+    for table, (junction, column) in TAG_TABLES.items():
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if 'name_key' not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN name_key TEXT")
+        conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_key ON {table}(name_key)")
+        # Filter går tagg -> företag; primärnyckeln är (company_id, tagg)
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{junction}_tag ON {junction}({column}, company_id)")
+    conn.commit()
+
+
+class TagDictionary:
+    """Kanoniska taggar och deras ID:n, inlästa en gång per import"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        """
+        Args:
+            conn: Skrivbar anslutning med normaliserade tabeller
+                (create_schema eller normalize_tags)
+        """
+        self.conn = conn
+        self._ids: Dict[str, Dict[str, int]] = {}
+        for table in TAG_TABLES:
+            self._ids[table] = {
+                key: tag_id for tag_id, key in conn.execute(
+                    f"SELECT id, name_key FROM {table} WHERE name_key IS NOT NULL"
+                )
+            }
+
+    def id_for(self, table: str, name: str) -> Optional[int]:
+        """ID för en enskild tagg; skapas om den saknas"""
+        if not name or not name.strip():
+            return None
+        key = tag_key(table, name)
+        tag_id = self._ids[table].get(key)
+        if tag_id is None:
+            tag_id = self.conn.execute(
+                f"INSERT INTO {table} (name, name_key) VALUES (?, ?)",
+                (canonical_name(table, name), key),
+            ).lastrowid
+            self._ids[table][key] = tag_id
+        return tag_id
+
+    def ids_for(self, table: str, value: Any) -> List[int]:
+        """ID:n för ett taggfält ("Technology, Data"), utan dubbletter"""
+        ids = []
+        for tag in split_tags(value):
+            tag_id = self.id_for(table, tag)
+            if tag_id not in ids:
+                ids.append(tag_id)
+        return ids
+
+
+def normalize_tags(conn: sqlite3.Connection) -> Dict[str, int]:
+    """
+    Gör lookup-tabellerna atomära och kanoniska
+
+    Rader som är kombinationer ("Technology, Data") eller dubbletter av en
+    annan stavning ersätts av de kanoniska taggarna; företagens kopplingar
+    flyttas med (inklusive inferred i company_ai_capabilities). Att köra
+    igen på en normaliserad databas ändrar ingenting.
+
+    Returns:
+        Statistik: borttagna rader och antal taggar efteråt
+    """
+    ensure_tag_keys(conn)
+    removed = 0
+    for table, (junction, column) in TAG_TABLES.items():
+        junction_columns = [row[1] for row in conn.execute(f"PRAGMA table_info({junction})")]
+        extra = ''.join(f", {c}" for c in junction_columns if c not in ('company_id', column))
+        owners: Dict[str, int] = {}
+        rows = conn.execute(f"SELECT id, name FROM {table} ORDER BY id").fetchall()
+
+        # Atomära taggar först (redan kanoniska namn före synonymer): de
+        # behåller sina ID:n
+        for tag_id, name in sorted(rows, key=lambda row: canonical_name(table, row[1]) != row[1]):
+            tags = split_tags(name)
+            if len(tags) == 1 and tag_key(table, tags[0]) not in owners:
+                key = tag_key(table, tags[0])
+                owners[key] = tag_id
+                conn.execute(
+                    f"UPDATE {table} SET name = ?, name_key = ? WHERE id = ?",
+                    (canonical_name(table, tags[0]), key, tag_id),
+                )
+
+        for tag_id, name in rows:
+            targets = []
+            for tag in split_tags(name):
+                key = tag_key(table, tag)
+                if key not in owners:
+                    owners[key] = conn.execute(
+                        f"INSERT INTO {table} (name, name_key) VALUES (?, ?)",
+                        (canonical_name(table, tag), key),
+                    ).lastrowid
+                targets.append(owners[key])
+            if targets == [tag_id]:
+                continue
+            for target in targets:
+                conn.execute(
+                    f"INSERT OR IGNORE INTO {junction} (company_id, {column}{extra}) "
+                    f"SELECT company_id, ?{extra} FROM {junction} WHERE {column} = ?",
+                    (target, tag_id),
+                )
+            conn.execute(f"DELETE FROM {junction} WHERE {column} = ?", (tag_id,))
+            conn.execute(f"DELETE FROM {table} WHERE id = ?", (tag_id,))
+            removed += 1
+    conn.commit()
+    tags = sum(conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in TAG_TABLES)
+    return {'removed': removed, 'tags': tags}
+
+
+def normalize_step(conn: sqlite3.Connection) -> None:
+    """Byggsteg med utskrift (build_database.py, import_eu_data.py)"""
+    stats = normalize_tags(conn)
+    if stats['removed']:
+        print(f"\n🏷️  Taggar: {stats['removed']} kombinerade/dubbla taggar ersatta, {stats['tags']} kvar")
+
+
+def main():
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "ai_companies.db"
+    if not Path(db_path).exists():
+        print(f"❌ Databas saknas: {db_path}")
+        print("   Kör först: python build_database.py")
+        sys.exit(1)
+
+    from build_database import export_snapshot_step
+    from publish import staged_database
+
+    with staged_database(db_path) as staging:
+        conn = sqlite3.connect(staging)
+        try:
+            normalize_step(conn)
+        finally:
+            conn.close()
+    export_snapshot_step(db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+TEST-SCRIPT FÖR ANALYSLOGGEN
+============================
+Ringbuffert, batchad skrivning, dagliga sammanställningar och
+HyperLogLog-uppskattningen av unika användare.
+"""
+
+import asyncio
+import sqlite3
+
+import pytest
+
+from analytics import AnalyticsLog, HyperLogLog
+
+
+@pytest.mark.parametrize("count", [1, 100, 20000])
+def test_hyperloglog_estimate(count):
+    sketch = HyperLogLog()
+    for user_id in range(count):
+        sketch.add(900000000000000000 + user_id)
+        sketch.add(900000000000000000 + user_id)  # dubbletter räknas inte
+    assert abs(sketch.count() - count) <= max(2, count * 0.05)
+
+
+def test_hyperloglog_merge():
+    a, b = HyperLogLog(), HyperLogLog()
+    for user_id in range(3000):
+        a.add(user_id)
+    for user_id in range(2000, 5000):
+        b.add(user_id)
+    restored = HyperLogLog(registers=a.to_bytes())
+    restored.merge(b)
+    assert abs(restored.count() - 5000) <= 250
+
+
+def test_flush_writes_events_and_rollups(tmp_path):
+    log = AnalyticsLog(str(tmp_path / "analytics.db"))
+    log.connect()
+    log.record_command('sok', {'search_term': 'vision'}, [1, 2, 3], user_id=10, guild_id=5)
+    log.record_command('sok', {'search_term': 'ai'}, [2], user_id=11, guild_id=5)
+    log.record_command('stad', {'city': 'Lund'}, [], user_id=10, guild_id=5, ok=False)
+    log.record_dm('sok', [2, 3], user_id=10, guild_id=5)
+    # Inget skrivs förrän flush
+    assert log.conn.execute("SELECT COUNT(*) FROM events").fetchone()[0] == 0
+
+    assert log.flush() == 4
+    assert log.flush() == 0
+    day = log.daily_report()[0]
+    assert day['commands'] == {'sok': 2, 'stad': 1} and day['dms'] == {'sok': 1}
+    assert day['errors'] == 1 and day['unique_users'] == 2
+    assert day['top_companies'][0] == {'id': 2, 'shown': 2, 'dms': 1}
+    args = log.conn.execute("SELECT args FROM events WHERE name = 'stad'").fetchone()[0]
+    assert args == '{"city": "Lund"}'
+    log.close()
+
+    # Sammanställningar och skisser byggs vidare efter omstart
+    log = AnalyticsLog(str(tmp_path / "analytics.db"))
+    log.connect()
+    log.record_command('sok', {'search_term': 'ai'}, [2], user_id=12)
+    log.close()
+    conn = sqlite3.connect(tmp_path / "analytics.db")
+    assert conn.execute("SELECT events FROM daily_rollups WHERE name = 'sok' AND kind = 'command'").fetchone() == (3,)
+    conn.close()
+    log = AnalyticsLog(str(tmp_path / "analytics.db"))
+    log.connect()
+    assert log.daily_report()[0]['unique_users'] == 3
+    log.close()
+
+
+def test_ring_buffer_drops_oldest(tmp_path):
+    log = AnalyticsLog(str(tmp_path / "analytics.db"), capacity=3)
+    log.connect()
+    for company_id in range(5):
+        log.record_dm('dagens', [company_id], user_id=1)
+    assert log.metrics()['dropped'] == 2 and log.metrics()['buffered'] == 3
+    log.flush()
+    ids = [row[0] for row in log.conn.execute("SELECT result_ids FROM events ORDER BY id")]
+    assert ids == ['2', '3', '4']
+    log.close()
+
+
+def test_disabled_and_async_flush(tmp_path):
+    off = AnalyticsLog(None)
+    off.connect()
+    off.record_command('sok', user_id=1)
+    assert off.metrics()['buffered'] == 0 and off.flush() == 0
+
+    log = AnalyticsLog(str(tmp_path / "analytics.db"))
+    log.connect()
+    log.record_command('dagens', result_ids=[7], user_id=1)
+
+    async def flush():
+        return await log.call('flush')
+    assert asyncio.run(flush()) == 1
+    log.close()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+TEST-SCRIPT FÖR HTTP-API
+========================
+Kör api_server.py i processen (aiohttp TestServer) mot ai_companies.db och
+kontrollerar ETag/304, gzip, keyset-paginering och felsvar.
+"""
+
+import asyncio
+import gzip
+import json
+from pathlib import Path
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from api_server import create_app
+from repository import CompanyRepository
+
+pytestmark = pytest.mark.skipif(
+    not Path("ai_companies.db").exists(), reason="ai_companies.db saknas - kör build_database.py"
+)
+
+
+def run_with_client(scenario):
+    """Kör scenario(client) mot en nystartad app"""
+    async def main():
+        app = create_app(CompanyRepository("ai_companies.db"))
+        async with TestClient(TestServer(app)) as client:
+            return await scenario(client)
+    return asyncio.run(main())
+
+
+def test_search_etag_and_gzip():
+    async def scenario(client):
+        response = await client.get('/api/search?q=ai&limit=50', headers={'Accept-Encoding': 'gzip'})
+        assert response.status == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        etag = response.headers['ETag']
+        results = (await response.json())['results']
+        assert results and all('ai' in row['name'].lower() for row in results)
+
+        again = await client.get('/api/search?q=ai&limit=50', headers={'If-None-Match': etag})
+        assert again.status == 304 and again.headers['ETag'] == etag
+
+        # Utan Accept-Encoding: samma innehåll okomprimerat, ur cachen
+        raw = await client.get('/api/search?q=ai&limit=50', headers={'Accept-Encoding': 'identity'})
+        assert 'Content-Encoding' not in raw.headers
+        assert (await raw.json())['results'] == results
+
+        health = await (await client.get('/api/health')).json()
+        assert health['status'] == 'ok' and health['cache']['hits'] >= 1
+    run_with_client(scenario)
+
+
+def test_keyset_pages_cover_filter_companies():
+    repo = CompanyRepository("ai_companies.db")
+    repo.connect()
+    try:
+        expected = [row['id'] for row in repo.filter_companies(company_type='startup', limit=100000)]
+    finally:
+        repo.close()
+    assert len(expected) > 100
+
+    async def scenario(client):
+        ids, cursor = [], ''
+        while True:
+            response = await client.get(f'/api/companies?type=startup&limit=100&cursor={cursor}')
+            page = await response.json()
+            ids.extend(row['id'] for row in page['results'])
+            if page['next'] is None:
+                return ids
+            cursor = page['next']
+    assert run_with_client(scenario) == expected
+
+
+def test_company_facets_and_errors():
+    async def scenario(client):
+        first = (await (await client.get('/api/search?q=ai&limit=1')).json())['results'][0]
+        company = await (await client.get(f"/api/companies/{first['id']}")).json()
+        assert company['name'] == first['name']
+
+        counts = (await (await client.get('/api/facets/type')).json())['counts']
+        assert counts and list(counts.values()) == sorted(counts.values(), reverse=True)
+
+        assert (await client.get('/api/companies/999999999')).status == 404
+        assert (await client.get('/api/facets/planet')).status == 404
+        assert (await client.get('/api/search')).status == 400
+        assert (await client.get('/api/companies?limit=1000')).status == 400
+        bad = await client.get('/api/companies?cursor=x.y')
+        assert bad.status == 400 and 'error' in json.loads(await bad.text())
+    run_with_client(scenario)
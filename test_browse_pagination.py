@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+TEST-SCRIPT FÖR KEYSET-PAGINERING
+=================================
+Bläddrar igenom alla startups fram och tillbaka med browse_page och
+kontrollerar att varje företag visas exakt en gång i stabil ordning.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from discord_bot import CompanyDatabase
+
+
+@pytest.fixture
+def db():
+    if not Path("ai_companies.db").exists():
+        pytest.skip("ai_companies.db saknas - kör build_database.py")
+    database = CompanyDatabase()
+    database.connect()
+    yield database
+    database.close()
+
+
+def _cursor(row):
+    return (row['data_quality_score'], row['id'])
+
+
+def test_keyset_pages_cover_everything_once(db):
+    pages = []
+    rows, has_more = db.browse_page('typ', 'startup', limit=7)
+    while rows:
+        pages.append(rows)
+        if not has_more:
+            break
+        rows, has_more = db.browse_page('typ', 'startup', _cursor(rows[-1]), 'next', limit=7)
+
+    ids = [row['id'] for page in pages for row in page]
+    assert len(ids) == len(set(ids))
+    keys = [_cursor(row) for page in pages for row in page]
+    assert keys == sorted(keys, reverse=True)
+
+    total = db.conn.execute(
+        "SELECT COUNT(*) FROM companies WHERE type = 'startup' "
+        "AND website IS NOT NULL AND TRIM(website) <> ''"
+    ).fetchone()[0]
+    assert len(ids) == total
+
+
+def test_keyset_prev_and_reload(db):
+    first, _ = db.browse_page('sthlm', '', limit=5)
+    second, _ = db.browse_page('sthlm', '', _cursor(first[-1]), 'next', limit=5)
+    back, _ = db.browse_page('sthlm', '', _cursor(second[0]), 'prev', limit=5)
+    again, _ = db.browse_page('sthlm', '', _cursor(second[0]), 'from', limit=5)
+    assert [r['id'] for r in back] == [r['id'] for r in first]
+    assert [r['id'] for r in again] == [r['id'] for r in second]
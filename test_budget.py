@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+TEST-SCRIPT FÖR LATENSBUDGET
+============================
+Deadline för SQLite-frågor, automatisk defer och trimmade svar.
+"""
+
+import asyncio
+import sqlite3
+import time
+from pathlib import Path
+
+import pytest
+
+import budget
+from budget import BudgetExceeded, LatencyBudgets, budgeted, respond, sqlite_deadline
+
+SLOW_QUERY = """
+WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 100000000)
+SELECT COUNT(*) FROM n
+"""
+
+
+def test_sqlite_deadline_interrupts_query():
+    conn = sqlite3.connect(":memory:")
+    start = time.monotonic()
+    with pytest.raises(BudgetExceeded):
+        with sqlite_deadline(conn, time.monotonic() + 0.05):
+            conn.execute(SLOW_QUERY).fetchall()
+    assert time.monotonic() - start < 1
+    # Handlern tas bort efteråt
+    assert conn.execute("SELECT 1").fetchone() == (1,)
+
+
+class _Response:
+    def __init__(self):
+        self.done = False
+        self.deferred = False
+        self.sent = []
+
+    def is_done(self):
+        return self.done
+
+    async def defer(self, ephemeral=False, thinking=False):
+        self.done = self.deferred = True
+
+    async def send_message(self, content=None, **kwargs):
+        self.done = True
+        self.sent.append(content)
+
+
+class _Followup:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append(content)
+
+
+class _Interaction:
+    def __init__(self):
+        self.response = _Response()
+        self.followup = _Followup()
+
+
+def test_slow_command_is_deferred_next_time():
+    budgets = LatencyBudgets(budget_ms=20, defer_threshold_ms=10)
+
+    @budgeted(budgets)
+    async def slow(interaction):
+        await asyncio.sleep(0.03)
+        await respond(interaction, "klart")
+
+    first = _Interaction()
+    asyncio.run(slow(first))
+    assert not first.response.deferred and first.response.sent == ["klart"]
+
+    second = _Interaction()
+    asyncio.run(slow(second))
+    assert second.response.deferred and second.followup.sent == ["klart"]
+
+    stats = budgets.metrics()[0]
+    assert stats['command'] == 'slow' and stats['calls'] == 2
+    assert stats['violations'] == 1 and stats['deferred'] == 1
+
+
+def test_query_over_budget_is_trimmed():
+    if not Path("ai_companies.db").exists():
+        pytest.skip("ai_companies.db saknas - kör build_database.py")
+    from discord_bot import CompanyDatabase
+
+    db = CompanyDatabase()
+    db.connect()
+    trimmed = [False]
+    deadline_token = budget._deadline.set(time.monotonic() - 1)
+    trimmed_token = budget._trimmed.set(trimmed)
+    try:
+        results = db.filter_by_type('startup', limit=5)
+    finally:
+        budget._deadline.reset(deadline_token)
+        budget._trimmed.reset(trimmed_token)
+        db.close()
+    # Frågan avbröts; svaret byggs av de ID:n som hann hämtas
+    assert trimmed[0]
+    assert len(results) <= 5
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+TEST-SCRIPT FÖR KNAPPETIKETTER
+==============================
+Långa söktermer ska överleva custom_id-gränsen (och en omstart) utan
+att kapas.
+"""
+
+import asyncio
+
+import discord_bot
+from button_labels import CUSTOM_ID_MAX, ButtonLabelStore
+from discord_bot import PageButton
+
+
+def _click(custom_id):
+    """Återskapa knappen ur custom_id som discord.py gör vid ett klick"""
+    match = PageButton.__discord_ui_compiled_template__.fullmatch(custom_id)
+    assert match is not None
+    return asyncio.run(PageButton.from_custom_id(None, None, match))
+
+
+def test_long_label_round_trips_through_custom_id(tmp_path, monkeypatch):
+    state_path = str(tmp_path / "state.db")
+    store = ButtonLabelStore(state_path)
+    store.connect()
+    monkeypatch.setattr(discord_bot, 'button_labels', store)
+
+    short = PageButton('next', 'sok', 'vision', 123456789012345678, 3, (42, 7))
+    assert short.item.custom_id.endswith(':vision')
+    assert _click(short.item.custom_id).label == 'vision'
+
+    query = "datorseende för medicinsk bildanalys och " * 3
+    button = PageButton('next', 'sok', query, 123456789012345678, 3, (42, 7))
+    assert len(button.item.custom_id) <= CUSTOM_ID_MAX
+    assert query not in button.item.custom_id
+    assert _click(button.item.custom_id).label == query
+    # Etiketter som själva ser ut som en hash tas aldrig för en nyckel
+    assert _click(PageButton('dm', 'sok', '#c++', 1, 0, (0, 0)).item.custom_id).label == '#c++'
+
+    # Efter omstart läses etiketten från state-databasen
+    store.close()
+    restarted = ButtonLabelStore(state_path)
+    restarted.connect()
+    monkeypatch.setattr(discord_bot, 'button_labels', restarted)
+    try:
+        assert _click(button.item.custom_id).label == query
+        # Okänd hash: knappen ber användaren köra kommandot igen i stället för att gissa
+        unknown = button.item.custom_id[:-16] + '0' * 16
+        assert _click(unknown).label is None
+    finally:
+        restarted.close()
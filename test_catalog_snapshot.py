@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+TEST-SCRIPT FÖR KATALOG-SNAPSHOT
+================================
+Exporterar ai_companies.db till en temporär snapshot och jämför
+uppslagningar mot SQLite.
+"""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from catalog_snapshot import CatalogSnapshot, SnapshotError, FLAG_DAILY, export_snapshot
+from discord_bot import CompanyDatabase
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    if not Path("ai_companies.db").exists():
+        pytest.skip("ai_companies.db saknas - kör build_database.py")
+    path = tmp_path / "ai_companies.snapshot"
+    export_snapshot("ai_companies.db", str(path))
+    return str(path)
+
+
+def test_snapshot_matches_database(snapshot_path):
+    sql = CompanyDatabase()
+    sql.connect()
+    snapshot = CatalogSnapshot.open(snapshot_path)
+    try:
+        assert snapshot.ids_with_flag(FLAG_DAILY) == sql.get_daily_eligible_ids()
+        for company_id in sql.get_daily_eligible_ids()[:50]:
+            expected = sql.get_company(company_id)
+            actual = snapshot.get(company_id)
+            for key in ('id', 'name', 'website', 'type', 'logo_url', 'description', 'location_city'):
+                assert actual[key] == expected[key]
+            assert set(expected['ai_capabilities']) <= set(snapshot.tags(snapshot.index_of(company_id)))
+        assert snapshot.get(10 ** 9) is None
+    finally:
+        snapshot.close()
+        sql.close()
+
+
+def test_reverse_tag_index(snapshot_path):
+    snapshot = CatalogSnapshot.open(snapshot_path)
+    try:
+        for name in snapshot.tag_names('sector')[:5]:
+            for company_id in snapshot.companies_with_tag(name, 'sector'):
+                assert name in snapshot.tags(snapshot.index_of(company_id), 'sector')
+    finally:
+        snapshot.close()
+
+
+def test_bot_uses_fresh_snapshot(snapshot_path):
+    db = CompanyDatabase(snapshot_path=snapshot_path)
+    db.connect()
+    try:
+        assert db.snapshot is not None
+        ids = db.get_daily_eligible_ids()[:3]
+        assert [c['id'] for c in db.get_companies(list(reversed(ids)))] == list(reversed(ids))
+    finally:
+        db.close()
+
+    # Snapshot äldre än databasen ignoreras
+    os.utime(snapshot_path, (0, 0))
+    db = CompanyDatabase(snapshot_path=snapshot_path)
+    db.connect()
+    assert db.snapshot is None
+    db.close()
+
+
+def test_rejects_foreign_file(tmp_path):
+    path = tmp_path / "bad.snapshot"
+    path.write_bytes(b"not a snapshot" * 10)
+    with pytest.raises(SnapshotError):
+        CatalogSnapshot.open(str(path))
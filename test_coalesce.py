@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+TEST-SCRIPT FÖR COALESCING OCH RATE LIMIT
+=========================================
+Samtidiga identiska anrop ska dela en beräkning; spam ska avvisas.
+"""
+
+import asyncio
+
+import pytest
+
+import budget
+from coalesce import KeyedRateLimiter, SingleFlight, normalize_args
+
+
+def test_concurrent_identical_calls_share_work():
+    flight = SingleFlight(linger_s=0)
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return ['AI Sweden']
+
+    async def main():
+        key = ('search_by_name',) + normalize_args('  AI ')
+        assert key == ('search_by_name',) + normalize_args('ai')
+        return await asyncio.gather(*(flight.do(key, work) for _ in range(10)))
+
+    results = asyncio.run(main())
+    assert len(runs) == 1 and all(r == ['AI Sweden'] for r in results)
+    metrics = flight.metrics()
+    assert metrics['executed'] == 1 and metrics['coalesced'] == 9
+    assert metrics['coalesce_rate'] == pytest.approx(0.9)
+
+
+def test_linger_and_errors():
+    flight = SingleFlight(linger_s=60)
+
+    async def fail():
+        raise RuntimeError("db")
+
+    async def ok():
+        return 42
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await flight.do('k', fail)
+        # Fel sparas inte - nästa anrop kör igen
+        assert await flight.do('k', ok) == 42
+        assert await flight.do('k', fail) == 42
+
+    asyncio.run(main())
+    assert flight.metrics()['executed'] == 2
+
+
+def test_bot_query_keeps_neither_samples_nor_trimmed_answers(monkeypatch):
+    """Slumpade urval och kortade svar delas bara medan frågan pågår"""
+    import discord_bot
+
+    runs = []
+
+    class FakeDatabase:
+        async def call(self, method, *args):
+            runs.append((method,) + args)
+            if args[0] == 'långsam':
+                budget.mark_trimmed()
+            await asyncio.sleep(0.01)
+            return [len(runs)]
+
+    monkeypatch.setattr(discord_bot, 'db', FakeDatabase())
+    monkeypatch.setattr(discord_bot, 'single_flight', SingleFlight(linger_s=60))
+
+    async def main():
+        # Samtidiga anrop delar fortfarande urvalet ...
+        shared = await asyncio.gather(*(discord_bot.query('filter_by_city', 'Lund', 5) for _ in range(3)))
+        assert shared == [[1]] * 3
+        # ... men nästa anrop får ett nytt
+        assert await discord_bot.query('filter_by_city', 'Lund', 5) == [2]
+
+        assert await discord_bot.query('search_by_name', 'vision') == [3]
+        assert await discord_bot.query('search_by_name', 'Vision') == [3]
+
+        flag = [False]
+        token = budget._trimmed.set(flag)
+        try:
+            assert await discord_bot.query('search_by_name', 'långsam') == [4]
+        finally:
+            budget._trimmed.reset(token)
+        assert flag[0]
+        assert await discord_bot.query('search_by_name', 'långsam') == [5]
+
+    asyncio.run(main())
+    assert len(runs) == 5
+
+
+def test_rate_limiter_rejects_spam():
+    limiter = KeyedRateLimiter(rate=0.001, burst=3)
+    assert [limiter.check(1) is None for _ in range(5)] == [True, True, True, False, False]
+    assert limiter.check(2) is None
+    assert limiter.metrics() == {'allowed': 4, 'rejected': 2, 'keys': 2}
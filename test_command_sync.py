@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+TEST-SCRIPT FÖR KOMMANDO-SYNK
+=============================
+tree.sync ska bara anropas när kommandoträdet ändrats.
+"""
+
+import asyncio
+
+import discord
+from discord import app_commands
+
+from command_sync import CommandSyncState, command_tree_hash, sync_commands
+
+
+def _tree():
+    client = discord.Client(intents=discord.Intents.none())
+    tree = app_commands.CommandTree(client)
+
+    @tree.command(name="dagens", description="Dagens AI-företag")
+    async def dagens(interaction):
+        pass
+
+    calls = []
+
+    async def fake_sync(guild=None):
+        calls.append(guild)
+        return tree.get_commands(guild=guild)
+
+    tree.sync = fake_sync
+    return tree, calls
+
+
+def test_sync_only_when_tree_changes(tmp_path):
+    state = CommandSyncState(str(tmp_path / "state.db"))
+    state.connect()
+    tree, calls = _tree()
+
+    assert asyncio.run(sync_commands(tree, state, 1)) == 1
+    assert asyncio.run(sync_commands(tree, state, 1)) is None
+    assert len(calls) == 1
+
+    before = command_tree_hash(tree)
+
+    @tree.command(name="sok", description="Sök efter företag")
+    async def sok(interaction, namn: str):
+        pass
+
+    assert command_tree_hash(tree) != before
+    assert asyncio.run(sync_commands(tree, state, 1)) == 2
+    assert asyncio.run(sync_commands(tree, state, 1, force=True)) == 2
+    # Annan bot / guild har egen hash
+    assert asyncio.run(sync_commands(tree, state, 2)) == 2
+    assert len(calls) == 4
+    state.close()
+
+
+def test_failed_sync_is_retried(tmp_path):
+    state = CommandSyncState(str(tmp_path / "state.db"))
+    state.connect()
+    tree, calls = _tree()
+
+    async def failing_sync(guild=None):
+        raise RuntimeError("rate limited")
+
+    tree.sync = failing_sync
+    try:
+        asyncio.run(sync_commands(tree, state, 1))
+    except RuntimeError:
+        pass
+    assert state.get("1:global") is None
+    state.close()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+TEST-SCRIPT FÖR DAGLIG ROTATION
+===============================
+Testar att DailyRotation täcker alla företag utan upprepningar,
+överlever omstart och slumpas om när katalogen ändras.
+"""
+
+from datetime import date, timedelta
+
+from daily_schedule import DailyRotation
+
+
+def _days(start: date, count: int):
+    return [start + timedelta(days=i) for i in range(count)]
+
+
+def test_rotation_covers_all_without_repeats(tmp_path):
+    rotation = DailyRotation(str(tmp_path / "state.db"))
+    rotation.connect()
+    ids = list(range(1, 21))
+    assert rotation.sync(ids) is True
+
+    picked = [rotation.next_company_id(d) for d in _days(date(2025, 1, 1), 20)]
+    assert sorted(picked) == ids
+
+    # Ny runda: inget företag två dagar i rad över rundgränsen
+    next_round = [rotation.next_company_id(d) for d in _days(date(2025, 1, 21), 20)]
+    assert sorted(next_round) == ids
+    assert next_round[0] != picked[-1]
+    rotation.close()
+
+
+def test_rotation_survives_restart_and_same_day(tmp_path):
+    path = str(tmp_path / "state.db")
+    rotation = DailyRotation(path)
+    rotation.connect()
+    rotation.sync([1, 2, 3, 4, 5])
+    today = date(2025, 3, 1)
+    first = rotation.next_company_id(today)
+    rotation.close()
+
+    restarted = DailyRotation(path)
+    restarted.connect()
+    assert restarted.sync([5, 4, 3, 2, 1]) is False  # samma katalog
+    assert restarted.next_company_id(today) == first
+    assert restarted.remaining() == 4
+    restarted.close()
+
+
+def test_rotation_reshuffles_on_catalogue_change(tmp_path):
+    rotation = DailyRotation(str(tmp_path / "state.db"))
+    rotation.connect()
+    ids = list(range(1, 11))
+    rotation.sync(ids)
+    shown = [rotation.next_company_id(d) for d in _days(date(2025, 1, 1), 4)]
+
+    # Ett visat och ett ej visat företag tas bort, två nya tillkommer
+    removed_unshown = next(i for i in ids if i not in shown)
+    catalogue = [i for i in ids if i not in (shown[0], removed_unshown)] + [11, 12]
+    assert rotation.sync(catalogue) is True
+    assert rotation.sync(catalogue) is False
+    assert rotation.remaining() == 10 - 4 - 1 + 2
+
+    # Resten av rundan: bara ej visade och nya, inga upprepningar
+    rest = [rotation.next_company_id(d) for d in _days(date(2025, 1, 5), rotation.remaining())]
+    assert sorted(rest) == sorted(set(catalogue) - set(shown))
+    # Sedan en ny runda över hela den nya katalogen
+    next_round = [rotation.next_company_id(d) for d in _days(date(2025, 2, 1), len(catalogue))]
+    assert sorted(next_round) == sorted(catalogue)
+    rotation.close()
+
+
+def test_two_processes_share_one_pick_per_day(tmp_path):
+    path = str(tmp_path / "state.db")
+    first = DailyRotation(path)
+    second = DailyRotation(path)
+    first.connect()
+    second.connect()
+    first.sync(range(1, 11))
+    assert second.sync(range(1, 11)) is False
+    today = date(2025, 5, 1)
+    assert first.next_company_id(today) == second.next_company_id(today)
+    assert first.remaining() == 9
+    first.close()
+    second.close()
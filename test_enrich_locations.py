@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+TEST-SCRIPT FÖR ORTBERIKNING
+============================
+Kontrollerar Aho-Corasick-automaten mot en naiv sökning och att
+berikningen bara fyller i orter som saknas (på en kopia av ai_companies.db).
+"""
+
+import random
+import shutil
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from aho_corasick import Automaton
+from enrich_locations import Gazetteer, enrich_locations, ensure_location_columns
+
+
+def test_automaton_matches_naive_search():
+    rng = random.Random(7)
+    patterns = {''.join(rng.choice('abc') for _ in range(rng.randint(1, 4))) for _ in range(30)}
+    automaton = Automaton({p: p for p in patterns})
+    for _ in range(50):
+        text = ''.join(rng.choice('abcd') for _ in range(rng.randint(0, 40)))
+        expected = sorted(
+            (i, i + len(p), p) for p in patterns for i in range(len(text)) if text.startswith(p, i)
+        )
+        assert sorted(automaton.find_all(text)) == expected
+
+
+@pytest.fixture(scope="module")
+def gazetteer():
+    return Gazetteer()
+
+
+def test_locate(gazetteer):
+    kista = gazetteer.locate("Vi utvecklar AI-verktyg med kontor i Kista.", None)
+    assert kista.city == "Kista" and kista.greater_stockholm and kista.confidence == 0.9
+
+    gothenburg = gazetteer.locate("A Gothenburg-based startup.", "https://example.se")
+    assert gothenburg.city == "Göteborg" and not gothenburg.greater_stockholm
+
+    assert gazetteer.locate(None, "https://www.malmo-ai.se/om").city == "Malmö"
+    assert gazetteer.locate("Stockholms universitet forskar om AI", None).city == "Stockholm"
+    # Tvetydiga namn och ASCII-former av korta namn kräver sammanhang
+    assert gazetteer.locate("Mark leads the team and we are growing", None) is None
+    assert gazetteer.locate("Vi finns i Mark", None).city == "Mark"
+    # Flera orter delar på säkerheten
+    shared = gazetteer.locate("Kontor i Stockholm, Göteborg och Malmö", None)
+    assert shared.city == "Stockholm" and shared.confidence < 0.5
+
+
+def test_enrich_fills_only_missing_locations(tmp_path, gazetteer):
+    if not Path("ai_companies.db").exists():
+        pytest.skip("ai_companies.db saknas - kör build_database.py")
+    path = tmp_path / "ai_companies.db"
+    shutil.copy("ai_companies.db", path)
+    conn = sqlite3.connect(path)
+    try:
+        # Orter från källdatan; en databas byggd med build_database.py har redan berikade rader
+        ensure_location_columns(conn)
+        before = conn.execute(
+            "SELECT id, location_city, location_greater_stockholm FROM companies "
+            "WHERE location_city IS NOT NULL AND location_confidence IS NULL"
+        ).fetchall()
+        stats = enrich_locations(conn, gazetteer)
+        assert stats['located'] > 50
+        assert conn.execute(
+            "SELECT id, location_city, location_greater_stockholm FROM companies "
+            "WHERE location_city IS NOT NULL AND location_confidence IS NULL"
+        ).fetchall() == before
+        assert conn.execute(
+            "SELECT COUNT(*) FROM companies WHERE location_confidence < 0.5 OR location_confidence > 1"
+        ).fetchone()[0] == 0
+
+        # Samma resultat om steget körs igen
+        first = conn.execute("SELECT * FROM companies ORDER BY id").fetchall()
+        assert enrich_locations(conn, gazetteer) == stats
+        assert conn.execute("SELECT * FROM companies ORDER BY id").fetchall() == first
+    finally:
+        conn.close()
+
+
+def test_inferred_location_is_marked_in_embed(tmp_path, gazetteer):
+    """location_confidence når embeden både via SQLite och via snapshoten"""
+    if not Path("ai_companies.db").exists():
+        pytest.skip("ai_companies.db saknas - kör build_database.py")
+    from catalog_snapshot import export_snapshot
+    from discord_bot import build_company_embed
+    from repository import CompanyRepository
+
+    path = tmp_path / "ai_companies.db"
+    shutil.copy("ai_companies.db", path)
+    conn = sqlite3.connect(path)
+    try:
+        enrich_locations(conn, gazetteer)
+        inferred, confidence = conn.execute(
+            "SELECT id, location_confidence FROM companies WHERE location_confidence IS NOT NULL LIMIT 1"
+        ).fetchone()
+        from_source = conn.execute(
+            "SELECT id FROM companies WHERE location_city IS NOT NULL AND location_confidence IS NULL LIMIT 1"
+        ).fetchone()[0]
+    finally:
+        conn.close()
+    export_snapshot(str(path), str(tmp_path / "ai_companies.snapshot"))
+
+    for snapshot_path in (None, str(tmp_path / "ai_companies.snapshot")):
+        repo = CompanyRepository(str(path), snapshot_path=snapshot_path)
+        repo.connect()
+        try:
+            assert (repo.snapshot is not None) == (snapshot_path is not None)
+            company = repo.get_company(inferred)
+            assert company['location_confidence'] == pytest.approx(confidence, abs=0.01)
+            location = {f.name: f.value for f in build_company_embed(company).fields}["📍 Plats"]
+            assert location.endswith("· uppskattad")
+            source = {f.name: f.value for f in build_company_embed(repo.get_company(from_source)).fields}
+            assert "uppskattad" not in source["📍 Plats"]
+        finally:
+            repo.close()
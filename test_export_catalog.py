@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+TEST-SCRIPT FÖR EXPORT
+======================
+Kontrollerar att exporten ger samma företag som filter_companies och att
+raderna strömmas i stället för att läsas in i förväg.
+"""
+
+import csv
+import json
+from pathlib import Path
+
+import pytest
+
+from export_catalog import ExportError, export_companies, format_for
+from repository import CompanyRepository
+
+pytestmark = pytest.mark.skipif(
+    not Path("ai_companies.db").exists(), reason="ai_companies.db saknas - kör build_database.py"
+)
+
+
+def test_export_matches_filter(tmp_path):
+    filters = dict(company_type='startup', min_quality=40)
+    repo = CompanyRepository("ai_companies.db")
+    repo.connect()
+    try:
+        expected = [row['id'] for row in repo.filter_companies(limit=100000, **filters)]
+    finally:
+        repo.close()
+    assert expected
+
+    stats = export_companies(str(tmp_path / "startups.jsonl"), **filters)
+    with open(tmp_path / "startups.jsonl", encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f]
+    assert stats['rows'] == len(rows) and [row['id'] for row in rows] == expected
+    assert all(isinstance(row['location_greater_stockholm'], (bool, type(None))) for row in rows)
+
+    export_companies(str(tmp_path / "startups.csv"), **filters)
+    with open(tmp_path / "startups.csv", newline='', encoding='utf-8') as f:
+        assert [int(row['id']) for row in csv.DictReader(f)] == expected
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_rows_are_streamed():
+    repo = CompanyRepository("ai_companies.db")
+    repo.connect()
+    try:
+        rows = repo.iter_companies()
+        assert next(rows)['id'] and next(rows)['id']
+        rows.close()
+    finally:
+        repo.close()
+
+
+def test_formats(tmp_path):
+    assert format_for("a.CSV") == 'csv' and format_for("a.json") == 'jsonl'
+    assert format_for("a.txt", 'parquet') == 'parquet'
+    with pytest.raises(ExportError):
+        format_for("a.xlsx")
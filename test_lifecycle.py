@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+TEST-SCRIPT FÖR BOTTENS LIVSCYKEL
+=================================
+setup_hook ska göra engångsarbetet; upprepade on_ready (återanslutningar)
+ska inte öppna nya databasanslutningar eller synka kommandon igen.
+"""
+
+import asyncio
+from pathlib import Path
+
+import pytest
+
+import discord_bot
+from button_labels import ButtonLabelStore
+from command_sync import CommandSyncState
+from subscriptions import SubscriptionStore
+
+
+def test_reconnects_do_not_redo_setup(tmp_path, monkeypatch):
+    if not Path("ai_companies.db").exists():
+        pytest.skip("ai_companies.db saknas - kör build_database.py")
+    state_path = str(tmp_path / "state.db")
+    monkeypatch.setattr(discord_bot, "db", discord_bot.CompanyDatabase())
+    monkeypatch.setattr(discord_bot, "subscriptions", SubscriptionStore(state_path))
+    monkeypatch.setattr(discord_bot, "command_sync_state", CommandSyncState(state_path))
+    monkeypatch.setattr(discord_bot, "button_labels", ButtonLabelStore(state_path))
+    monkeypatch.setattr(discord_bot, "shard_metrics", discord_bot.ShardMetrics())
+    monkeypatch.delenv("GUILD_ID", raising=False)
+    monkeypatch.setenv("WARMUP", "0")
+    monkeypatch.setattr(discord_bot.bot._connection, "application_id", 1)
+
+    syncs = []
+
+    async def fake_sync(guild=None):
+        syncs.append(guild)
+        return []
+
+    monkeypatch.setattr(discord_bot.bot.tree, "sync", fake_sync)
+
+    async def run():
+        await discord_bot.setup_hook()
+        try:
+            for _ in range(3):
+                await discord_bot.on_ready()
+        finally:
+            discord_bot.daily_company.cancel()
+            discord_bot.reload_catalog.cancel()
+
+    asyncio.run(run())
+    try:
+        metrics = discord_bot.shard_metrics
+        assert metrics.setup_runs == 1 and metrics.ready_events == 3
+        assert discord_bot.db.connections_opened == 1
+        assert len(syncs) == 1
+    finally:
+        discord_bot.db.close()
+        discord_bot.subscriptions.close()
+        discord_bot.command_sync_state.close()
+        discord_bot.button_labels.close()
+
+
+def test_legacy_channel_is_subscribed(tmp_path, monkeypatch):
+    """DAILY_CHANNEL_ID registreras i setup_hook, innan kanalcachen är fylld"""
+    monkeypatch.setattr(discord_bot, "subscriptions", SubscriptionStore(str(tmp_path / "state.db")))
+    monkeypatch.setenv("DAILY_CHANNEL_ID", "4242")
+    fetched = []
+
+    class FakeChannel:
+        id = 4242
+        guild = discord_bot.discord.Object(id=77)
+
+    async def fake_fetch(channel_id):
+        fetched.append(channel_id)
+        return FakeChannel()
+
+    monkeypatch.setattr(discord_bot.bot, "fetch_channel", fake_fetch)
+    discord_bot.subscriptions.connect()
+    try:
+        assert discord_bot.bot.get_channel(4242) is None
+        asyncio.run(discord_bot.register_legacy_channel())
+        asyncio.run(discord_bot.register_legacy_channel())
+        subs = discord_bot.subscriptions.list_subscriptions(77)
+        assert [(s.guild_id, s.channel_id) for s in subs] == [(77, 4242)]
+        assert fetched == [4242, 4242]
+    finally:
+        discord_bot.subscriptions.close()
+
+
+def test_new_catalogue_is_warmed(monkeypatch):
+    """reload_catalog värmer cacherna igen när en ny katalog lästs in"""
+    class FakeDatabase:
+        def __init__(self, changed):
+            self.changed = changed
+
+        async def run(self, method, *args):
+            return self.changed if method == 'reload_if_changed' else [1, 2]
+
+    warmed = []
+
+    async def fake_warm_caches():
+        warmed.append(1)
+
+    monkeypatch.setattr(discord_bot, "warm_caches", fake_warm_caches)
+    monkeypatch.setattr(discord_bot, "warmup_task", None)
+    monkeypatch.delenv("WARMUP", raising=False)
+
+    async def run(changed):
+        monkeypatch.setattr(discord_bot, "db", FakeDatabase(changed))
+        await discord_bot.reload_catalog()
+        if discord_bot.warmup_task is not None:
+            await discord_bot.warmup_task
+
+    asyncio.run(run(False))
+    assert warmed == []
+    asyncio.run(run(True))
+    assert warmed == [1]
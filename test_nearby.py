@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+TEST-SCRIPT FÖR RADIESÖKNING (/nara)
+====================================
+Jämför rutnätsindexet mot en genomsökning av alla punkter och bläddrar
+igenom /nara-resultat på en berikad kopia av ai_companies.db.
+"""
+
+import random
+import shutil
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from catalog_snapshot import CatalogSnapshot, export_snapshot
+from enrich_locations import Gazetteer, enrich_step
+from repository import CompanyRepository, GridIndex, haversine_km, nearby_label
+
+
+def test_grid_matches_brute_force():
+    rng = random.Random(3)
+    points = [(i, rng.uniform(55.3, 69.0), rng.uniform(11.0, 24.0)) for i in range(2000)]
+    grid = GridIndex(points)
+    for lat, lon, radius in ((59.33, 18.07, 25), (57.71, 11.97, 120), (65.0, 20.0, 900), (62.0, 15.0, 0.5)):
+        expected = sorted(
+            (haversine_km(lat, lon, plat, plon), i) for i, plat, plon in points
+            if haversine_km(lat, lon, plat, plon) <= radius
+        )
+        assert grid.within(lat, lon, radius) == expected
+
+
+def test_gazetteer_resolves_places():
+    gazetteer = Gazetteer()
+    assert gazetteer.resolve("uppsala").city == "Uppsala"
+    assert gazetteer.resolve("Gothenburg").city == "Göteborg"
+    assert gazetteer.resolve("Stockholms kommun/Kista").city == "Kista"
+    assert gazetteer.resolve("Atlantis") is None
+    # Stockholm-Uppsala ~ 64 km fågelvägen
+    sthlm, uppsala = gazetteer.resolve("Stockholm"), gazetteer.resolve("Uppsala")
+    assert 55 < haversine_km(sthlm.lat, sthlm.lon, uppsala.lat, uppsala.lon) < 75
+
+
+@pytest.fixture(scope="module")
+def repo(tmp_path_factory):
+    if not Path("ai_companies.db").exists():
+        pytest.skip("ai_companies.db saknas - kör build_database.py")
+    folder = tmp_path_factory.mktemp("geo")
+    db_path, snapshot_path = folder / "ai_companies.db", folder / "ai_companies.snapshot"
+    shutil.copy("ai_companies.db", db_path)
+    conn = sqlite3.connect(db_path)
+    enrich_step(conn)
+    conn.close()
+    export_snapshot(str(db_path), str(snapshot_path))
+    repository = CompanyRepository(str(db_path), snapshot_path=str(snapshot_path))
+    repository.connect()
+    yield repository
+    repository.close()
+
+
+def test_snapshot_builds_same_index_as_database(repo):
+    assert repo.geo is not None
+    snapshot = CatalogSnapshot.open(repo.snapshot_path)
+    try:
+        from_snapshot = {i: (lat, lon) for i, lat, lon in snapshot.coordinates()}
+    finally:
+        snapshot.close()
+    from_db = {i: (lat, lon) for i, lat, lon in repo.backend.coordinates()}
+    assert from_snapshot.keys() == from_db.keys()
+    for company_id, (lat, lon) in from_db.items():
+        assert from_snapshot[company_id] == pytest.approx((lat, lon), abs=1e-4)
+
+
+def test_nearby_pages_cover_everything_once(repo):
+    label = nearby_label("Kista", 40)
+    hits = repo.nearby("Kista", 40)
+    assert hits and all(distance <= 40 for distance, _ in hits)
+
+    pages, cursor = [], None
+    while True:
+        rows, has_more = repo.browse_page('nara', label, cursor, 'next', 7)
+        pages.append(rows)
+        if not has_more:
+            break
+        cursor = (round(rows[-1]['distance_km'] * 1000), rows[-1]['id'])
+    ids = [row['id'] for page in pages for row in page]
+    assert ids == [company_id for _, company_id in sorted((round(d * 1000), i) for d, i in hits)]
+    distances = [row['distance_km'] for page in pages for row in page]
+    assert distances == sorted(distances)
+
+    # Tillbaka från sista sidan ger näst sista sidan
+    if len(pages) > 1:
+        first = (round(pages[-1][0]['distance_km'] * 1000), pages[-1][0]['id'])
+        rows, _ = repo.browse_page('nara', label, first, 'prev', 7)
+        assert [row['id'] for row in rows] == [row['id'] for row in pages[-2]]
+
+    assert repo.nearby("Atlantis", 10) is None
+
+
+def test_pages_follow_rounded_keys(monkeypatch):
+    """Avstånd som avrundas till samma meter får inte hoppas över eller upprepas"""
+    repo = CompanyRepository("saknas.db")
+    hits = [(1.0004, 9), (1.0001, 3), (1.0002, 5), (2.0, 1), (2.0003, 0)]
+    monkeypatch.setattr(repo, "nearby", lambda place, radius_km: hits)
+    monkeypatch.setattr(repo, "get_companies", lambda ids: [{'id': i} for i in ids])
+
+    pages, cursor = [], None
+    while True:
+        rows, has_more = repo.nearby_page("Kista", 5, cursor, 'next', 2)
+        pages.append([row['id'] for row in rows])
+        if not has_more:
+            break
+        cursor = (round(rows[-1]['distance_km'] * 1000), rows[-1]['id'])
+    assert pages == [[3, 5], [9, 0], [1]]
+
+    rows, _ = repo.nearby_page("Kista", 5, (2000, 1), 'prev', 2)
+    assert [row['id'] for row in rows] == [9, 0]
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+TEST-SCRIPT FÖR POSTGRESQL-BACKEND
+==================================
+Kräver en lokal PostgreSQL med pg_trgm och asyncpg:
+
+    createdb aim25_test
+    POSTGRES_TEST_DSN=postgresql://localhost/aim25_test python -m pytest test_postgres.py
+
+Migrerar ai_companies.db till databasen, jämför svaren med SQLite och kör
+samtidiga frågor från flera bot-instanser mot samma databas.
+"""
+
+import asyncio
+import os
+from pathlib import Path
+
+import pytest
+
+from repository import CompanyRepository, PostgresBackend, is_praktik
+from repository.postgres import migrate_from_sqlite
+
+DSN = os.getenv('POSTGRES_TEST_DSN')
+
+pytestmark = pytest.mark.skipif(not DSN, reason="POSTGRES_TEST_DSN saknas")
+
+
+@pytest.fixture(scope="module")
+def repos():
+    pytest.importorskip("asyncpg")
+    if not Path("ai_companies.db").exists():
+        pytest.skip("ai_companies.db saknas - kör build_database.py")
+    counts = asyncio.run(migrate_from_sqlite("ai_companies.db", DSN))
+    sqlite = CompanyRepository()
+    sqlite.connect()
+    postgres = CompanyRepository(backend=PostgresBackend(DSN, max_size=4))
+    assert postgres.connect()
+    assert counts['companies'] == sqlite.conn.execute("SELECT COUNT(*) FROM companies").fetchone()[0]
+    yield sqlite, postgres
+    postgres.close()
+    sqlite.close()
+
+
+def test_postgres_matches_sqlite(repos):
+    sqlite, postgres = repos
+    assert postgres.get_daily_eligible_ids() == sqlite.get_daily_eligible_ids()
+    assert {c['id'] for c in postgres.search_by_name("ai", None)} == \
+        {c['id'] for c in sqlite.search_by_name("ai", None)}
+    assert postgres.backend.facet_counts('type') == sqlite.backend.facet_counts('type')
+
+    company_id = sqlite.get_daily_eligible_ids()[0]
+    expected, actual = sqlite.get_company(company_id), postgres.get_company(company_id)
+    for key in ('name', 'website', 'type', 'logo_url', 'description', 'location_city'):
+        assert actual[key] == expected[key]
+
+    page, has_more = postgres.browse_page('stad', 'Stockholm')
+    expected_page, _ = sqlite.browse_page('stad', 'Stockholm')
+    assert [c['id'] for c in page] == [c['id'] for c in expected_page] and has_more
+    filters = {'company_type': 'startup'}
+    assert [c['id'] for c in postgres.filter_page(filters, limit=10)[0]] == \
+        [c['id'] for c in sqlite.filter_page(filters, limit=10)[0]]
+
+    for company in postgres.filter_by_city("stockholm", limit=5):
+        assert "stockholm" in company['location_city'].lower() and is_praktik(company)
+    strict = postgres.get_random_company_strict()
+    assert strict['id'] in sqlite.get_daily_eligible_ids()
+
+
+def test_instances_share_database_under_load(repos):
+    sqlite, _ = repos
+    expected = {c['id'] for c in sqlite.search_by_name("ai", 5)}
+
+    async def instance():
+        repo = CompanyRepository(backend=PostgresBackend(DSN, max_size=4))
+        assert repo.connect()
+        try:
+            calls = []
+            for _ in range(20):
+                calls.append(repo.call('search_by_name', "ai", 5))
+                calls.append(repo.call('filter_by_city', "Stockholm", 5))
+                calls.append(repo.call('filter_greater_stockholm', 5))
+            return await asyncio.gather(*calls)
+        finally:
+            repo.close()
+
+    async def run():
+        return await asyncio.gather(*(instance() for _ in range(3)))
+
+    for results in asyncio.run(run()):
+        assert len(results) == 60
+        searches = results[0::3]
+        assert all({c['id'] for c in rows} == expected for rows in searches)
+        assert all(rows for rows in results[1::3])
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+TEST-SCRIPT FÖR ATOMISK PUBLICERING
+===================================
+Bygger i en kopia av ai_companies.db (i en temporär mapp) och kontrollerar
+att läsare aldrig ser en halvfärdig katalog och att misslyckade byggen
+lämnar den publicerade filen orörd.
+"""
+
+import hashlib
+import shutil
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from publish import PublishError, staged_database
+from repository import CompanyRepository
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    if not Path("ai_companies.db").exists():
+        pytest.skip("ai_companies.db saknas - kör build_database.py")
+    path = tmp_path / "ai_companies.db"
+    shutil.copy("ai_companies.db", path)
+    return str(path)
+
+
+def count(repo: CompanyRepository) -> int:
+    return repo.conn.execute("SELECT COUNT(*) FROM companies").fetchone()[0]
+
+
+def digest(path: str) -> str:
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def test_readers_see_old_catalogue_until_swap(db_path):
+    repo = CompanyRepository(db_path)
+    repo.connect()
+    try:
+        before = count(repo)
+        with staged_database(db_path) as staging:
+            writer = sqlite3.connect(staging)
+            writer.execute("INSERT INTO companies (id, name) VALUES (999999, 'Nytt AB')")
+            writer.commit()
+            writer.close()
+            # Läsaren ser fortfarande den publicerade filen medan bygget pågår
+            assert count(repo) == before
+            assert not repo.reload_if_changed()
+
+        assert not Path(f"{db_path}.building").exists()
+        assert count(repo) == before
+        assert repo.reload_if_changed()
+        assert count(repo) == before + 1
+        assert repo.conn.execute("SELECT COUNT(*) FROM sqlite_stat1").fetchone()[0] > 0
+    finally:
+        repo.close()
+
+
+def test_failed_build_leaves_catalogue_untouched(db_path):
+    original = digest(db_path)
+
+    with pytest.raises(RuntimeError):
+        with staged_database(db_path) as staging:
+            sqlite3.connect(staging).execute("DELETE FROM company_sectors").connection.commit()
+            raise RuntimeError("import kraschade")
+
+    with pytest.raises(PublishError):
+        with staged_database(db_path) as staging:
+            conn = sqlite3.connect(staging)
+            conn.execute("INSERT INTO company_sectors (company_id, sector_id) VALUES (999999, 1)")
+            conn.commit()
+            conn.close()
+
+    assert digest(db_path) == original
+    assert not Path(f"{db_path}.building").exists()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+TEST-SCRIPT FÖR BATCH-LÄGET I query_database.py
+===============================================
+Kör samma JSONL-frågor med en och flera processer och jämför svaren.
+"""
+
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from query_database import run_batch
+
+pytestmark = pytest.mark.skipif(
+    not Path("ai_companies.db").exists(), reason="ai_companies.db saknas - kör build_database.py"
+)
+
+QUERIES = [
+    {'ref': 'sok', 'search': 'vision', 'limit': 3},
+    {'filter': {'company_type': 'startup', 'min_quality': 50}, 'limit': 5},
+    {'id': 2325},
+    {'ids': [2326, 2325]},
+    {'filter': {'färg': 'blå'}},
+    {'id': -1},
+]
+
+
+def _run(workers: int, chunk_size: int = 2):
+    source = io.StringIO('\n'.join(json.dumps(q) for q in QUERIES) + '\n\nnot json\n')
+    output = io.StringIO()
+    stats = run_batch(source, output, workers=workers, chunk_size=chunk_size)
+    return stats, [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_batch_answers_in_order():
+    stats, answers = _run(workers=1)
+    assert stats['queries'] == 7 and stats['errors'] == 2
+    assert [a['ref'] for a in answers] == ['sok', 2, 3, 4, 5, 6, 8]
+    assert all('vision' in row['name'].lower() for row in answers[0]['results'])
+    assert len(answers[1]['results']) == 5
+    assert answers[2]['results'][0]['id'] == 2325 and 'sectors' in answers[2]['results'][0]
+    assert [row['id'] for row in answers[3]['results']] == [2326, 2325]
+    assert 'error' in answers[4] and answers[5]['results'] == [] and 'error' in answers[6]
+    assert stats['rows'] == sum(len(a.get('results', [])) for a in answers)
+
+
+def test_process_pool_gives_same_answers():
+    assert _run(workers=2)[1] == _run(workers=1)[1]
+
+
+def test_bad_arguments_give_error_lines():
+    """Fel typer ska bli {"error": ...} på sin rad, inte avbryta batchen"""
+    bad = [
+        {'search': 'x', 'limit': 'abc'},
+        {'filter': {'company_type': ['a']}},
+        {'ids': [10 ** 30]},
+        {'search': 'vision', 'limit': 1},
+    ]
+    source = io.StringIO('\n'.join(json.dumps(q) for q in bad) + '\n')
+    output = io.StringIO()
+    stats = run_batch(source, output)
+    answers = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert stats['queries'] == 4 and stats['errors'] == 3
+    assert all('error' in a for a in answers[:3]) and len(answers[3]['results']) == 1
+
+
+def test_error_keeps_callers_ref():
+    """Felsvar bär frågans egen ref; radnumret bara när raden inte är JSON"""
+    source = io.StringIO('{"ref": "mine", "ids": [1, "x"]}\n{"ref": "lim", "search": "x", "limit": -1}\nnot json\n')
+    output = io.StringIO()
+    run_batch(source, output)
+    answers = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [a['ref'] for a in answers] == ['mine', 'lim', 3]
+    assert all('error' in a for a in answers)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+TEST-SCRIPT FÖR FRÅGEPLANER
+===========================
+Bygger en databas i en temporär mapp, kör botens frågor och kontrollerar
+med EXPLAIN QUERY PLAN att ingen av dem läser hela companies-tabellen.
+"""
+
+import re
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from build_database import CatalogBuilder, FLAG_INDEXES, ensure_flag_columns
+from import_eu_data import EUImporter
+from publish import finalize_database
+from repository import CompanyRepository
+from repository.filters import DAILY_FLAG, PRAKTIK_FLAG, flag_sql, is_daily_eligible, is_praktik
+
+SOURCE_JSON = "organizations_data_v3_2.json"
+SOURCE_CSV = "companies_from_eu_site_no_name_headers.csv"
+
+
+@pytest.fixture(scope="module")
+def built_db(tmp_path_factory):
+    if not Path(SOURCE_JSON).exists():
+        pytest.skip(f"{SOURCE_JSON} saknas")
+    path = str(tmp_path_factory.mktemp("build") / "ai_companies.db")
+    builder = CatalogBuilder(path)
+    builder.connect()
+    builder.create_schema()
+    builder.import_myai_data(SOURCE_JSON)
+    builder.close()
+    if Path(SOURCE_CSV).exists():
+        importer = EUImporter(path)
+        importer.connect()
+        importer.import_csv(SOURCE_CSV, only_unique=True)
+        importer.close()
+    conn = sqlite3.connect(path)
+    ensure_flag_columns(conn)
+    conn.close()
+    finalize_database(path)
+    return path
+
+
+def bot_queries(repo: CompanyRepository):
+    """Kör botens frågor och returnera SQL-texten (med parametrar) för varje"""
+    statements = []
+    repo.conn.set_trace_callback(statements.append)
+    try:
+        repo.filter_by_type("startup")
+        repo.filter_by_city("Stockholm")
+        repo.filter_greater_stockholm()
+        repo.get_random_company()
+        ids = repo.get_daily_eligible_ids()
+        repo.get_random_company_strict()
+        repo.get_companies(ids[:5])
+        repo.search_by_name("ai")
+        for kind, label in (('typ', 'startup'), ('stad', 'Stockholm'), ('sthlm', '')):
+            rows, _ = repo.browse_page(kind, label)
+            repo.browse_page(kind, label, (rows[-1]['data_quality_score'], rows[-1]['id']))
+    finally:
+        repo.conn.set_trace_callback(None)
+    return [sql for sql in statements if sql.lstrip().upper().startswith("SELECT")]
+
+
+def test_flags_match_filters(built_db):
+    conn = sqlite3.connect(built_db)
+    conn.row_factory = sqlite3.Row
+    try:
+        for row in conn.execute("SELECT * FROM companies"):
+            company = dict(row)
+            assert company[PRAKTIK_FLAG] == is_praktik(company)
+            assert company[DAILY_FLAG] == is_daily_eligible(company)
+    finally:
+        conn.close()
+
+
+def test_bot_queries_avoid_full_table_scans(built_db):
+    repo = CompanyRepository(built_db)
+    assert repo.connect()
+    try:
+        assert repo.backend.praktik_where == flag_sql(PRAKTIK_FLAG)
+        statements = bot_queries(repo)
+        assert len(statements) >= 10
+        for sql in statements:
+            plan = [row[3] for row in repo.conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+            context = f"{' '.join(sql.split())}\n{plan}"
+            assert not [step for step in plan if re.fullmatch(r"SCAN (companies|c)", step)], context
+            # Praktik/daglig post läses ur de partiella indexen, inte ur tabellen
+            if PRAKTIK_FLAG in sql or DAILY_FLAG in sql:
+                assert any(name in step for step in plan for name, _ in FLAG_INDEXES), context
+    finally:
+        repo.close()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+TEST-SCRIPT FÖR REPOSITORY
+==========================
+Kontrollerar att bot och CLI delar samma läslager och att SQL-filtren och
+Python-predikaten i repository/filters.py är överens.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from query_database import CompanyQuery
+from repository import CompanyRepository, is_daily_eligible, is_praktik
+from repository.filters import daily_sql, praktik_sql
+
+
+@pytest.fixture
+def repo():
+    if not Path("ai_companies.db").exists():
+        pytest.skip("ai_companies.db saknas - kör build_database.py")
+    repo = CompanyRepository()
+    assert repo.connect()
+    yield repo
+    repo.close()
+
+
+def test_sql_filters_match_predicates(repo):
+    rows = [dict(r) for r in repo.conn.execute("SELECT * FROM companies")]
+    praktik = {r['id'] for r in repo.conn.execute(f"SELECT id FROM companies WHERE {praktik_sql()}")}
+    daily = {r['id'] for r in repo.conn.execute(f"SELECT id FROM companies WHERE {daily_sql()}")}
+    assert praktik == {r['id'] for r in rows if is_praktik(r)}
+    assert daily == {r['id'] for r in rows if is_daily_eligible(r)}
+    assert repo.get_daily_eligible_ids() == sorted(daily)
+
+
+def test_sampling_respects_filters(repo):
+    for company in repo.filter_by_city("Stockholm", limit=20):
+        assert "stockholm" in company['location_city'].lower() and is_praktik(company)
+    for company in repo.filter_greater_stockholm(limit=20):
+        assert company['location_greater_stockholm'] == 1 and is_praktik(company)
+    startups = repo.filter_by_type("STARTUP", limit=10)
+    assert startups and all(c['type'] == 'startup' and c['website'] for c in startups)
+    assert len({c['id'] for c in startups}) == len(startups)
+    company = repo.get_random_company_strict()
+    assert company['id'] in repo.get_daily_eligible_ids() and 'ai_capabilities' in company
+
+
+def test_cli_shares_repository(repo):
+    cli = CompanyQuery()
+    cli.connect()
+    try:
+        assert cli.search_by_name("AI")[:5] == repo.search_by_name("AI")
+        assert len(cli.search_by_name("AI")) >= len(repo.search_by_name("AI"))
+        details = cli.get_company_details(repo.get_daily_eligible_ids()[0])
+        assert {'sectors', 'domains', 'ai_capabilities', 'dimensions'} <= details.keys()
+        assert all(c['type'] == 'startup' for c in cli.filter_companies(company_type='startup', limit=10))
+        cities = cli.list_cities()
+        assert cities == sorted(cities, key=lambda item: (-item[1], item[0]))
+    finally:
+        cli.close()
+    # Read-only: CLI:t kan inte råka skriva i katalogen
+    with pytest.raises(Exception):
+        repo.conn.execute("DELETE FROM companies")
+
+
+def test_run_moves_repository_calls_off_the_loop(repo):
+    """repo.run ger samma svar som de synkrona metoderna, utan att köras i event loopen"""
+    import asyncio
+    import threading
+
+    threads = []
+    original = repo.browse_page
+
+    def spy(*args):
+        threads.append(threading.current_thread())
+        return original(*args)
+
+    async def run():
+        repo.browse_page = spy
+        page = await repo.run('browse_page', 'typ', 'startup', None, 'next', 5)
+        company = await repo.run('get_company', page[0][0]['id'])
+        return page, company
+
+    page, company = asyncio.run(run())
+    assert threads and threads[0] is not threading.main_thread()
+    assert page == original('typ', 'startup', None, 'next', 5)
+    assert company == repo.get_company(page[0][0]['id'])
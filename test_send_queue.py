@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+TEST-SCRIPT FÖR UTGÅENDE KÖ
+===========================
+Testar coalescing, backpressure och rate limiting per route.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from send_queue import OutboundQueue, QueueFullError, TokenBucket
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() > 0
+
+
+def test_queue_coalesces_and_sends():
+    async def scenario():
+        queue = OutboundQueue(workers=2, route_rate=1000, route_burst=10)
+        queue.start()
+        sent = []
+
+        async def send(value):
+            sent.append(value)
+            return value
+
+        first = queue.submit("dm:1", lambda: send("a"), coalesce_key=("dm", 1, 99))
+        duplicate = queue.submit("dm:1", lambda: send("a"), coalesce_key=("dm", 1, 99))
+        other = queue.submit("dm:2", lambda: send("b"))
+        assert first is duplicate
+        assert await first == "a"
+        assert await other == "b"
+        await queue.stop()
+        return sent, queue.metrics()
+
+    sent, metrics = asyncio.run(scenario())
+    assert sorted(sent) == ["a", "b"]
+    assert metrics['coalesced'] == 1
+    assert metrics['sent'] == 2
+    assert metrics['depth'] == 0
+
+
+def test_queue_backpressure_and_route_limit():
+    async def scenario():
+        queue = OutboundQueue(max_depth=3, workers=1, route_rate=20, route_burst=1)
+        gate = asyncio.Event()
+
+        async def blocked():
+            await gate.wait()
+
+        queue.start()
+        queue.submit("dm:1", blocked)
+        await asyncio.sleep(0)  # workern plockar första jobbet
+        for _ in range(3):
+            queue.submit("dm:1", blocked)
+        with pytest.raises(QueueFullError):
+            queue.submit("dm:1", blocked)
+        started = time.monotonic()
+        gate.set()
+        await queue.join()
+        elapsed = time.monotonic() - started
+        await queue.stop()
+        return elapsed, queue.metrics()
+
+    elapsed, metrics = asyncio.run(scenario())
+    assert metrics['rejected'] == 1
+    # 3 köade jobb på samma route med 20 tokens/s → minst ~0.1 s
+    assert elapsed >= 0.09
+
+
+def test_hot_route_does_not_block_other_routes():
+    async def scenario():
+        queue = OutboundQueue(workers=1, route_rate=2, route_burst=1)
+        queue.start()
+        done = {}
+
+        async def send(name):
+            done[name] = time.monotonic()
+
+        started = time.monotonic()
+        hot = [queue.submit("channel:hot", lambda i=i: send(f"hot{i}")) for i in range(3)]
+        other = queue.submit("dm:2", lambda: send("dm"))
+        await other
+        await asyncio.gather(*hot)
+        await queue.stop()
+        return {name: t - started for name, t in done.items()}
+
+    elapsed = asyncio.run(scenario())
+    # DM:et skickas direkt trots att den enda workern annars väntat på hot-routens bucket
+    assert elapsed["dm"] < 0.1
+    assert elapsed["hot1"] >= 0.45 and elapsed["hot2"] >= 0.95
+
+
+def test_queue_restarts_after_stop():
+    async def scenario():
+        queue = OutboundQueue(workers=1, route_rate=1000, route_burst=10)
+
+        async def send(value):
+            return value
+
+        assert await queue.submit("dm:1", lambda: send("före"), coalesce_key="k") == "före"
+        await queue.stop()
+        # submit efter stop startar nya workers i stället för att bli liggande
+        assert await asyncio.wait_for(queue.submit("dm:1", lambda: send("efter"), coalesce_key="k"), 1) == "efter"
+        await queue.join()
+        await queue.stop()
+
+    asyncio.run(scenario())
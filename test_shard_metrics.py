@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+TEST-SCRIPT FÖR SHARDING-KONFIGURATION
+======================================
+Testar tolkning av SHARD_COUNT/SHARD_IDS och fördelning av servrar.
+"""
+
+import pytest
+
+from shard_metrics import ShardMetrics, parse_shard_ids, shard_config_from_env, shard_for_guild
+
+
+def test_parse_shard_ids():
+    assert parse_shard_ids("0-2,5, 3") == [0, 1, 2, 3, 5]
+
+
+def test_config_from_env():
+    assert not shard_config_from_env({}).sharded
+    auto = shard_config_from_env({'AUTO_SHARD': '1'})
+    assert auto.sharded and auto.shard_count is None
+    config = shard_config_from_env({'SHARD_COUNT': '4', 'SHARD_IDS': '2-3'})
+    assert config.sharded and config.shard_ids == [2, 3]
+    with pytest.raises(ValueError):
+        shard_config_from_env({'SHARD_IDS': '0'})
+    with pytest.raises(ValueError):
+        shard_config_from_env({'SHARD_COUNT': '2', 'SHARD_IDS': '0-2'})
+
+
+def test_processes_partition_guilds():
+    left = shard_config_from_env({'SHARD_COUNT': '4', 'SHARD_IDS': '0-1'})
+    right = shard_config_from_env({'SHARD_COUNT': '4', 'SHARD_IDS': '2-3'})
+    guild_ids = [1423667681940344873 + i * (1 << 22) for i in range(16)]
+    for guild_id in guild_ids:
+        assert left.owns_guild(guild_id) != right.owns_guild(guild_id)
+    assert {shard_for_guild(g, 4) for g in guild_ids} == {0, 1, 2, 3}
+
+
+def test_metrics_snapshot():
+    metrics = ShardMetrics()
+    metrics.on_connect(1)
+    metrics.on_command(1, 'sok')
+    metrics.on_command(1, 'sok', ok=False)
+    rows = metrics.snapshot({0: 0.05, 1: float('nan')}, {0: 3})
+    assert [r['shard_id'] for r in rows] == [0, 1]
+    assert rows[0]['latency_ms'] == pytest.approx(50)
+    assert rows[1]['latency_ms'] is None
+    assert rows[1]['commands'] == 2 and rows[1]['command_errors'] == 1
+
+
+def test_reconnect_time_measured():
+    metrics = ShardMetrics()
+    metrics.on_ready(0)
+    metrics.on_disconnect(0)
+    metrics.on_disconnect(0)  # flera avbrott innan återanslutning räknas från det första
+    metrics.on_resumed(0)
+    row = metrics.snapshot({}, {})[0]
+    assert row['disconnects'] == 2 and row['resumes'] == 1 and row['readies'] == 1
+    assert row['reconnect_last_ms'] is not None and row['reconnect_last_ms'] >= 0
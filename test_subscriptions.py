@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+TEST-SCRIPT FÖR PRENUMERATIONER OCH FAN-OUT
+===========================================
+Testar tidszonslogik, begränsad parallellism och omförsök per kanal.
+"""
+
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from subscriptions import Subscription, SubscriptionStore, fan_out
+
+
+def test_due_respects_local_time_and_delivery():
+    sub = Subscription(1, 10, post_time="08:00", timezone="Europe/Stockholm")
+    # 06:30 UTC = 07:30 Stockholm (vintertid)
+    assert not sub.is_due(datetime(2025, 1, 15, 6, 30, tzinfo=timezone.utc))
+    assert sub.is_due(datetime(2025, 1, 15, 7, 5, tzinfo=timezone.utc))
+    sub.last_delivered_day = "2025-01-15"
+    assert not sub.is_due(datetime(2025, 1, 15, 12, 0, tzinfo=timezone.utc))
+
+    ny = Subscription(2, 20, post_time="08:00", timezone="America/New_York")
+    assert not ny.is_due(datetime(2025, 1, 15, 7, 5, tzinfo=timezone.utc))
+
+
+def test_store_roundtrip_and_stats(tmp_path):
+    store = SubscriptionStore(str(tmp_path / "state.db"))
+    store.connect()
+    store.subscribe(1, 10, "9:15", "Europe/Stockholm")
+    store.subscribe(1, 11)
+    store.subscribe(1, 10, "10:00", "UTC")  # uppdatering, ingen dubblett
+    subs = store.list_subscriptions(1)
+    assert [(s.channel_id, s.post_time, s.timezone) for s in subs] == [
+        (10, "10:00", "UTC"), (11, "08:00", "Europe/Stockholm")
+    ]
+    with pytest.raises(ValueError):
+        store.subscribe(1, 12, "25:00")
+    with pytest.raises(ValueError):
+        store.subscribe(1, 12, "08:00", "Mars/Olympus")
+
+    assert store.unsubscribe(1, 11) == 1
+    store.close()
+
+
+def test_fan_out_bounds_concurrency_and_retries():
+    subs = [Subscription(1, channel_id) for channel_id in range(10)]
+    active = 0
+    peak = 0
+    calls = {}
+
+    async def send(sub):
+        nonlocal active, peak
+        calls[sub.channel_id] = calls.get(sub.channel_id, 0) + 1
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.001)
+        active -= 1
+        if sub.channel_id == 3 and calls[3] < 2:
+            raise RuntimeError("429")
+        if sub.channel_id == 7:
+            raise PermissionError("saknar rättigheter")
+
+    results = asyncio.run(fan_out(
+        subs, send, max_concurrency=3, max_attempts=3,
+        is_retryable=lambda e: isinstance(e, RuntimeError),
+        retry_delay=lambda e, attempt: 0,
+    ))
+    by_channel = {r.channel_id: r for r in results}
+    assert peak <= 3
+    assert by_channel[3].ok and by_channel[3].attempts == 2
+    assert not by_channel[7].ok and by_channel[7].attempts == 1
+    assert sum(r.ok for r in results) == 9
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+TEST-SCRIPT FÖR SYNK TILL BOT-VÄRDAR
+====================================
+Två temporära mappar spelar RasPi och Railway. Den första synken skickar
+hela filen, nästa import bara en changeset - som måste ge exakt samma
+innehåll som källan.
+"""
+
+import shutil
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from publish import staged_database
+from sync_catalog import ChangesetError, apply_changeset, file_digest, push, read_changeset
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    if not Path("ai_companies.db").exists():
+        pytest.skip("ai_companies.db saknas - kör build_database.py")
+    monkeypatch.setenv("CHANGESET_DIR", "changesets")
+    build = tmp_path / "build"
+    build.mkdir()
+    path = build / "ai_companies.db"
+    shutil.copy("ai_companies.db", path)
+    return path
+
+
+def import_batch(db_path: Path, company_id: int) -> None:
+    """Liten import: en ny post, en ändrad och en borttagen koppling"""
+    with staged_database(str(db_path)) as staging:
+        conn = sqlite3.connect(staging)
+        conn.execute("INSERT INTO companies (id, name, type) VALUES (?, 'Synk AB', 'startup')", (company_id,))
+        conn.execute("UPDATE companies SET description = 'Uppdaterad' WHERE id = (SELECT MIN(id) FROM companies)")
+        conn.execute("DELETE FROM company_sectors WHERE rowid = (SELECT MIN(rowid) FROM company_sectors)")
+        conn.commit()
+        conn.close()
+
+
+def test_push_sends_full_copy_then_small_changesets(source, tmp_path):
+    hosts = [tmp_path / "raspi", tmp_path / "railway"]
+    for host in hosts:
+        host.mkdir()
+    changesets = source.parent / "changesets"
+
+    first = push(str(source), [str(h) for h in hosts], str(changesets))
+    assert [r['method'] for r in first] == ['hel fil', 'hel fil']
+
+    import_batch(source, 999001)
+    import_batch(source, 999002)
+    assert len(list(changesets.glob("*.changeset.gz"))) == 2
+
+    reports = push(str(source), [str(h) for h in hosts], str(changesets))
+    full = source.stat().st_size
+    for report in reports:
+        assert report['method'] == 'changeset' and report['files'] == 2
+        assert 0 < report['bytes'] < full / 20
+    for host in hosts:
+        assert file_digest(str(host / "ai_companies.db")) == file_digest(str(source))
+
+    assert [r['method'] for r in push(str(source), [str(hosts[0])], str(changesets))] == ['oförändrad']
+
+
+def test_changeset_for_other_base_is_rejected(source, tmp_path):
+    host = tmp_path / "raspi"
+    host.mkdir()
+    shutil.copy(source, host / "ai_companies.db")
+    import_batch(source, 999001)
+    import_batch(source, 999002)
+    second = sorted((source.parent / "changesets").glob("*.changeset.gz"),
+                    key=lambda p: read_changeset(str(p))['created'])
+    before = file_digest(str(host / "ai_companies.db"))
+
+    # Den andra changesetens bas är resultatet av den första, inte värdens katalog
+    bases = {read_changeset(str(p))['base'] for p in second}
+    wrong = next(p for p in second if read_changeset(str(p))['base'] != before)
+    with pytest.raises(ChangesetError):
+        apply_changeset(str(wrong), str(host / "ai_companies.db"))
+    assert before in bases
+    assert file_digest(str(host / "ai_companies.db")) == before
+
+    # Utan obruten kedja faller push tillbaka till hela filen
+    for path in second:
+        path.unlink()
+    assert push(str(source), [str(host)], str(source.parent / "changesets"))[0]['method'] == 'hel fil'
+    assert file_digest(str(host / "ai_companies.db")) == file_digest(str(source))
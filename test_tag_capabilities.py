@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+TEST-SCRIPT FÖR AI-FÖRMÅGOR
+===========================
+Kontrollerar att förmågor hittas i beskrivningar och att härledda taggar
+aldrig ersätter taggar från källdatan (på en kopia av ai_companies.db).
+"""
+
+import shutil
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from tag_capabilities import CapabilityTagger, ensure_provenance_column, tag_capabilities
+from tags import normalize_tags
+
+
+@pytest.fixture
+def conn(tmp_path):
+    if not Path("ai_companies.db").exists():
+        pytest.skip("ai_companies.db saknas - kör build_database.py")
+    path = tmp_path / "ai_companies.db"
+    shutil.copy("ai_companies.db", path)
+    connection = sqlite3.connect(path)
+    yield connection
+    connection.close()
+
+
+def _names(conn, ids):
+    return {name for capability_id, name in conn.execute("SELECT id, name FROM ai_capabilities")
+            if capability_id in ids}
+
+
+def test_tagger_finds_capabilities(conn):
+    normalize_tags(conn)
+    tagger = CapabilityTagger(conn)
+    found = _names(conn, tagger.tag(
+        "Vi bygger språkmodeller och robotar. Our platform uses Machine Learning for forecasting."
+    ))
+    assert {'Language', 'Robotics (Agentic)', 'machine learning', 'Prediction'} <= found
+    # Helord: "vr" i "ovriga" ska inte räknas
+    assert _names(conn, tagger.tag("Övriga tjänster inom ovriga områden")) == set()
+    # Generella ord och affärsmodeller taggas inte
+    assert _names(conn, tagger.tag("AI as a subscription on our marketplace")) == set()
+
+
+def test_inferred_tags_keep_source_tags(conn):
+    normalize_tags(conn)
+    # En databas byggd med build_database.py har redan härledda taggar
+    ensure_provenance_column(conn)
+    source = conn.execute(
+        "SELECT company_id, capability_id FROM company_ai_capabilities WHERE inferred = 0 ORDER BY 1, 2"
+    ).fetchall()
+    stats = tag_capabilities(conn)
+    assert stats['inferred'] > 0 and stats['newly_tagged'] > 0
+    assert conn.execute(
+        "SELECT company_id, capability_id FROM company_ai_capabilities WHERE inferred = 0 ORDER BY 1, 2"
+    ).fetchall() == source
+
+    # Samma resultat om steget körs igen
+    first = conn.execute("SELECT * FROM company_ai_capabilities ORDER BY 1, 2").fetchall()
+    assert tag_capabilities(conn) == stats
+    assert conn.execute("SELECT * FROM company_ai_capabilities ORDER BY 1, 2").fetchall() == first
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+TEST-SCRIPT FÖR TAGGNORMALISERING
+=================================
+Kontrollerar uppdelning och kanoniska nycklar, och att normalize_tags gör
+lookup-tabellerna atomära utan att tappa kopplingar (på en kopia av
+ai_companies.db).
+"""
+
+import shutil
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from repository import CompanyRepository
+from tags import TAG_TABLES, TagDictionary, normalize_tags, split_tags, tag_key
+
+
+def test_split_and_keys():
+    assert split_tags("Technology, Data") == ["Technology", "Data"]
+    assert split_tags(["Vision", "Language, vision", " "]) == ["Vision", "Language"]
+    assert split_tags(None) == [] and split_tags("") == []
+    assert tag_key('sectors', "  information   TECHNOLOGY ") == tag_key('sectors', "IT")
+    assert tag_key('ai_capabilities', "NLP") == "natural language processing"
+    # Synonymer gäller per tabell
+    assert tag_key('domains', "IT") == "it & software"
+
+
+def _company_tags(conn, table):
+    junction, column = TAG_TABLES[table]
+    tags = {}
+    for company_id, name in conn.execute(
+        f"SELECT j.company_id, t.name FROM {junction} j JOIN {table} t ON t.id = j.{column}"
+    ):
+        tags.setdefault(company_id, set()).update(tag_key(table, tag) for tag in split_tags(name))
+    return tags
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    if not Path("ai_companies.db").exists():
+        pytest.skip("ai_companies.db saknas - kör build_database.py")
+    path = tmp_path / "ai_companies.db"
+    shutil.copy("ai_companies.db", path)
+    return path
+
+
+def test_normalize_keeps_every_company_tag(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        before = {table: _company_tags(conn, table) for table in TAG_TABLES}
+        stats = normalize_tags(conn)
+        for table in TAG_TABLES:
+            assert conn.execute(f"SELECT COUNT(*) FROM {table} WHERE name LIKE '%,%'").fetchone()[0] == 0
+            assert conn.execute(f"SELECT COUNT(*) FROM {table} WHERE name_key IS NULL").fetchone()[0] == 0
+            assert _company_tags(conn, table) == before[table]
+        assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+
+        # Idempotent, och ordboken hittar befintliga taggar i stället för att skapa nya
+        assert normalize_tags(conn) == {'removed': 0, 'tags': stats['tags']}
+        tags = TagDictionary(conn)
+        technology = conn.execute("SELECT id FROM dimensions WHERE name = 'Technology'").fetchone()[0]
+        assert tags.ids_for('dimensions', "technology, TECHNOLOGY") == [technology]
+    finally:
+        conn.close()
+
+
+def test_filter_is_exact_key_lookup(db_path):
+    conn = sqlite3.connect(db_path)
+    normalize_tags(conn)
+    expected = {row[0] for row in conn.execute(
+        "SELECT j.company_id FROM company_sectors j JOIN sectors t ON t.id = j.sector_id "
+        "WHERE t.name = 'Information Technology'"
+    )}
+    plan = ' '.join(row[3] for row in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM sectors WHERE name_key = ?", ('information technology',)
+    ))
+    conn.close()
+    assert 'idx_sectors_key' in plan
+
+    repo = CompanyRepository(str(db_path))
+    repo.connect()
+    try:
+        rows = repo.filter_companies(sector="IT", limit=10000)
+    finally:
+        repo.close()
+    assert {row['id'] for row in rows} == expected and expected
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+TEST-SCRIPT FÖR WARMUP
+======================
+Autocomplete-index, tidsbudget och förrenderade dagliga embeds.
+"""
+
+import asyncio
+import time
+from datetime import date
+
+from daily_schedule import DailyRotation
+from repository import AutocompleteIndex
+from warmup import prime_file, run_warmup
+
+
+def test_autocomplete_index():
+    index = AutocompleteIndex({'Stockholm': 40, 'Solna': 5, 'Göteborg': 12, 'stockholm': 1})
+    assert index.suggest('st') == ['Stockholm', 'stockholm']
+    assert index.suggest('S', limit=1) == ['Solna']
+    assert index.suggest('x') == []
+    assert index.count('Göteborg') == 12 and index.count('Malmö') is None
+
+
+def test_budget_skips_remaining_steps():
+    ran = []
+
+    def slow(deadline):
+        ran.append('slow')
+        time.sleep(0.05)
+
+    steps = [
+        ('slow', slow, False),
+        ('threaded', lambda deadline: ran.append('threaded'), True),
+        ('broken', lambda deadline: 1 / 0, False),
+    ]
+    report = asyncio.run(run_warmup(steps, budget_s=0.01))
+    assert ran == ['slow'] and report.skipped == ['threaded', 'broken']
+
+    report = asyncio.run(run_warmup(steps, budget_s=5))
+    assert 'broken' in report.errors and report.finished
+
+
+def test_prime_file(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"x" * 3000)
+    assert prime_file(str(path), chunk_size=1024) == 3000
+    assert prime_file(str(tmp_path / "saknas")) == 0
+
+
+def test_rotation_upcoming_does_not_advance(tmp_path):
+    rotation = DailyRotation(str(tmp_path / "state.db"))
+    rotation.connect()
+    rotation.sync([1, 2, 3, 4])
+    day = date(2025, 1, 1)
+    upcoming = rotation.upcoming(2, day)
+    assert rotation.next_company_id(day) == upcoming[0]
+    # Dagens val kommer först, följt av nästa i rotationen
+    assert rotation.upcoming(2, day)[0] == upcoming[0]
+    assert rotation.upcoming(2, day)[1] == rotation.next_company_id(date(2025, 1, 2))
+    rotation.close()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+WARMUP - Förvärm cacher efter start och import
+==============================================
+Första /sok, /stad eller autocomplete efter en omstart betalar annars för
+kalla sidor på långsam lagring (SD-kort på Raspberry Pi). Warmup körs i
+bakgrunden efter setup_hook med en tidsbudget; steg som inte hinner köras
+hoppas över och rapporteras.
+
+Stegen läggs till av anroparen (se discord_bot.py). Den här modulen har
+generella byggstenar:
+
+- prime_file() läser in filer i OS:ets page cache
+- run_warmup() kör stegen inom budget och returnerar en WarmupReport
+
+Efter en import kan page cache förvärmas från kommandoraden:
+    python warmup.py [ai_companies.db] [ai_companies.snapshot]
+"""
+
+import asyncio
+import inspect
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+@dataclass
+class WarmupReport:
+    """Resultat av en warmup-körning"""
+    budget_ms: float
+    steps_ms: Dict[str, float] = field(default_factory=dict)
+    skipped: List[str] = field(default_factory=list)
+    errors: Dict[str, str] = field(default_factory=dict)
+    total_ms: float = 0.0
+    finished: bool = False
+
+    def summary(self) -> str:
+        done = ", ".join(f"{name} {ms:.0f} ms" for name, ms in self.steps_ms.items()) or "inga steg"
+        text = f"{done} (totalt {self.total_ms:.0f}/{self.budget_ms:.0f} ms)"
+        if self.skipped:
+            text += f" • hoppade över: {', '.join(self.skipped)}"
+        if self.errors:
+            text += f" • fel: {', '.join(self.errors)}"
+        return text
+
+
+# ==================== PAGE CACHE ====================
+
+def prime_file(path: str, deadline: Optional[float] = None, chunk_size: int = 1 << 20) -> int:
+    """
+    Läs en fil sekventiellt så att den hamnar i OS:ets page cache
+
+    Args:
+        deadline: time.monotonic()-värde då läsningen avbryts
+
+    Returns:
+        Antal lästa byte
+    """
+    if not path or not os.path.exists(path):
+        return 0
+    read = 0
+    with open(path, 'rb', buffering=0) as f:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+        while deadline is None or time.monotonic() < deadline:
+            data = f.read(chunk_size)
+            if not data:
+                break
+            read += len(data)
+    return read
+
+
+def evict_file(path: str) -> bool:
+    """Be OS:et släppa filens sidor ur page cache (för mätningar av kallstart)"""
+    if not hasattr(os, 'posix_fadvise') or not os.path.exists(path):
+        return False
+    with open(path, 'rb') as f:
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+    return True
+
+
+# ==================== KÖRNING ====================
+
+WarmupStep = Tuple[str, Callable[[float], object], bool]
+
+
+async def run_warmup(steps: Iterable[WarmupStep], budget_s: float) -> WarmupReport:
+    """
+    Kör warmup-steg i ordning inom en tidsbudget
+
+    Args:
+        steps: (namn, funktion(deadline), i_tråd). Steg med i_tråd=True körs
+               via asyncio.to_thread (får inte använda state-databaserna);
+               övriga körs i event-loopen och ska vara korta eller
+               returnera en coroutine som awaitas.
+        budget_s: Total tidsbudget i sekunder
+    """
+    report = WarmupReport(budget_ms=budget_s * 1000)
+    started = time.monotonic()
+    deadline = started + budget_s
+    for name, step, threaded in steps:
+        if time.monotonic() >= deadline:
+            report.skipped.append(name)
+            continue
+        step_started = time.monotonic()
+        try:
+            if threaded:
+                await asyncio.to_thread(step, deadline)
+            else:
+                result = step(deadline)
+                if inspect.isawaitable(result):
+                    await result
+        except Exception as e:
+            report.errors[name] = str(e)
+        report.steps_ms[name] = (time.monotonic() - step_started) * 1000
+        # Släpp fram interaktioner mellan stegen
+        await asyncio.sleep(0)
+    report.total_ms = (time.monotonic() - started) * 1000
+    report.finished = True
+    return report
+
+
+def main():
+    """Förvärm page cache för katalogen (t.ex. efter import på en Raspberry Pi)"""
+    paths = sys.argv[1:] or ["ai_companies.db", "ai_companies.snapshot"]
+    for path in paths:
+        start = time.perf_counter()
+        read = prime_file(path)
+        if read:
+            print(f"🔥 {path}: {read / 1024:.0f} KB på {(time.perf_counter() - start) * 1000:.0f} ms")
+        else:
+            print(f"⚠️ {path} saknas - hoppar över")
+
+
+if __name__ == "__main__":
+    main()